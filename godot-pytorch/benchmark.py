@@ -0,0 +1,286 @@
+"""
+Latency and throughput benchmark for the digit evaluation, runs without Godot.
+
+The evaluator node is run as the game uses it, with the py4godot types it touches replaced by
+stand-ins: StandInImage exposes the calls the evaluator makes (get_data().get_memory_view(),
+get_width(), get_height()), Array, Dictionary and the signals are small Python versions. Every
+case is measured on synthetic strokes and on MNIST style rendered digits at several canvas
+resolutions:
+
+	evaluate_image        - evaluator.evaluate_image with the result cache off (cache_size 0)
+	evaluate_image_cached - evaluator.evaluate_image on drawings evaluated before, answered by the ResultCache
+	evaluate_images       - evaluator.evaluate_images, one batched forward pass, for every --batch-sizes entry
+	queue_image           - evaluator.queue_image for N images + flush_queue (the batch_window wait excluded)
+	evaluate_custom_image - model.evaluate_custom_image on an already prepared 28x28 float array, the raw model only
+
+The results (p50/p95/p99 latency in ms, images per second, peak RSS) are written as JSON.
+
+Usage:
+	python benchmark.py --output bench.json
+	python benchmark.py --mode torchscript --resolutions 280 560 --iterations 100
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+import types
+
+import cv2
+import numpy as np
+import torch
+
+import model
+from preprocessing import prepare_image
+
+
+class StandInData:
+	def __init__(self, pixels):
+		self._pixels = pixels
+
+	def get_memory_view(self):
+		return memoryview(self._pixels.reshape(-1))
+
+
+class StandInImage:
+	"""
+	The parts of py4godot's Image the evaluator uses, backed by a (height, width, 4) uint8 array.
+	"""
+
+	def __init__(self, pixels):
+		self._pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+
+	def get_data(self):
+		return StandInData(self._pixels)
+
+	def get_width(self):
+		return self._pixels.shape[1]
+
+	def get_height(self):
+		return self._pixels.shape[0]
+
+
+class StandInArray(list):
+	@staticmethod
+	def new0():
+		return StandInArray()
+
+	def size(self):
+		return len(self)
+
+
+class StandInDictionary(dict):
+	@staticmethod
+	def new0():
+		return StandInDictionary()
+
+	def get_or_add(self, key, default):
+		return self.setdefault(key, default)
+
+
+class StandInSignal:
+	def __init__(self, arguments=()):
+		self.emitted = 0
+
+	def emit(self, *arguments):
+		self.emitted += 1
+
+
+def install_godot_stand_ins():
+	"""
+	Register stand-in py4godot modules, so evaluator can be imported outside of Godot.
+	"""
+	def module(name, **attributes):
+		stand_in = types.ModuleType(name)
+		stand_in.__dict__.update(attributes)
+		sys.modules[name] = stand_in
+		return stand_in
+
+	module("py4godot", gdproperty=lambda kind, default: default)
+	module("py4godot.classes", gdclass=lambda cls: cls)
+	module("py4godot.classes.Image", Image=StandInImage)
+	module("py4godot.classes.Node2D", Node2D=object)
+	module("py4godot.classes.core", Array=StandInArray, Dictionary=StandInDictionary)
+	module("py4godot.signals", signal=StandInSignal, SignalArg=lambda name, kind: (name, kind))
+
+
+def create_evaluator(cache_size):
+	install_godot_stand_ins()
+	import evaluator
+
+	node = evaluator.evaluator()
+	node.cache_size = cache_size
+	node._ready()
+	return node
+
+
+def white_canvas(size):
+	return np.full((size, size, 4), 255, dtype=np.uint8)
+
+
+def synthetic_canvas(size, rng):
+	"""
+	A few random black brush strokes, like a scribble on the paint canvas.
+	"""
+	canvas = white_canvas(size)
+	for _ in range(int(rng.integers(1, 4))):
+		points = rng.integers(size // 8, size * 7 // 8, size=(int(rng.integers(2, 6)), 1, 2)).astype(np.int32)
+		cv2.polylines(canvas, [points], False, (0, 0, 0, 255), max(2, size // 16))
+	return canvas
+
+
+def mnist_style_canvas(size, rng):
+	"""
+	A single thick digit at a random position, like a drawn MNIST digit.
+	"""
+	canvas = white_canvas(size)
+	scale = size / 80 * rng.uniform(0.7, 1.0)
+	origin = (int(size * rng.uniform(0.2, 0.4)), int(size * rng.uniform(0.7, 0.85)))
+	cv2.putText(canvas, str(int(rng.integers(0, 10))), origin, cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0, 255), max(2, size // 14))
+	return canvas
+
+
+CANVASES = {"synthetic": synthetic_canvas, "mnist_style": mnist_style_canvas}
+
+
+def peak_rss_mb():
+	try:
+		import resource
+	except ImportError:  # Windows
+		try:
+			import psutil
+		except ImportError:
+			return None
+		return psutil.Process().memory_info().peak_wset / 2 ** 20
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+	return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def summarize(latencies_ms, images_per_call):
+	latencies = np.asarray(latencies_ms)
+	return {
+		"calls": len(latencies),
+		"p50_ms": float(np.percentile(latencies, 50)),
+		"p95_ms": float(np.percentile(latencies, 95)),
+		"p99_ms": float(np.percentile(latencies, 99)),
+		"mean_ms": float(latencies.mean()),
+		"images_per_second": float(images_per_call * len(latencies) / (latencies.sum() / 1000)),
+	}
+
+
+def measure(call, iterations, warmup):
+	for _ in range(warmup):
+		call()
+	latencies = []
+	for _ in range(iterations):
+		start = time.perf_counter()
+		call()
+		latencies.append((time.perf_counter() - start) * 1000)
+	return latencies
+
+
+def queue_images(node, images, model_name):
+	for image in images:
+		node.queue_image(image, model_name)
+	return node.flush_queue()
+
+
+def evaluate_custom_image(array, model_name):
+	# evaluate_custom_image prints its probability distribution, keep that out of the timings output
+	with contextlib.redirect_stdout(io.StringIO()):
+		return model.evaluate_custom_image(array, model_name)
+
+
+def run(args):
+	rng = np.random.default_rng(args.seed)
+	model.registry.get(args.model)  # load outside of the timings
+	node = create_evaluator(cache_size=0)
+	cached_node = create_evaluator(cache_size=args.cache_size)
+	results = []
+
+	for canvas_name in args.canvases:
+		for resolution in args.resolutions:
+			images = [StandInImage(CANVASES[canvas_name](resolution, rng)) for _ in range(max(args.batch_sizes + [16]))]
+			case = {"canvas": canvas_name, "resolution": resolution}
+
+			with contextlib.redirect_stdout(io.StringIO()):
+				single = measure(lambda: node.evaluate_image(images[int(rng.integers(len(images)))], args.model), args.iterations, args.warmup)
+			single = {**case, "case": "evaluate_image", "batch_size": 1, **summarize(single, 1)}
+			results.append(single)
+
+			# The warmup calls fill the cache with every drawing, the timed calls repeat them
+			with contextlib.redirect_stdout(io.StringIO()):
+				for image in images:
+					cached_node.evaluate_image(image, args.model)
+				cached = measure(lambda: cached_node.evaluate_image(images[int(rng.integers(len(images)))], args.model), args.iterations, args.warmup)
+			cached = {**case, "case": "evaluate_image_cached", "batch_size": 1, **summarize(cached, 1)}
+			results.append(cached)
+
+			prepared = [prepare_image(image) for image in images]
+			arrays = [digit.astype(np.float32) for digit in prepared if digit is not None] or [np.zeros((28, 28), np.float32)]
+			custom = measure(lambda: evaluate_custom_image(arrays[int(rng.integers(len(arrays)))], args.model), args.iterations, args.warmup)
+			results.append({**case, "case": "evaluate_custom_image", "batch_size": 1, **summarize(custom, 1)})
+
+			for batch_size in args.batch_sizes:
+				batch = StandInArray(images[:batch_size])
+				with contextlib.redirect_stdout(io.StringIO()):
+					batched = measure(lambda: node.evaluate_images(batch, args.model), max(1, args.iterations // batch_size), args.warmup)
+					queued = measure(lambda: queue_images(node, batch, args.model), max(1, args.iterations // batch_size), args.warmup)
+				results.append({**case, "case": "queue_image", "batch_size": batch_size, **summarize(queued, batch_size)})
+				results.append({**case, "case": "evaluate_images", "batch_size": batch_size, **summarize(batched, batch_size)})
+
+			print(f"{canvas_name:12s} {resolution:5d}px  evaluate_image p50 {single['p50_ms']:.2f} ms, "
+				f"cached p50 {cached['p50_ms']:.3f} ms, "
+				f"batch of {batch_size} {results[-1]['images_per_second']:.0f} images/s")
+
+	cache_stats = cached_node.get_cache_stats()
+	node._exit_tree()
+	cached_node._exit_tree()
+	return {
+		"metadata": {
+			"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+			"python": platform.python_version(),
+			"platform": platform.platform(),
+			"torch": torch.__version__,
+			"numpy": np.__version__,
+			"opencv": cv2.__version__,
+			"torch_threads": torch.get_num_threads(),
+			"device": str(model.inference_device()),
+			"inference_mode": model.INFERENCE_MODE,
+			"model": model.ModelRegistry.resolve_name(args.model),
+			"iterations": args.iterations,
+		},
+		"results": results,
+		"cache_stats": dict(cache_stats),
+		"peak_rss_mb": peak_rss_mb(),
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write")
+	parser.add_argument("--model", default=model.DEFAULT_MODEL, help="checkpoint name, see model.CHECKPOINTS")
+	parser.add_argument("--mode", default=model.INFERENCE_MODE, choices=model.INFERENCE_MODES, help="model.INFERENCE_MODE")
+	parser.add_argument("--canvases", nargs="+", default=list(CANVASES), choices=list(CANVASES))
+	parser.add_argument("--resolutions", nargs="+", type=int, default=[140, 280, 560, 1024])
+	parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+	parser.add_argument("--iterations", type=int, default=200)
+	parser.add_argument("--warmup", type=int, default=10)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--cache-size", type=int, default=64, help="cache_size of the evaluator in the cached case")
+	args = parser.parse_args()
+
+	model.INFERENCE_MODE = args.mode
+	report = run(args)
+	with open(args.output, "w") as f:
+		json.dump(report, f, indent=2)
+	if report["peak_rss_mb"] is not None:
+		print(f"Peak RSS {report['peak_rss_mb']:.1f} MB")
+	print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
@@ -1,84 +1,315 @@
-import cv2
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 import model
+from preprocessing import DigitPreprocessor, PREPROCESS_STEPS, image_pixels, image_view
+from result_cache import DIGIT, INPUT, ResultCache
+from stroke_canvas import StrokeCanvas
+from py4godot import gdproperty
 from py4godot.classes import gdclass
 from py4godot.classes.Image import Image
 from py4godot.classes.Node2D import Node2D
+from py4godot.classes.core import Array, Dictionary
+from py4godot.signals import signal, SignalArg
+
+
+def copy_digit(digit):
+	# prepare_image reuses its output buffer, keep a copy when the digit is stored
+	return None if digit is None else digit.copy()
+
+
+def to_godot_probabilities(probabilities) -> Array:
+	probability_array = Array.new0()
+	if probabilities is not None:
+		for probability in probabilities:
+			probability_array.append(float(probability))
+	return probability_array
+
+
+def to_godot_result(digit: int, probabilities) -> Dictionary:
+	"""
+	Pack one prediction as {"digit": int, "probabilities": Array[float]}.
+	A digit of -1 with empty probabilities means no digit was found.
+	"""
+	result = Dictionary.new0()
+	result.get_or_add("digit", int(digit))
+	result.get_or_add("probabilities", to_godot_probabilities(probabilities))
+	return result
 
 
 @gdclass
 class evaluator(Node2D):
+	# Images queued within this many seconds of the first one are evaluated as one batch
+	batch_window: float = gdproperty(float, 0.05)
+
+	# Number of worker threads running submit_image requests
+	worker_count: int = gdproperty(int, 1)
+
+	# Results of this many recent drawings are kept, an unchanged drawing is answered without evaluating it again (0 disables)
+	cache_size: int = gdproperty(int, 64)
+
+	# While the canvas changes it is evaluated at most once per this many seconds (0 turns live evaluation off)
+	live_interval: float = gdproperty(float, 0.15)
 
-	def evaluate_image(self, image: Image):
+	# Emitted on the main thread for every image passed to queue_image or submit_image once it was evaluated
+	digit_evaluated = signal([SignalArg("request_id", int), SignalArg("digit", int), SignalArg("probabilities", Array)])
+
+	# Emitted on the main thread with the live prediction of the canvas drawn with draw_brush
+	canvas_evaluated = signal([SignalArg("digit", int), SignalArg("probabilities", Array)])
+
+	def _ready(self) -> None:
+		self._next_request_id = 0
+		self._pending = []  # (request_id, model_name, input key, processed image or None, cached result or None)
+		self._cache = ResultCache(self.cache_size)
+		self._pending_since = 0.0
+		self._executor = ThreadPoolExecutor(max_workers=max(1, self.worker_count), thread_name_prefix="evaluator")
+		self._completed = queue.SimpleQueue()  # (request_id, digit, probabilities) filled by the workers
+		self._canvas = StrokeCanvas()
+		self._canvas_evaluated_version = self._canvas.version
+		self._canvas_request_id = None  # live evaluation in flight
+		self._canvas_evaluated_at = 0.0
+		self._canvas_requested = False  # evaluate_canvas was called, skip the live_interval wait
+
+	def _process(self, delta: float) -> None:
+		if self._pending and time.monotonic() - self._pending_since >= self.batch_window:
+			self.flush_queue()
+		self._evaluate_canvas_if_changed()
+
+		# Deliver finished worker results on the main thread
+		while True:
+			try:
+				request_id, digit, probabilities = self._completed.get_nowait()
+			except queue.Empty:
+				break
+			if request_id == self._canvas_request_id:
+				self._canvas_request_id = None
+				self.canvas_evaluated.emit(digit, to_godot_probabilities(probabilities))
+			else:
+				self.digit_evaluated.emit(request_id, digit, to_godot_probabilities(probabilities))
+
+	def _exit_tree(self) -> None:
+		self._executor.shutdown(wait=False, cancel_futures=True)
+
+	def evaluate_image(self, image: Image, model_name: str = ""):
 		"""
 		Process and evaluate an image containing a digit.
-		Uses a more conservative approach that preserves more original image characteristics.
-		
+
 		Args:
 			image (Image): The input image to be evaluated
-			
+			model_name (str): Checkpoint to evaluate with (e.g. "mnist_lenet"), empty for the default
+
 		Returns:
 			The evaluation result from PyTorch model
 		"""
-		# Extract image data safely
-		data = image.get_data()
-		array_from_data = np.frombuffer(data.get_memory_view(), dtype=np.uint8)
-		
-		# Reshape data properly to get correct image representation
-		array_from_data_reshaped = array_from_data.reshape((image.get_height(), image.get_width(), 4))
-		img_array = array_from_data_reshaped[:, :, :3]  # Extract RGB channels
-		
-		# Convert to grayscale
-		grayscale_array = np.mean(img_array, axis=2).astype(np.uint8)
-		
-		# Find the bounding box just for centering purposes
-		_, thresh = cv2.threshold(grayscale_array, 50, 255, cv2.THRESH_BINARY_INV)
-		coords = cv2.findNonZero(thresh)
-		
-		# Handle case where no non-zero pixels are found
-		if coords is None or len(coords) == 0:
-			print("No digit detected in the image")
-			return None
-		
-		x, y, w, h = cv2.boundingRect(coords)
-
-		# Find the center of the digit
-		center_x = x + w // 2
-		center_y = y + h // 2
-		
-		# Determine the size of the square region to extract (the larger of width or height, plus padding)
-		size = max(w, h)
-		square_size = int(size * 1.8)  # 80% extra padding around the digit
-		
-		# Calculate square boundaries
-		half_size = square_size // 2
-		square_x1 = max(0, center_x - half_size)
-		square_y1 = max(0, center_y - half_size)
-		square_x2 = min(image.get_width(), center_x + half_size)
-		square_y2 = min(image.get_height(), center_y + half_size)
-		
-		# Extract the square region
-		square_region = grayscale_array[square_y1:square_y2, square_x1:square_x2]
-		
-		# Create a square canvas with black background
-		canvas_size = max(square_region.shape)
-		square_canvas = np.zeros((canvas_size, canvas_size), dtype=np.uint8)
-		
-		# Paste the square region onto the canvas
-		offset_y = (canvas_size - square_region.shape[0]) // 2
-		offset_x = (canvas_size - square_region.shape[1]) // 2
-		square_canvas[offset_y:offset_y+square_region.shape[0], offset_x:offset_x+square_region.shape[1]] = square_region
-		
-		# Resize to 28x28
-		resized_img = cv2.resize(square_canvas, (28, 28), interpolation=cv2.INTER_AREA)
-		
-		# Invert image (ensure white digit on black background for MNIST compatibility)
-		inverted_img = 255 - resized_img
-
-		# Convert to format expected by PyTorch model
-		processed_img = np.array(inverted_img.reshape(28, 28), dtype=np.float32)
-
-		results = model.evaluate_custom_image(processed_img)
-		return results[0]
+		data, pixels = image_view(image)
+		digit, _ = self._evaluate_pixels([pixels], model_name)[0]
+		return digit if digit >= 0 else None
+
+	def evaluate_images(self, images: Array, model_name: str = "") -> Array:
+		"""
+		Evaluate several images with a single forward pass.
+
+		Args:
+			images (Array[Image]): The input images to be evaluated
+			model_name (str): Checkpoint to evaluate with, empty for the default
+
+		Returns:
+			An Array with one {"digit", "probabilities"} Dictionary per image, in input order
+		"""
+		views = [image_view(images[i]) for i in range(images.size())]
+		results = Array.new0()
+		for digit, probabilities in self._evaluate_pixels([pixels for _, pixels in views], model_name):
+			results.append(to_godot_result(digit, probabilities))
+		return results
+
+	def queue_image(self, image: Image, model_name: str = "") -> int:
+		"""
+		Queue an image for batched evaluation.
+		Images queued within batch_window seconds are evaluated together and
+		reported through the digit_evaluated signal.
+
+		Returns:
+			The request id passed to digit_evaluated
+		"""
+		request_id = self._new_request_id()
+		if not self._pending:
+			self._pending_since = time.monotonic()
+		data, pixels = image_view(image)
+		input_key = self._cache.key(INPUT, pixels, model_name)
+		result = self._cache.lookup(input_key)
+		processed_img = copy_digit(DigitPreprocessor.for_current_thread()(pixels)) if result is None else None
+		self._pending.append((request_id, model_name, input_key, processed_img, result))
+		return request_id
+
+	def submit_image(self, image: Image, model_name: str = "") -> int:
+		"""
+		Evaluate an image on a worker thread without blocking the game loop.
+		Only the pixel copy happens on the calling thread; the result is reported
+		through the digit_evaluated signal from a later _process call.
+
+		Returns:
+			The request id passed to digit_evaluated
+		"""
+		request_id = self._new_request_id()
+		self._executor.submit(self._evaluate_in_worker, request_id, image_pixels(image), model_name)
+		return request_id
+
+	def flush_queue(self) -> int:
+		"""
+		Evaluate all queued images now, one forward pass per checkpoint.
+
+		Returns:
+			The number of evaluated requests
+		"""
+		pending, self._pending = self._pending, []
+		results = {}
+		by_model = {}
+		for request_id, model_name, input_key, processed_img, result in pending:
+			if result is not None:
+				results[request_id] = result
+			else:
+				by_model.setdefault(model_name, []).append((request_id, input_key, processed_img))
+
+		for model_name, requests in by_model.items():
+			evaluated = self._evaluate_batch([processed_img for _, _, processed_img in requests], model_name,
+											 [input_key for _, input_key, _ in requests])
+			results.update(zip([request_id for request_id, _, _ in requests], evaluated))
+
+		for request_id, *_ in pending:
+			digit, probabilities = results[request_id]
+			self.digit_evaluated.emit(request_id, digit, to_godot_probabilities(probabilities))
+		return len(pending)
+
+	def _new_request_id(self) -> int:
+		request_id = self._next_request_id
+		self._next_request_id += 1
+		return request_id
+
+	def start_canvas(self, width: int, height: int, background: int) -> None:
+		"""
+		Start a live drawing of width x height pixels with a background shade of (r + g + b) / 3 (0-255).
+		Brushes are added with draw_brush, the prediction arrives through canvas_evaluated.
+		"""
+		self._canvas.reset(width, height, background)
+
+	def draw_brush(self, x: float, y: float, radius: float, shade: int) -> None:
+		"""
+		Add a filled brush circle to the live drawing, in drawing area pixels with a shade of (r + g + b) / 3 (0-255).
+		"""
+		self._canvas.stamp(x, y, radius, shade)
+
+	def evaluate_canvas(self) -> None:
+		"""
+		Evaluate the live drawing without waiting for live_interval, e.g. once a stroke ends.
+		Also works with live evaluation turned off. The result arrives through canvas_evaluated,
+		unless the drawing didn't change since the last evaluation.
+		"""
+		self._canvas_requested = True
+		self._evaluate_canvas_if_changed()
+
+	def _evaluate_canvas_if_changed(self) -> None:
+		# Throttled: one live evaluation at a time, at most one per live_interval unless it was requested
+		if self._canvas_request_id is not None:
+			return
+		if self._canvas.version == self._canvas_evaluated_version:
+			self._canvas_requested = False
+			return
+		now = time.monotonic()
+		if not self._canvas_requested and (self.live_interval <= 0 or now - self._canvas_evaluated_at < self.live_interval):
+			return
+		self._canvas_requested = False
+		self._canvas_evaluated_version = self._canvas.version
+		self._canvas_evaluated_at = now
+		self._canvas_request_id = self._new_request_id()
+		# Only the 28x28 digit is copied to the worker
+		self._executor.submit(self._evaluate_in_worker, self._canvas_request_id, copy_digit(self._canvas.digit()), "", True)
+
+	def _evaluate_in_worker(self, request_id: int, pixels: np.ndarray, model_name: str, prepared: bool = False) -> None:
+		try:
+			if prepared:
+				digit, probabilities = self._evaluate_batch([pixels], model_name, [None])[0]
+			else:
+				digit, probabilities = self._evaluate_pixels([pixels], model_name)[0]
+		except Exception as e:
+			print(f"Error: evaluation of request {request_id} failed: {e}")
+			digit, probabilities = -1, None
+		self._completed.put((request_id, digit, probabilities))
+
+	def _evaluate_pixels(self, pixels, model_name: str):
+		"""
+		Evaluate RGBA pixel arrays, answering unchanged ones from the cache without preprocessing them.
+		Returns a (digit, probabilities) pair per input like _evaluate_batch.
+		"""
+		input_keys = [self._cache.key(INPUT, array, model_name) for array in pixels]
+		results = [self._cache.lookup(input_key) for input_key in input_keys]
+		missing = [i for i, result in enumerate(results) if result is None]
+		if missing:
+			preprocessor = DigitPreprocessor.for_current_thread()
+			processed = [copy_digit(preprocessor(pixels[i])) for i in missing]
+			evaluated = self._evaluate_batch(processed, model_name, [input_keys[i] for i in missing])
+			for i, result in zip(missing, evaluated):
+				results[i] = result
+		return results
+
+	def _evaluate_batch(self, processed, model_name: str, input_keys):
+		"""
+		Run one forward pass over the prepared images, skipping the ones without a digit and the
+		ones in the cache. Every result is cached under its input key and its digit.
+		Returns a (digit, probabilities) pair per input, (-1, None) where no digit was found.
+		"""
+		digit_keys = [None if processed_img is None else self._cache.key(DIGIT, processed_img, model_name)
+					  for processed_img in processed]
+		results = [(-1, None) if processed_img is None else self._cache.lookup(digit_key, input_key is None)
+				   for processed_img, digit_key, input_key in zip(processed, digit_keys, input_keys)]
+		missing = [i for i, result in enumerate(results) if result is None]
+		if missing:
+			digits, probabilities = model.evaluate_digits([processed[i] for i in missing], model_name)
+			for i, digit, probs in zip(missing, digits, probabilities):
+				results[i] = (int(digit), probs)
+		for result, input_key, digit_key in zip(results, input_keys, digit_keys):
+			self._cache.store(result, input_key, digit_key)
+		return results
+
+	def get_preprocess_timings(self) -> Dictionary:
+		"""
+		Duration of every preprocessing step of the last evaluate_image, evaluate_images
+		or queue_image call in milliseconds.
+		"""
+		timings = DigitPreprocessor.for_current_thread().timings
+		result = Dictionary.new0()
+		for step in PREPROCESS_STEPS:
+			result.get_or_add(step, timings[step])
+		return result
+
+	def reload_models(self, model_name: str = "") -> int:
+		"""
+		Reload cached checkpoints whose file changed on disk.
+
+		Args:
+			model_name (str): Checkpoint to check, empty to check every cached one
+
+		Returns:
+			The number of reloaded checkpoints
+		"""
+		reloaded = model.registry.reload(model_name)
+		if reloaded:
+			# Cached results of the old weights are stale
+			self._cache.clear()
+		return len(reloaded)
+
+	def get_cache_stats(self) -> Dictionary:
+		"""
+		Result cache statistics: input_hits (answered without preprocessing), digit_hits (answered
+		without a forward pass), misses, evaluations, entries and hit_rate (share of evaluations
+		answered from the cache).
+		"""
+		result = Dictionary.new0()
+		for name, value in self._cache.stats().items():
+			result.get_or_add(name, value)
+		return result
 
+	def clear_cache(self) -> None:
+		self._cache.clear()
@@ -2,9 +2,10 @@ import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from torchvision import transforms
 
 import os
+import threading
+from collections import OrderedDict
 
 # Set random seed for reproducibility
 torch.manual_seed(42)
@@ -15,6 +16,20 @@ EPOCHS = 10
 LEARNING_RATE = 0.001
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 MODEL_SAVE_PATH = "models"  # Directory to save models
+MNIST_MEAN = 0.1307  # Normalization of the MNIST training data
+MNIST_STD = 0.3081
+DEFAULT_MODEL = "mnist_cnn_best"  # Checkpoint used when no name is given
+MAX_CACHED_MODELS = 2  # How many checkpoints the registry keeps loaded at once
+
+# CPU inference optimizations, each mode includes the ones before it:
+#   "eager"       - the checkpoint as trained (fp32, separate BatchNorm/Dropout modules)
+#   "fused"       - BatchNorm folded into the preceding convolution, Dropout removed
+#   "quantized"   - additionally int8 dynamic quantization of the fully connected layers
+#   "torchscript" - the quantized model traced with TorchScript, loaded from the artifact next to
+#                   the checkpoint. Only optimize_model.py writes it, after checking that its top-1
+#                   predictions match eager mode; without a current artifact "fused" is used instead
+INFERENCE_MODES = ("eager", "fused", "quantized", "torchscript")
+INFERENCE_MODE = "eager"
 
 # Define the CNN model
 class MNISTNet(nn.Module):
@@ -61,18 +76,207 @@ class MNISTNet(nn.Module):
 		x = self.fc2(x)
 
 		return F.log_softmax(x, dim=1)
+
+# LeNet-5 style network stored in mnist_lenet.pth (a plain nn.Sequential state dict)
+def build_lenet():
+	return nn.Sequential(
+		nn.Conv2d(1, 6, kernel_size=5),
+		nn.ReLU(),
+		nn.MaxPool2d(2),
+		nn.Conv2d(6, 16, kernel_size=5),
+		nn.ReLU(),
+		nn.MaxPool2d(2),
+		nn.Flatten(),
+		nn.Linear(4 * 4 * 16, 120),
+		nn.ReLU(),
+		nn.Linear(120, 84),
+		nn.ReLU(),
+		nn.Linear(84, 10),
+	)
+
+# Checkpoints that can be selected by name: name -> (file in MODEL_SAVE_PATH, model constructor)
+CHECKPOINTS = {
+	"mnist_cnn_best": ("mnist_cnn_best.pt", MNISTNet),
+	"mnist_lenet": ("mnist_lenet.pth", build_lenet),
+}
+
 # Function to load model
 def load_model(model, filepath=None):
 	if filepath is None:
 		filepath = os.path.join(MODEL_SAVE_PATH, "mnist_cnn_best.pt")
 	# Load checkpoint
-	model_save = torch.load(filepath)
+	model_save = torch.load(filepath, map_location=DEVICE)
 
-	# Load model state
-	model.load_state_dict(model_save['model_state_dict'])
+	# Load model state (full training checkpoints wrap it, plain state dicts don't)
+	if 'model_state_dict' in model_save:
+		model_save = model_save['model_state_dict']
+	model.load_state_dict(model_save)
 
 	return model
 
+
+def inference_device():
+	# The optimized paths target CPU-only machines (quantized kernels are CPU only)
+	return DEVICE if INFERENCE_MODE == "eager" else torch.device("cpu")
+
+
+def fuse_model(model):
+	"""
+	Fold every BatchNorm2d into the Conv2d before it and drop Dropout layers.
+	Only valid in eval mode, the predictions stay the same up to float rounding.
+	"""
+	model.eval()
+	if isinstance(model, MNISTNet):
+		for conv_name, bn_name in (("conv1", "bn1"), ("conv2", "bn2"), ("conv3", "bn3")):
+			fused = torch.nn.utils.fusion.fuse_conv_bn_eval(getattr(model, conv_name), getattr(model, bn_name))
+			setattr(model, conv_name, fused)
+			setattr(model, bn_name, nn.Identity())
+		model.dropout1 = nn.Identity()
+	return model
+
+
+def quantize_model(model):
+	"""
+	Quantize the weights of the fully connected layers to int8 (activations are quantized on the fly).
+	"""
+	return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def optimized_model_path(name):
+	return os.path.join(MODEL_SAVE_PATH, f"{name}.torchscript.pt")
+
+
+def optimize_model(model, mode=None):
+	"""
+	Apply the optimizations of an inference mode to a loaded eager model.
+	"""
+	mode = mode or INFERENCE_MODE
+	if mode not in INFERENCE_MODES:
+		raise ValueError(f"Unknown inference mode '{mode}', expected one of {INFERENCE_MODES}")
+	if mode == "eager":
+		return model.eval()
+
+	model = fuse_model(model.to("cpu"))
+	if mode in ("quantized", "torchscript"):
+		model = quantize_model(model)
+	if mode == "torchscript":
+		with torch.no_grad():
+			model = torch.jit.freeze(torch.jit.trace(model, torch.zeros(1, 1, 28, 28)))
+	return model
+
+
+def build_optimized_model(name, save=False):
+	"""
+	Build the TorchScript model (quantized and traced) for a checkpoint and optionally save it as
+	its artifact. The conversion can flip predictions, save only after checking them like
+	optimize_model.py does.
+	"""
+	model = CHECKPOINTS[name][1]()
+	model = load_model(model, os.path.join(MODEL_SAVE_PATH, CHECKPOINTS[name][0]))
+	model = optimize_model(model, "torchscript")
+	if save:
+		torch.jit.save(model, optimized_model_path(name))
+	return model
+
+
+class ModelRegistry:
+	"""
+	Process-wide cache of loaded checkpoints.
+	Models are loaded once, kept in eval mode and evicted least recently used first
+	once more than max_models are held.
+	"""
+
+	def __init__(self, max_models=MAX_CACHED_MODELS):
+		self.max_models = max_models
+		self._models = OrderedDict()  # name -> (model, mtime of the checkpoint when loaded)
+		self._lock = threading.RLock()
+
+	@staticmethod
+	def resolve_name(name=None):
+		"""
+		Map a checkpoint name or file name (e.g. "mnist_lenet.pth") to a CHECKPOINTS key.
+		"""
+		if not name:
+			return DEFAULT_MODEL
+		name = os.path.basename(str(name))
+		if name in CHECKPOINTS:
+			return name
+		for key, (filename, _) in CHECKPOINTS.items():
+			if filename == name:
+				return key
+		raise KeyError(f"Unknown checkpoint '{name}', expected one of {list(CHECKPOINTS)}")
+
+	@staticmethod
+	def checkpoint_path(name):
+		return os.path.join(MODEL_SAVE_PATH, CHECKPOINTS[name][0])
+
+	def _load(self, name):
+		filepath = self.checkpoint_path(name)
+		mtime = os.path.getmtime(filepath)
+		if INFERENCE_MODE == "torchscript":
+			model = self._load_torchscript(name, mtime)
+		else:
+			model = CHECKPOINTS[name][1]().to(DEVICE)
+			model = load_model(model, filepath)
+			model = optimize_model(model)
+		self._models[name] = (model, mtime)
+		self._models.move_to_end(name)
+		while len(self._models) > self.max_models:
+			self._models.popitem(last=False)
+		return model
+
+	def _load_torchscript(self, name, checkpoint_mtime):
+		# Only verified artifacts are used: optimize_model.py writes them, unless the checkpoint is newer
+		artifact_path = optimized_model_path(name)
+		if os.path.exists(artifact_path) and os.path.getmtime(artifact_path) >= checkpoint_mtime:
+			return torch.jit.load(artifact_path, map_location="cpu")
+		print(f"Warning: no up to date TorchScript model for {name}, using the fused model. "
+			  f"Run optimize_model.py to build and verify it")
+		model = CHECKPOINTS[name][1]()
+		return optimize_model(load_model(model, self.checkpoint_path(name)), "fused")
+
+	def get(self, name=None):
+		"""
+		Return the model for a checkpoint, loading it on first use.
+		"""
+		name = self.resolve_name(name)
+		with self._lock:
+			entry = self._models.get(name)
+			if entry is None:
+				return self._load(name)
+			self._models.move_to_end(name)
+			return entry[0]
+
+	def reload(self, name=None, force=False):
+		"""
+		Reload cached checkpoints whose file changed on disk since they were loaded.
+		With name=None every cached checkpoint is checked. Returns the reloaded names.
+		"""
+		with self._lock:
+			names = [self.resolve_name(name)] if name else list(self._models)
+			reloaded = []
+			for key in names:
+				entry = self._models.get(key)
+				if entry is not None and not force and os.path.getmtime(self.checkpoint_path(key)) == entry[1]:
+					continue
+				self._load(key)
+				reloaded.append(key)
+			return reloaded
+
+	def loaded(self):
+		"""
+		Names of the currently cached checkpoints, least recently used first.
+		"""
+		with self._lock:
+			return list(self._models)
+
+	def clear(self):
+		with self._lock:
+			self._models.clear()
+
+
+registry = ModelRegistry()
+
 # Function to use a trained model for prediction
 def predict_digit(model, image_tensor):
 	model.eval()
@@ -98,41 +302,75 @@ def preprocess_image(image_array):
 	Convert a height x width list into a PyTorch tensor with the expected format.
 	"""
 	# Convert list to numpy array if needed
-	if isinstance(image_array, list):
-		image_array = np.array(image_array, dtype=np.float32)
-
-	# Normalize (assuming input is in range 0-255)
-	image_array = image_array / 255.0
+	image_array = np.asarray(image_array, dtype=np.float32)
 
-	# Convert to tensor and add batch dimension
-	transform = transforms.Compose([
-		transforms.ToTensor(),  # Converts (H, W) -> (1, H, W) and normalizes
-		transforms.Normalize((0.1307,), (0.3081,))  # MNIST mean and std
-	])
+	# Normalize (assuming input is in range 0-255) with the MNIST mean and std
+	image = torch.from_numpy(image_array / 255.0).sub_(MNIST_MEAN).div_(MNIST_STD)
 
-	image = transform(image_array).unsqueeze(0)  # Add batch dimension (1, 1, 28, 28)
+	image = image.reshape(1, 1, *image.shape)  # Add channel and batch dimension (1, 1, 28, 28)
 	return image.to(DEVICE)
 
 
-def evaluate_custom_image(image_array):
+# Normalized model input for every uint8 pixel value, same float32 math as preprocess_image
+NORMALIZE_LUT = preprocess_image(np.arange(256, dtype=np.float32)).cpu().numpy().reshape(256)
+
+
+def digits_to_tensor(digits, out=None):
 	"""
-	Evaluate a custom image on the trained model.
+	Normalize (N, 28, 28) uint8 digit images into a (N, 1, 28, 28) float32 tensor
+	with a table lookup. out can be a preallocated float32 array of that shape.
 	"""
-	# Load model
-	model = MNISTNet().to(DEVICE)
-	model = load_model(model)
+	digits = np.asarray(digits, dtype=np.uint8)
+	if out is None:
+		out = np.empty((len(digits), 1) + digits.shape[1:], dtype=np.float32)
+	np.take(NORMALIZE_LUT, digits, out=out[:, 0])
+	return torch.from_numpy(out)
+
 
-	model.eval()  # Set model to evaluation mode
-	image = preprocess_image(image_array)
+def predict_images(images, model_name=None):
+	"""
+	Run one forward pass over a normalized (N, 1, 28, 28) tensor.
+	Returns the predicted digits (N,) and the probability distributions (N, 10).
+	"""
+	# Cached model, already in evaluation mode
+	model = registry.get(model_name)
+	images = images.to(inference_device())
 
 	with torch.no_grad():
-		output = model(image)
+		output = model(images)
 		probabilities = torch.nn.functional.softmax(output, dim=1)
-		predicted_digit = torch.argmax(probabilities, dim=1).item()
+		predicted_digits = torch.argmax(probabilities, dim=1)
+
+	return predicted_digits.cpu().numpy(), probabilities.cpu().numpy()
+
+
+def evaluate_digits(digits, model_name=None):
+	"""
+	Evaluate (N, 28, 28) uint8 digit images, e.g. from preprocessing.DigitPreprocessor.
+	"""
+	return predict_images(digits_to_tensor(digits), model_name)
+
+
+def evaluate_custom_images(image_arrays, model_name=None):
+	"""
+	Evaluate several custom images with a single forward pass.
+	Returns the predicted digits (N,) and the probability distributions (N, 10).
+	"""
+	images = torch.cat([preprocess_image(image_array) for image_array in image_arrays])  # (N, 1, 28, 28)
+	return predict_images(images, model_name)
+
+
+def evaluate_custom_image(image_array, model_name=None):
+	"""
+	Evaluate a custom image on the trained model.
+	model_name selects the checkpoint (see CHECKPOINTS), defaulting to DEFAULT_MODEL.
+	"""
+	predicted_digits, probabilities = evaluate_custom_images([image_array], model_name)
+	predicted_digit = int(predicted_digits[0])
 
 	print(f"Predicted digit: {predicted_digit}")
 	print("Probability distribution:")
-	for i, prob in enumerate(probabilities.squeeze()):
-		print(f"Digit {i}: {prob.item():.4f}")
+	for i, prob in enumerate(probabilities[0]):
+		print(f"Digit {i}: {prob:.4f}")
 
-	return predicted_digit, probabilities.squeeze().cpu().numpy()
+	return predicted_digit, probabilities[0]
@@ -0,0 +1,93 @@
+"""
+Build the optimized CPU inference artifacts used by model.INFERENCE_MODE = "torchscript".
+
+For every checkpoint the script folds BatchNorm into the convolutions, quantizes the
+fully connected layers to int8, traces the result with TorchScript and saves it as
+models/<name>.torchscript.pt. Before saving it checks that the optimized model makes
+the same top-1 predictions as the eager model on every sample input; an artifact with any
+flipped prediction is reported and not saved. Inputs the eager model itself can barely decide
+(top-2 probabilities within TIE_MARGIN) may flip through int8 rounding, --allow-ties saves
+an artifact whose flips are all such near-ties.
+
+Usage:
+	python optimize_model.py                  # all checkpoints in model.CHECKPOINTS
+	python optimize_model.py mnist_cnn_best   # only the given ones
+	python optimize_model.py --allow-ties     # accept flipped near-tie predictions
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+import torch
+
+import model
+
+TIE_MARGIN = 0.1
+
+
+def sample_inputs(count=256, seed=0):
+	"""
+	Digits rendered at random positions and sizes plus some noise, as 28x28 uint8 arrays.
+	"""
+	rng = np.random.default_rng(seed)
+	samples = []
+	for i in range(count):
+		canvas = np.zeros((28, 28), dtype=np.uint8)
+		scale = rng.uniform(0.6, 0.9)
+		origin = (int(rng.integers(2, 9)), int(rng.integers(20, 26)))
+		cv2.putText(canvas, str(i % 10), origin, cv2.FONT_HERSHEY_SIMPLEX, scale, 255, int(rng.integers(1, 4)))
+		noise = rng.integers(0, 40, size=canvas.shape, dtype=np.uint8)
+		samples.append(np.maximum(canvas, noise).astype(np.float32))
+	return samples
+
+
+def time_forward(net, images, repeats=20):
+	with torch.no_grad():
+		net(images)  # warm up
+		start = time.perf_counter()
+		for _ in range(repeats):
+			net(images)
+	return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("names", nargs="*", default=list(model.CHECKPOINTS), help="checkpoints to optimize")
+	parser.add_argument("--allow-ties", action="store_true",
+						help=f"save artifacts whose only flipped predictions are near-ties (top-2 gap below {TIE_MARGIN})")
+	args = parser.parse_args()
+
+	images = torch.cat([model.preprocess_image(sample) for sample in sample_inputs()]).to("cpu")
+
+	for name in args.names:
+		name = model.ModelRegistry.resolve_name(name)
+		eager = model.CHECKPOINTS[name][1]()
+		eager = model.load_model(eager, model.ModelRegistry.checkpoint_path(name)).to("cpu").eval()
+		optimized = model.build_optimized_model(name, save=False)
+
+		with torch.no_grad():
+			probabilities = torch.softmax(eager(images), dim=1)
+			predicted = optimized(images).argmax(dim=1)
+		top2 = probabilities.topk(2, dim=1).values
+		gaps = top2[:, 0] - top2[:, 1]
+		expected = probabilities.argmax(dim=1)
+		flipped = (expected != predicted).nonzero().flatten().tolist()
+		if flipped:
+			print(f"{name}: {len(flipped)}/{len(images)} top-1 predictions differ from eager mode:")
+			for i in flipped:
+				print(f"\tsample {i}: eager {int(expected[i])}, optimized {int(predicted[i])}, top-2 gap {float(gaps[i]):.3f}")
+			near_ties = all(float(gaps[i]) < TIE_MARGIN for i in flipped)
+			if not (args.allow_ties and near_ties):
+				hint = ", pass --allow-ties to accept near-ties" if near_ties else ""
+				print(f"{name}: not saving{hint}")
+				continue
+
+		torch.jit.save(optimized, model.optimized_model_path(name))
+		print(f"{name}: saved {model.optimized_model_path(name)} "
+			f"(eager {time_forward(eager, images):.2f} ms, optimized {time_forward(optimized, images):.2f} ms "
+			f"per batch of {len(images)})")
+
+
+if __name__ == "__main__":
+	main()
@@ -32,6 +32,14 @@ var bg_color := Color.WHITE
 @onready var drawing_area: Panel = $"../DrawingAreaBG"
 @onready var image_evaluator: Node2D = $"../Evaluator"
 
+func _ready() -> void:
+	# The evaluator keeps its own copy of the drawing for live predictions, sized like the drawing area.
+	# It comes after us in the scene, so wait for it to be ready.
+	if not image_evaluator.is_node_ready():
+		await image_evaluator.ready
+	drawing_area.resized.connect(restart_canvas)
+	restart_canvas()
+
 func _process(_delta: float) -> void:
 	var mouse_pos := get_viewport().get_mouse_position()
 
@@ -96,6 +104,7 @@ func undo_stroke() -> void:
 
 	# Redraw the brushes.
 	queue_redraw()
+	restart_canvas()
 
 
 func add_brush(mouse_pos: Vector2) -> void:
@@ -112,6 +121,7 @@ func add_brush(mouse_pos: Vector2) -> void:
 	# Add the brush and update/draw all of the brushes.
 	brush_data_list.append(new_brush)
 	queue_redraw()
+	forward_brush(new_brush)
 
 
 func _draw() -> void:
@@ -119,10 +129,31 @@ func _draw() -> void:
 		draw_circle(brush.brush_pos, brush.brush_size / 2, brush.brush_color)
 
 
-func evaluate_image():
-	print("evalutate")
+# Clears the evaluator's copy of the drawing and draws all brushes again, e.g. after an undo.
+func restart_canvas() -> void:
+	image_evaluator.start_canvas(int(drawing_area.size.x), int(drawing_area.size.y), color_shade(bg_color))
+	for brush in brush_data_list:
+		forward_brush(brush)
+
+
+# Only the new brush goes to the evaluator, in drawing area coordinates, the viewport isn't read back.
+func forward_brush(brush: Dictionary) -> void:
+	var pos: Vector2 = brush.brush_pos - drawing_area.position
+	image_evaluator.draw_brush(pos.x, pos.y, brush.brush_size / 2, color_shade(brush.brush_color))
+
+
+# The gray value the evaluator sees for a color.
+func color_shade(color: Color) -> int:
+	return (color.r8 + color.g8 + color.b8) / 3
+
+
+func get_drawing_image() -> Image:
 	var img := get_viewport().get_texture().get_image()
-	var cropped_image := img.get_region(Rect2(drawing_area.position, drawing_area.size))
+	return img.get_region(Rect2(drawing_area.position, drawing_area.size))
+
 
-	var number = image_evaluator.evaluate_image(cropped_image)
+func evaluate_image():
+	print("evalutate")
+	var number = image_evaluator.evaluate_image(get_drawing_image())
 	return number
+
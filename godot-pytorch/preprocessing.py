@@ -0,0 +1,176 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Bounding box threshold: pixels darker than this belong to the digit
+THRESHOLD = 50
+# Size of the square around the digit relative to its larger side (80% extra padding)
+PADDING = 1.8
+MNIST_SIZE = 28
+
+PREPROCESS_STEPS = ("grayscale", "threshold", "bounding_box", "crop", "resize", "invert")
+
+
+class DigitPreprocessor:
+	"""
+	Turns the RGBA pixels of a drawn digit into a 28x28 uint8 MNIST style image
+	(white digit on black), the same result as the original evaluator pipeline.
+
+	All intermediate images live in buffers that are allocated once per input
+	resolution and reused, so a call allocates no image sized memory. The returned
+	array is one of those buffers: copy it if it has to outlive the next call.
+	An instance must not be shared between threads, see for_current_thread().
+
+	timings holds the duration of every step of the last call in milliseconds.
+	"""
+
+	def __init__(self):
+		self._shape = None
+		self._sum = None  # uint16 (h, w), r + g + b
+		self._gray = None  # uint8 (h, w)
+		self._mask = None  # uint8 (h, w), digit pixels are 255
+		self._canvas = None  # uint8 (n, n) with n = max(h, w)
+		self._resized = np.empty((MNIST_SIZE, MNIST_SIZE), dtype=np.uint8)
+		self._digit = np.empty((MNIST_SIZE, MNIST_SIZE), dtype=np.uint8)
+		self.timings = dict.fromkeys(PREPROCESS_STEPS, 0.0)
+
+	def _allocate(self, height: int, width: int) -> None:
+		self._shape = (height, width)
+		self._sum = np.empty((height, width), dtype=np.uint16)
+		self._gray = np.empty((height, width), dtype=np.uint8)
+		self._mask = np.empty((height, width), dtype=np.uint8)
+		side = max(height, width)
+		self._canvas = np.empty((side, side), dtype=np.uint8)
+
+	def __call__(self, pixels: np.ndarray):
+		"""
+		Args:
+			pixels (np.ndarray): (height, width, 4) uint8 RGBA pixels, may be a view on Godot memory
+
+		Returns:
+			The (28, 28) uint8 digit image, or None if no digit was found
+		"""
+		height, width = pixels.shape[:2]
+		if self._shape != (height, width):
+			self._allocate(height, width)
+		timings = self.timings
+		start = time.perf_counter()
+
+		# Grayscale as the integer mean of R, G and B, equal to np.mean(rgb).astype(np.uint8)
+		np.add(pixels[:, :, 0], pixels[:, :, 1], out=self._sum, dtype=np.uint16)
+		np.add(self._sum, pixels[:, :, 2], out=self._sum)
+		np.floor_divide(self._sum, 3, out=self._gray, casting="unsafe")
+		now = time.perf_counter()
+		timings["grayscale"], start = (now - start) * 1000, now
+
+		cv2.threshold(self._gray, THRESHOLD, 255, cv2.THRESH_BINARY_INV, dst=self._mask)
+		now = time.perf_counter()
+		timings["threshold"], start = (now - start) * 1000, now
+
+		# boundingRect of a binary image covers its non zero pixels, (0, 0, 0, 0) if there are none
+		x, y, w, h = cv2.boundingRect(self._mask)
+		now = time.perf_counter()
+		timings["bounding_box"], start = (now - start) * 1000, now
+		if w == 0 or h == 0:
+			print("No digit detected in the image")
+			return None
+		return self.crop_digit(self._gray, x, y, w, h, start)
+
+	def crop_digit(self, gray: np.ndarray, x: int, y: int, w: int, h: int, start: float = None):
+		"""
+		The crop, resize and invert steps: the (28, 28) uint8 digit in the (x, y, w, h) box of a grayscale image.
+		"""
+		height, width = gray.shape
+		side = max(height, width)
+		if self._canvas is None or self._canvas.shape[0] < side:
+			self._canvas = np.empty((side, side), dtype=np.uint8)
+		timings = self.timings
+		start = time.perf_counter() if start is None else start
+
+		# Square region around the center of the digit, clipped to the image
+		center_x = x + w // 2
+		center_y = y + h // 2
+		half_size = int(max(w, h) * PADDING) // 2
+		square_x1 = max(0, center_x - half_size)
+		square_y1 = max(0, center_y - half_size)
+		square_x2 = min(width, center_x + half_size)
+		square_y2 = min(height, center_y + half_size)
+		region = gray[square_y1:square_y2, square_x1:square_x2]
+
+		# Paste it centered onto a black square canvas
+		canvas_size = max(region.shape)
+		canvas = self._canvas[:canvas_size, :canvas_size]
+		canvas.fill(0)
+		offset_y = (canvas_size - region.shape[0]) // 2
+		offset_x = (canvas_size - region.shape[1]) // 2
+		canvas[offset_y:offset_y + region.shape[0], offset_x:offset_x + region.shape[1]] = region
+		now = time.perf_counter()
+		timings["crop"], start = (now - start) * 1000, now
+
+		cv2.resize(canvas, (MNIST_SIZE, MNIST_SIZE), dst=self._resized, interpolation=cv2.INTER_AREA)
+		now = time.perf_counter()
+		timings["resize"], start = (now - start) * 1000, now
+
+		# Invert image (ensure white digit on black background for MNIST compatibility)
+		np.subtract(255, self._resized, out=self._digit)
+		timings["invert"] = (time.perf_counter() - start) * 1000
+		return self._digit
+
+	@staticmethod
+	def for_current_thread():
+		"""
+		The preprocessor owned by the calling thread.
+		"""
+		preprocessor = getattr(_thread_local, "preprocessor", None)
+		if preprocessor is None:
+			preprocessor = _thread_local.preprocessor = DigitPreprocessor()
+		return preprocessor
+
+
+_thread_local = threading.local()
+
+
+def pixels_from_data(data, width: int, height: int) -> np.ndarray:
+	"""
+	View the RGBA8 bytes of a Godot image as a (height, width, 4) array.
+	The PackedByteArray must stay referenced while the view is in use.
+	"""
+	array_from_data = np.frombuffer(data.get_memory_view(), dtype=np.uint8)
+
+	# Reshape data properly to get correct image representation
+	return array_from_data.reshape((height, width, 4))
+
+
+def image_view(image):
+	"""
+	The RGBA8 data of a Godot image and a (height, width, 4) view on it.
+	Keep the data referenced while the view is in use.
+	"""
+	data = image.get_data()
+	return data, pixels_from_data(data, image.get_width(), image.get_height())
+
+
+def image_pixels(image) -> np.ndarray:
+	"""
+	Copy the RGBA8 pixels of a Godot image, e.g. to hand them to a worker thread.
+	"""
+	_, pixels = image_view(image)
+	return pixels.copy()
+
+
+def prepare_image(image):
+	"""
+	Turn a Godot image of a drawn digit into a 28x28 MNIST style image.
+
+	Args:
+		image (Image): The input image to be prepared
+
+	Returns:
+		The (28, 28) uint8 digit image (white digit on black), or None if no digit was found.
+		It is a buffer of the calling thread's DigitPreprocessor and changes with the next call.
+	"""
+	# Extract image data safely, data has to outlive the view on its memory
+	data, pixels = image_view(image)
+	return DigitPreprocessor.for_current_thread()(pixels)
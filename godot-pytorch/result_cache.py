@@ -0,0 +1,103 @@
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+import model
+
+# Key kinds: the RGBA pixels an evaluation started from, and the prepared 28x28 digit
+INPUT = "input"
+DIGIT = "digit"
+KINDS = (INPUT, DIGIT)
+DEFAULT_MAX_ENTRIES = 64
+
+
+def array_key(kind: str, array: np.ndarray, model_name: str) -> tuple:
+	"""
+	Cache key of an image: a CRC-32 and an Adler-32 checksum of its bytes (64 bits from two
+	different algorithms), with its shape, the checkpoint and the inference mode, so a different
+	model or mode never returns another one's result. Both run at memory speed, a cryptographic
+	digest of a large drawing costs about as much as evaluating it.
+	"""
+	data = np.ascontiguousarray(array)
+	return (kind, model.ModelRegistry.resolve_name(model_name), model.INFERENCE_MODE, array.shape,
+			zlib.crc32(data), zlib.adler32(data))
+
+
+class ResultCache:
+	"""
+	Bounded LRU of evaluation results, (digit, probabilities) pairs.
+
+	A result is stored under the key of the input pixels and of the prepared 28x28 digit. An
+	unchanged drawing hits the input key and skips preprocessing and the forward pass, a
+	drawing that only moved or was redrawn the same hits the digit key and skips the forward
+	pass. The least recently used entry is dropped beyond max_entries, 0 disables the cache.
+
+	Every lookup counts as a hit or a miss of its kind. Thread safe.
+	"""
+
+	def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+		self.max_entries = max_entries
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = dict.fromkeys(KINDS, 0)
+		self.misses = dict.fromkeys(KINDS, 0)
+		self.evaluations = 0
+
+	def key(self, kind: str, array: np.ndarray, model_name: str):
+		"""
+		The key of an image, None while the cache is disabled (saves hashing).
+		"""
+		return array_key(kind, array, model_name) if self.max_entries > 0 else None
+
+	def lookup(self, key, new_evaluation: bool = True):
+		"""
+		The result stored under key, None if there is none. new_evaluation is False for the
+		digit key of an evaluation whose input key was already looked up.
+		"""
+		if key is None:
+			return None
+		with self._lock:
+			self.evaluations += new_evaluation
+			result = self._entries.get(key)
+			if result is None:
+				self.misses[key[0]] += 1
+				return None
+			self._entries.move_to_end(key)
+			self.hits[key[0]] += 1
+			return result
+
+	def store(self, result, *keys) -> None:
+		"""
+		Store a result under every key that isn't None.
+		"""
+		with self._lock:
+			for key in keys:
+				if key is None:
+					continue
+				self._entries[key] = result
+				self._entries.move_to_end(key)
+			while len(self._entries) > max(self.max_entries, 0):
+				self._entries.popitem(last=False)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._entries.clear()
+
+	def stats(self) -> dict:
+		"""
+		Hits per key kind, the number of entries and the hit rate: the share of evaluations
+		answered from the cache by either key.
+		"""
+		with self._lock:
+			evaluations = self.evaluations
+			answered = self.hits[INPUT] + self.hits[DIGIT]
+			return {
+				"input_hits": self.hits[INPUT],
+				"digit_hits": self.hits[DIGIT],
+				"misses": evaluations - answered,
+				"evaluations": evaluations,
+				"entries": len(self._entries),
+				"hit_rate": answered / evaluations if evaluations else 0.0,
+			}
@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+
+from preprocessing import THRESHOLD, DigitPreprocessor
+
+# Fractional bits of the brush centers and radii handed to cv2.circle
+SUBPIXEL_BITS = 4
+
+
+class StrokeCanvas:
+	"""
+	Grayscale copy of the drawing area, built from the brush stamps the paint control forwards
+	instead of reading the viewport back.
+
+	Every stamp only touches the pixels of its circle. The bounding box of the digit pixels
+	(not brighter than THRESHOLD) grows with the stamps, so digit() skips the grayscale,
+	threshold and bounding box steps over the whole drawing and only crops and resizes the box.
+	A bright stamp (the background color) over the digit can shrink the box, it is then found
+	again with one pass over the canvas.
+
+	version counts the changes, so a caller can tell whether the digit has to be evaluated again.
+	"""
+
+	def __init__(self):
+		self.gray = np.empty((0, 0), dtype=np.uint8)
+		self.version = 0
+		self._box = None  # (x1, y1, x2, y2) of the digit pixels, None if there are none
+		self._box_stale = False
+		self._preprocessor = DigitPreprocessor()
+
+	def reset(self, width: int, height: int, background: int) -> None:
+		"""
+		Start over with an empty drawing of the background shade (0-255).
+		"""
+		if self.gray.shape != (height, width):
+			self.gray = np.empty((height, width), dtype=np.uint8)
+		self.gray.fill(background)
+		self._box = (0, 0, width, height) if background <= THRESHOLD and width and height else None
+		self._box_stale = False
+		self.version += 1
+
+	def stamp(self, x: float, y: float, radius: float, shade: int) -> None:
+		"""
+		Draw a filled brush circle of the shade (0-255) centered on (x, y) in drawing area pixels.
+		"""
+		height, width = self.gray.shape
+		x1, y1 = max(0, int(x - radius) - 1), max(0, int(y - radius) - 1)
+		x2, y2 = min(width, int(x + radius) + 2), min(height, int(y + radius) + 2)
+		if x1 >= x2 or y1 >= y2:
+			return
+		# Draw into the dirty rectangle only
+		dirty = self.gray[y1:y2, x1:x2]
+		scale = 1 << SUBPIXEL_BITS
+		center = (round((x - x1) * scale), round((y - y1) * scale))
+		cv2.circle(dirty, center, round(radius * scale), int(shade), thickness=-1, lineType=cv2.LINE_8, shift=SUBPIXEL_BITS)
+		self.version += 1
+
+		if shade <= THRESHOLD:
+			mask = (dirty <= THRESHOLD).view(np.uint8)
+			bx, by, bw, bh = cv2.boundingRect(mask)
+			if bw and bh:
+				box = (x1 + bx, y1 + by, x1 + bx + bw, y1 + by + bh)
+				if self._box is not None:
+					box = (min(box[0], self._box[0]), min(box[1], self._box[1]), max(box[2], self._box[2]), max(box[3], self._box[3]))
+				self._box = box
+		elif self._box is not None and x1 < self._box[2] and x2 > self._box[0] and y1 < self._box[3] and y2 > self._box[1]:
+			self._box_stale = True
+
+	def digit(self):
+		"""
+		The (28, 28) uint8 MNIST style digit of the drawing like DigitPreprocessor returns it,
+		None if nothing is drawn. The array is reused by the next call.
+		"""
+		if self._box_stale:
+			bx, by, bw, bh = cv2.boundingRect((self.gray <= THRESHOLD).view(np.uint8))
+			self._box = (bx, by, bx + bw, by + bh) if bw and bh else None
+			self._box_stale = False
+		if self._box is None:
+			return None
+		x1, y1, x2, y2 = self._box
+		return self._preprocessor.crop_digit(self.gray, x1, y1, x2 - x1, y2 - y1)
@@ -2,7 +2,7 @@ extends Panel
 
 @onready var _parent: Control = get_parent()
 @onready var paint_control: Control = _parent.get_node(^"PaintControl")
-
+@onready var image_evaluator: Node2D = _parent.get_node(^"Evaluator")
 
 
 func _ready() -> void:
@@ -10,6 +10,8 @@ func _ready() -> void:
 	$ButtonUndo.pressed.connect(button_pressed.bind("undo_stroke"))
 	$ButtonSave.pressed.connect(button_pressed.bind("save_picture"))
 	$ButtonClear.pressed.connect(button_pressed.bind("clear_picture"))
+	# The label only follows the evaluator's copy of the drawing, the viewport isn't read back
+	image_evaluator.canvas_evaluated.connect(_on_canvas_evaluated)
 
 func _process(delta: float) -> void:
 	if Input.is_key_pressed(KEY_SPACE):
@@ -32,11 +34,17 @@ func button_pressed(button_name: String) -> void:
 func clear():
 		paint_control.brush_data_list.clear()
 		paint_control.queue_redraw()
+		paint_control.restart_canvas()
 
+# Evaluates the drawing now instead of at the next live_interval, the result arrives through canvas_evaluated.
 func evaluate_number():
-		var number = paint_control.evaluate_image()
-		$PredictedNumber.text = str(number);
-	
+		image_evaluator.evaluate_canvas()
+
+
+# Live prediction while drawing, the evaluator throttles it to one per live_interval.
+func _on_canvas_evaluated(digit: int, _probabilities: Array) -> void:
+	$PredictedNumber.text = str(digit) if digit >= 0 else "<null>"
+
 
 func brush_color_changed(color: Color) -> void:
 	# Change the brush color to whatever color the color picker is.
@@ -49,6 +57,7 @@ func background_color_changed(color: Color) -> void:
 	paint_control.bg_color = color
 	# Because of how the eraser works we also need to redraw the paint control.
 	paint_control.queue_redraw()
+	paint_control.restart_canvas()
 
 
 func brush_size_changed(value: float) -> void:
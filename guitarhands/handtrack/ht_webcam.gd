@@ -1,7 +1,14 @@
 extends TextureRect
 class_name HandTrackWebcam
 
+# Sequence number of the camera frame currently shown
+var last_frame_sequence = 0
+
 func _process(delta: float) -> void:
+	var frame_sequence:int = WebcamSocket.get_frame_sequence()
+	if frame_sequence == last_frame_sequence:
+		return
+	last_frame_sequence = frame_sequence
 	var img_texture:ImageTexture = WebcamSocket.get_handtracked_image()
 	if img_texture != null:
 		texture = img_texture
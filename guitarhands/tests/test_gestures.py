@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from webcam.gestures import DEFAULT_PRESS, HAND_LOST_TIMEOUT, SIDE_NAMES, GestureEngine
+from webcam.landmarks import LANDMARK_IDS, empty_landmarks
+
+FRAME_TIME = 1 / 30
+RIGHT = 1
+
+
+def pinching_landmarks(side):
+	# Every finger tip closer to the thumb tip than DEFAULT_PRESS presses it
+	landmarks = empty_landmarks()
+	distance = 0.5 / DEFAULT_PRESS
+	for i, name in enumerate(("INDEX_FINGER_TIP", "MIDDLE_FINGER_TIP", "RING_FINGER_TIP", "PINKY_TIP")):
+		landmarks[side, LANDMARK_IDS[name]] = (distance, 0.01 * i, 0.0)
+	return landmarks
+
+
+def result(sequence, landmarks, valid, tracked):
+	# The fields of a webcam.tracking.TrackingResult GestureEngine reads
+	return SimpleNamespace(sequence=sequence, capture_time=sequence * FRAME_TIME, landmarks=landmarks,
+						   valid=np.array(valid), tracked=np.array(tracked))
+
+
+def test_pinch_presses_fingers():
+	engine = GestureEngine()
+	engine.update(result(1, pinching_landmarks(RIGHT), [False, True], [False, True]))
+	assert engine.pressed[RIGHT].all()
+	assert [pressed for _, _, pressed in engine.pop_transitions()] == [True] * 4
+
+
+def test_missed_detection_keeps_fingers_pressed():
+	engine = GestureEngine()
+	landmarks = pinching_landmarks(RIGHT)
+	engine.update(result(1, landmarks, [False, True], [False, True]))
+	engine.pop_transitions()
+	# The tracker keeps the last landmarks of a hand it missed in one frame
+	engine.update(result(2, landmarks, [False, True], [False, False]))
+	assert engine.pressed[RIGHT].all()
+	assert engine.pop_transitions() == []
+
+
+def test_hand_leaving_the_view_releases_its_fingers():
+	engine = GestureEngine()
+	landmarks = pinching_landmarks(RIGHT)
+	engine.update(result(1, landmarks, [False, True], [False, True]))
+	engine.pop_transitions()
+
+	# The hand is gone but the tracker still reports its last landmarks as valid
+	lost_frames = int(HAND_LOST_TIMEOUT / FRAME_TIME) + 2
+	for sequence in range(2, 2 + lost_frames):
+		engine.update(result(sequence, landmarks, [False, True], [False, False]))
+
+	assert not engine.pressed.any()
+	transitions = engine.pop_transitions()
+	assert sorted(finger for _, finger, _ in transitions) == ["INDEX", "MIDDLE", "PINKY", "RING"]
+	assert {side for side, _, _ in transitions} == {SIDE_NAMES[RIGHT]}
+	assert not any(pressed for _, _, pressed in transitions)
+	_, valid = engine.pop_values()
+	assert not valid[RIGHT]
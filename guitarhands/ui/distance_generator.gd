@@ -1,93 +1,47 @@
 extends VBoxContainer
 
 @export var side:String
-# Create a new InputEventKey
-@onready var _LTrack = InputEventAction.new()
-@onready var _MLTrack = InputEventAction.new()
-@onready var _MRTrack = InputEventAction.new()
-@onready var _RTrack = InputEventAction.new()
 
-func _ready() -> void:
-	# Configure the event
-	_LTrack.action = "LTrack"  
-	_MLTrack.action = "MLTrack"  
-	_MRTrack.action = "MRTrack"  
-	_RTrack.action = "RTrack"  
-	
-func _process(delta: float) -> void:
-	
-	if Input.is_action_just_pressed("Calibrate"):
-		$Index.min_value = 1/WebcamSocket.get_landmark_distance("THUMB_TIP", "INDEX_FINGER_TIP", side)
-		$Middle.min_value = 1/WebcamSocket.get_landmark_distance("THUMB_TIP", "MIDDLE_FINGER_TIP", side)
-		$Ring.min_value = 1/WebcamSocket.get_landmark_distance("THUMB_TIP", "RING_FINGER_TIP", side)
-		$Pinky.min_value = 1/WebcamSocket.get_landmark_distance("THUMB_TIP", "PINKY_TIP", side)
-
-	if Input.is_action_just_released("Calibrate"):
-		$Index.max_value = 0.9/WebcamSocket.get_landmark_distance("THUMB_TIP", "INDEX_FINGER_TIP", side)
-		$Middle.max_value = 0.9/WebcamSocket.get_landmark_distance("THUMB_TIP", "MIDDLE_FINGER_TIP", side)
-		$Ring.max_value = 0.9/WebcamSocket.get_landmark_distance("THUMB_TIP", "RING_FINGER_TIP", side)
-		$Pinky.max_value = 0.8/WebcamSocket.get_landmark_distance("THUMB_TIP", "PINKY_TIP", side)
-
-	$Index.value = 1/WebcamSocket.get_landmark_distance("THUMB_TIP", "INDEX_FINGER_TIP", side)
-	$Middle.value = 1/WebcamSocket.get_landmark_distance("THUMB_TIP", "MIDDLE_FINGER_TIP", side)
-	$Ring.value = 1/WebcamSocket.get_landmark_distance("THUMB_TIP", "RING_FINGER_TIP", side)
-	$Pinky.value = 1/WebcamSocket.get_landmark_distance("THUMB_TIP", "PINKY_TIP", side)
-
-	if side == "RIGHT":
-		if $Index.value >= $Index.max_value and not _LTrack.pressed: 
-			_LTrack.pressed = true # Simulate a key press
-			get_tree().root.push_input(_LTrack) # Push the event to the Viewport
-			print(_LTrack)
-		elif $Index.value < $Index.max_value and _LTrack.pressed:
-			_LTrack.pressed = false
-			get_tree().root.push_input(_LTrack)
-
-		if $Middle.value >= $Middle.max_value and not _MLTrack.pressed: 
-			_MLTrack.pressed = true 
-			get_tree().root.push_input(_MLTrack)
-		elif $Middle.value < $Middle.max_value and _MLTrack.pressed:
-			_MLTrack.pressed = false
-			get_tree().root.push_input(_MLTrack)
+# Input action each finger of a hand presses, the left hand mirrors the right one
+const FINGER_ACTIONS = {
+	"RIGHT": {"INDEX": "LTrack", "MIDDLE": "MLTrack", "RING": "MRTrack", "PINKY": "RTrack"},
+	"LEFT": {"INDEX": "RTrack", "MIDDLE": "MRTrack", "RING": "MLTrack", "PINKY": "LTrack"},
+}
 
-		if $Ring.value >= $Ring.max_value and not _MRTrack.pressed: 
-			_MRTrack.pressed = true 
-			get_tree().root.push_input(_MRTrack)
-		elif $Ring.value < $Ring.max_value and _MRTrack.pressed:
-			_MRTrack.pressed = false
-			get_tree().root.push_input(_MRTrack)
+@onready var _bars = [$Index, $Middle, $Ring, $Pinky]
 
-		if $Pinky.value >= $Pinky.max_value and not _RTrack.pressed: 
-			_RTrack.pressed = true 
-			get_tree().root.push_input(_RTrack)
-		elif $Pinky.value < $Pinky.max_value and _RTrack.pressed:
-			_RTrack.pressed = false
-			get_tree().root.push_input(_RTrack)
-			
-	elif side == "LEFT":
-		if $Index.value >= $Index.max_value and not _RTrack.pressed: 
-			_RTrack.pressed = false
-			get_tree().root.push_input(_RTrack)
-		elif $Index.value < $Index.max_value and _RTrack.pressed:
-			_RTrack.pressed = false
-			get_tree().root.push_input(_RTrack)
-
-		if $Middle.value >= $Middle.max_value and not _MRTrack.pressed: 
-			_MRTrack.pressed = true 
-			get_tree().root.push_input(_MRTrack)
-		elif $Middle.value < $Middle.max_value and _MRTrack.pressed:
-			_MRTrack.pressed = false
-			get_tree().root.push_input(_MRTrack)
-
-		if $Ring.value >= $Ring.max_value and not _MLTrack.pressed: 
-			_MLTrack.pressed = true
-			get_tree().root.push_input(_MLTrack) 
-		elif $Ring.value < $Ring.max_value and _MLTrack.pressed:
-			_MLTrack.pressed = false
-			get_tree().root.push_input(_MLTrack)
-
-		if $Pinky.value >= $Pinky.max_value and not _RTrack.pressed: 
-			_RTrack.pressed = true 
-			get_tree().root.push_input(_RTrack) 
-		elif $Pinky.value < $Pinky.max_value and _RTrack.pressed:
-			_RTrack.pressed = true
-			get_tree().root.push_input(_RTrack) 
+func _ready() -> void:
+	# Presses are detected in WebcamSocket after every inference, only their transitions arrive here
+	WebcamSocket.finger_state_changed.connect(_on_finger_state_changed)
+	WebcamSocket.finger_values_changed.connect(_on_finger_values_changed)
+	_show_calibration()
+
+func _input(event: InputEvent) -> void:
+	# Hold Calibrate with the hand open, release it while pinching the fingers
+	if event.is_action_pressed("Calibrate"):
+		WebcamSocket.calibrate_open(side)
+		_show_calibration()
+	elif event.is_action_released("Calibrate"):
+		WebcamSocket.calibrate_pinch(side)
+		_show_calibration()
+
+func _on_finger_state_changed(hand:String, finger:String, pressed:bool) -> void:
+	if hand != side:
+		return
+	var action = InputEventAction.new()
+	action.action = FINGER_ACTIONS[side][finger]
+	action.pressed = pressed
+	get_tree().root.push_input(action) # Push the event to the Viewport
+
+func _on_finger_values_changed(hand:String, values:PackedFloat32Array) -> void:
+	if hand != side:
+		return
+	for i in _bars.size():
+		_bars[i].value = values[i]
+
+func _show_calibration() -> void:
+	# Bars run from the open value to the value that presses the finger
+	var calibration:PackedFloat32Array = WebcamSocket.get_calibration(side)
+	for i in _bars.size():
+		_bars[i].min_value = calibration[i]
+		_bars[i].max_value = calibration[_bars.size() + i]
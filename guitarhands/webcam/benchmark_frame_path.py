@@ -0,0 +1,81 @@
+"""
+Per frame cost of the webcam frame path before and after the FrameConverter rework.
+
+	before - get_handtracked_image as it used to be: BGR->RGB, flip, RGB->BGR for drawing,
+	         draw, BGR->RGB, np.ascontiguousarray
+	after  - FrameConverter.mirrored_rgb (flip + in place BGR->RGB into a reused buffer), draw in RGB
+
+The overlay is two hands of 21 landmarks drawn with cv2.line/cv2.circle like
+drawing_utils.draw_landmarks, so MediaPipe is not needed. Run from the guitarhands directory:
+
+	python -m webcam.benchmark_frame_path
+	python -m webcam.benchmark_frame_path --resolutions 1280x720 1920x1080 --iterations 200
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from webcam.frames import FrameConverter
+
+# HAND_CONNECTIONS of MediaPipe Hands
+HAND_CONNECTIONS = ((0, 1), (1, 2), (2, 3), (3, 4), (0, 5), (5, 6), (6, 7), (7, 8), (5, 9), (9, 10), (10, 11),
+					(11, 12), (9, 13), (13, 14), (14, 15), (15, 16), (13, 17), (0, 17), (17, 18), (18, 19), (19, 20))
+
+
+def draw_hands(image, hands, landmark_color):
+	for points in hands:
+		for start, end in HAND_CONNECTIONS:
+			cv2.line(image, points[start], points[end], (224, 224, 224), 2)
+		for point in points:
+			cv2.circle(image, point, 2, landmark_color, 2)
+
+
+def before(frame, hands):
+	image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+	image_rgb = cv2.flip(image_rgb, 1)
+	image_bgr = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
+	draw_hands(image_bgr, hands, (0, 0, 255))
+	frame_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+	return np.ascontiguousarray(frame_rgb, dtype=np.uint8)
+
+
+def after(converter, frame, hands):
+	frame_rgb = converter.mirrored_rgb(frame)
+	draw_hands(frame_rgb, hands, (255, 0, 0))
+	return frame_rgb
+
+
+def median_ms(call, iterations):
+	call()  # warm up
+	times = []
+	for _ in range(iterations):
+		start = time.perf_counter()
+		call()
+		times.append(time.perf_counter() - start)
+	return np.median(times) * 1000
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--resolutions", nargs="+", default=["640x480", "1280x720", "1920x1080"])
+	parser.add_argument("--iterations", type=int, default=100)
+	args = parser.parse_args()
+
+	rng = np.random.default_rng(0)
+	converter = FrameConverter()
+	print(f"{'resolution':>10} {'before':>9} {'after':>9} {'speedup':>8} {'identical':>9}")
+	for resolution in args.resolutions:
+		width, height = (int(value) for value in resolution.split("x"))
+		frame = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+		hands = [[(int(x), int(y)) for x, y in zip(rng.integers(0, width, 21), rng.integers(0, height, 21))] for _ in range(2)]
+
+		identical = np.array_equal(before(frame, hands), after(converter, frame, hands))
+		before_ms = median_ms(lambda: before(frame, hands), args.iterations)
+		after_ms = median_ms(lambda: after(converter, frame, hands), args.iterations)
+		print(f"{resolution:>10} {before_ms:>7.2f}ms {after_ms:>7.2f}ms {before_ms / after_ms:>7.1f}x {str(identical):>9}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,307 @@
+"""
+End-to-end benchmark of the webcam_socket tracking pipeline on a recorded clip, runs without Godot.
+
+The py4godot types webcam_socket uses (Image, ImageTexture, PackedByteArray, Array, ...) are
+replaced by small stand-ins, everything else is the real pipeline: the clip is replayed
+through sources.open_source at --fps, captured, tracked with MediaPipe and read back by a
+simulated game loop at --render-fps that calls get_handtracked_image for every new frame and
+_process every tick, like ht_webcam.gd and the WebcamSocket autoload.
+
+Reported (and written as JSON):
+	capture->landmark latency  time from capture to the published landmarks, p50/p95/p99
+	throughput                 captured frames, inferences and displayed frames per second
+	dropped frames             frames that were never tracked
+	landmark jitter            RMS of the frame to frame change in landmark velocity (normalized units),
+	                           of the raw and the smoothed (smooth_landmarks) landmarks
+	call timings               get_handtracked_image and _process (gesture signals) in ms
+
+Usage, from the guitarhands directory:
+	python -m webcam.benchmark_tracking --record clip --duration 10     # record a clip from camera 0
+	python -m webcam.benchmark_tracking clip --output tracking.json
+	python -m webcam.benchmark_tracking clip.mp4 --fps 60 --tracking-mode hands --inference-rate 0
+	python -m webcam.benchmark_tracking clip --worker
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import types
+
+import cv2
+import numpy as np
+
+
+class StandInPackedByteArray:
+	def __init__(self, data=b""):
+		self.data = bytes(data)
+
+	@staticmethod
+	def from_memory_view(view):
+		return StandInPackedByteArray(view)
+
+	def to_float32_array(self):
+		return np.frombuffer(self.data, dtype=np.float32)
+
+
+class StandInImage:
+	def __init__(self):
+		self.width = self.height = 0
+		self.data = None
+
+	@staticmethod
+	def new():
+		return StandInImage()
+
+	@staticmethod
+	def create_from_data(width, height, mipmaps, image_format, data):
+		image = StandInImage()
+		image.set_data(width, height, mipmaps, image_format, data)
+		return image
+
+	def set_data(self, width, height, mipmaps, image_format, data):
+		self.width, self.height, self.data = width, height, data
+
+
+class StandInImageTexture:
+	def __init__(self, image=None):
+		self.image = image
+		self.updates = 0
+
+	@staticmethod
+	def create_from_image(image):
+		return StandInImageTexture(image)
+
+	def update(self, image):
+		self.image = image
+		self.updates += 1
+
+
+class StandInArray(list):
+	def size(self):
+		return len(self)
+
+
+class StandInDictionary(dict):
+	@staticmethod
+	def new0():
+		return StandInDictionary()
+
+	def get_or_add(self, key, value):
+		return self.setdefault(key, value)
+
+
+class StandInSignal:
+	def __init__(self, arguments):
+		self.emitted = 0
+
+	def emit(self, *arguments):
+		self.emitted += 1
+
+
+class StandInVector3(tuple):
+	@staticmethod
+	def new3(x, y, z):
+		return StandInVector3((x, y, z))
+
+
+def install_godot_stand_ins():
+	"""
+	Register stand-in py4godot modules, so webcam_socket can be imported outside of Godot.
+	"""
+	def module(name, **attributes):
+		stand_in = types.ModuleType(name)
+		stand_in.__dict__.update(attributes)
+		sys.modules[name] = stand_in
+		return stand_in
+
+	module("py4godot", gdproperty=lambda kind, default: default, signal=StandInSignal,
+		   SignalArg=lambda name, kind: (name, kind))
+	module("py4godot.classes", gdclass=lambda cls: cls)
+	module("py4godot.classes.Image", Image=StandInImage)
+	module("py4godot.classes.ImageTexture", ImageTexture=StandInImageTexture)
+	module("py4godot.classes.Node", Node=object)
+	module("py4godot.classes.core", Array=StandInArray, Dictionary=StandInDictionary, Vector3=StandInVector3,
+		   PackedByteArray=StandInPackedByteArray, PackedFloat32Array=np.ndarray)
+
+
+def percentiles(values):
+	values = np.asarray(values, dtype=np.float64)
+	if not len(values):
+		return {"count": 0}
+	return {
+		"count": len(values),
+		"p50": float(np.percentile(values, 50)),
+		"p95": float(np.percentile(values, 95)),
+		"p99": float(np.percentile(values, 99)),
+		"mean": float(values.mean()),
+	}
+
+
+def landmark_jitter(snapshots):
+	"""
+	RMS of the second difference of every landmark over consecutive results in which the hand was tracked.
+	"""
+	accelerations = []
+	for previous, current, following in zip(snapshots, snapshots[1:], snapshots[2:]):
+		tracked = previous[1] & current[1] & following[1]
+		if tracked.any():
+			accelerations.append((following[0] - 2 * current[0] + previous[0])[tracked, :, :2].reshape(-1, 2))
+	if not accelerations:
+		return None
+	accelerations = np.concatenate(accelerations)
+	return float(np.sqrt(np.mean(np.sum(accelerations ** 2, axis=1))))
+
+
+def record(directory, duration, camera):
+	os.makedirs(directory, exist_ok=True)
+	capture = cv2.VideoCapture(camera)
+	end = time.monotonic() + duration
+	count = 0
+	while time.monotonic() < end:
+		ret, frame = capture.read()
+		if not ret:
+			break
+		cv2.imwrite(os.path.join(directory, f"{count:06d}.png"), frame)
+		count += 1
+	capture.release()
+	print(f"Recorded {count} frames to {directory}")
+
+
+def run(args):
+	install_godot_stand_ins()
+	from webcam.webcam_socket import webcam_socket
+
+	socket = webcam_socket()
+	socket.frame_source = args.source
+	socket.loop_recording = False
+	socket.capture_fps = args.fps
+	socket.inference_rate = args.inference_rate
+	socket.tracking_mode = args.tracking_mode
+	socket.hand_roi = args.hand_roi
+	socket.adaptive_quality = not args.fixed_quality
+	socket.use_worker_process = args.worker
+	socket._ready()
+	# The frame source and capture, or the worker process doing both
+	source = socket.worker or socket.cap
+	capture = socket.worker or socket.capture
+
+	tick = 1.0 / args.render_fps
+	image_ms, process_ms, latencies_ms, snapshots, smoothed = [], [], [], [], []
+	displayed = 0
+	last_frame = last_result = 0
+	start = time.monotonic()
+	# Throughput is measured from the first frame, not counting model loading
+	first_frame_at = None
+	source_closed_at = None
+
+	while time.monotonic() - start < args.max_duration:
+		tick_start = time.monotonic()
+		result = socket.tracker.latest
+		if result.sequence != last_result:
+			last_result = result.sequence
+			latencies_ms.append((result.inference_time - result.capture_time) * 1000)
+			snapshots.append((result.landmarks.copy(), result.tracked.copy()))
+			filtered = socket._latest_tracking()
+			smoothed.append((filtered.landmarks.copy(), filtered.tracked.copy()))
+		# Stop once the replay ended and its last frame was tracked (or tracking gave up on it)
+		if not source.isOpened():
+			source_closed_at = source_closed_at or time.monotonic()
+			if last_result == capture.sequence or time.monotonic() - source_closed_at > 2.0:
+				break
+
+		frame_sequence = socket.get_frame_sequence()
+		if frame_sequence != last_frame:
+			last_frame = frame_sequence
+			first_frame_at = first_frame_at or time.monotonic()
+			call_start = time.perf_counter()
+			socket.get_handtracked_image()
+			image_ms.append((time.perf_counter() - call_start) * 1000)
+			displayed += 1
+
+		call_start = time.perf_counter()
+		socket._process(tick)
+		process_ms.append((time.perf_counter() - call_start) * 1000)
+
+		time.sleep(max(0.0, tick - (time.monotonic() - tick_start)))
+
+	elapsed = time.monotonic() - (first_frame_at or start)
+	captured = capture.sequence
+	replaced = capture.dropped_frames
+	level = socket.governor.level
+	transitions = socket.finger_state_changed.emitted
+	socket._exit_tree()
+
+	return {
+		"metadata": {
+			"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+			"python": platform.python_version(),
+			"platform": platform.platform(),
+			"opencv": cv2.__version__,
+			"source": args.source,
+			"fps": args.fps,
+			"render_fps": args.render_fps,
+			"inference_rate": args.inference_rate,
+			"tracking_mode": args.tracking_mode,
+			"hand_roi": args.hand_roi,
+			"worker_process": args.worker,
+			"final_quality_level": level,
+		},
+		"capture_to_landmark_ms": percentiles(latencies_ms),
+		"throughput": {
+			"seconds": elapsed,
+			"captured_fps": captured / elapsed,
+			"inference_fps": len(latencies_ms) / elapsed,
+			"displayed_fps": displayed / elapsed,
+		},
+		"dropped_frames": {
+			"captured": captured,
+			"tracked": len(latencies_ms),
+			"not_tracked": captured - len(latencies_ms),
+			"replaced_before_read": replaced,
+		},
+		"landmark_jitter": landmark_jitter(snapshots),
+		"smoothed_landmark_jitter": landmark_jitter(smoothed),
+		"get_handtracked_image_ms": percentiles(image_ms),
+		"process_ms": percentiles(process_ms),
+		"finger_transitions": transitions,
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("source", nargs="?", help="video file or directory of frames to replay")
+	parser.add_argument("--record", metavar="DIRECTORY", help="record a clip from --camera instead of benchmarking")
+	parser.add_argument("--camera", type=int, default=0)
+	parser.add_argument("--duration", type=float, default=10.0, help="length of a recording in seconds")
+	parser.add_argument("--fps", type=float, default=30.0, help="replay speed, 0 for as fast as possible")
+	parser.add_argument("--render-fps", type=float, default=144.0, help="rate of the simulated game loop")
+	parser.add_argument("--inference-rate", type=float, default=30.0)
+	parser.add_argument("--tracking-mode", default="pose", choices=["pose", "hands"])
+	parser.add_argument("--hand-roi", action="store_true")
+	parser.add_argument("--fixed-quality", action="store_true", help="disable the latency governor")
+	parser.add_argument("--worker", action="store_true", help="capture and track in a worker process (use_worker_process)")
+	parser.add_argument("--max-duration", type=float, default=300.0)
+	parser.add_argument("--output", default="tracking_benchmark.json")
+	args = parser.parse_args()
+
+	if args.record:
+		record(args.record, args.duration, args.camera)
+		return
+	if not args.source:
+		parser.error("a source to replay is required")
+
+	report = run(args)
+	with open(args.output, "w") as f:
+		json.dump(report, f, indent=2)
+	latency = report["capture_to_landmark_ms"]
+	if latency["count"]:
+		print(f"capture->landmark p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms")
+	print(f"{report['throughput']['inference_fps']:.1f} inferences/s, {report['dropped_frames']['not_tracked']} "
+		  f"of {report['dropped_frames']['captured']} frames not tracked, jitter {report['landmark_jitter']}")
+	print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import numpy as np
+
+# Pause after a failed read before trying again, so a missing camera doesn't spin a core
+READ_RETRY_DELAY = 0.01
+
+
+class FrameCapture:
+	"""
+	Reads frames from a cv2.VideoCapture (or anything with read() and isOpened()) on a
+	background thread and keeps only the newest one.
+
+	There is a single frame slot: a new frame replaces the previous one whether it was read or
+	not, so readers never wait for the camera and never see old frames pile up. Every frame gets
+	a sequence number (starting at 1) and the time.monotonic() timestamp of its capture, readers
+	compare sequence numbers to skip frames they already handled. Frames are handed out as they
+	are, readers must not modify them.
+	"""
+
+	def __init__(self, source):
+		self.source = source
+		self.dropped_frames = 0  # frames replaced before anybody read them
+		self._condition = threading.Condition()
+		self._frame = None
+		self._sequence = 0
+		self._timestamp = 0.0
+		self._read_sequence = 0
+		self._running = False
+		self._thread = None
+
+	def start(self) -> None:
+		if self._running:
+			return
+		self._running = True
+		self._thread = threading.Thread(target=self._run, name="webcam-capture", daemon=True)
+		self._thread.start()
+
+	def stop(self, timeout:float=1.0) -> None:
+		self._running = False
+		with self._condition:
+			self._condition.notify_all()
+		if self._thread is not None:
+			self._thread.join(timeout)
+			self._thread = None
+
+	def is_opened(self) -> bool:
+		return bool(self.source.isOpened())
+
+	@property
+	def sequence(self) -> int:
+		return self._sequence
+
+	def latest(self):
+		"""
+		(sequence, timestamp, frame) of the newest frame, (0, 0.0, None) before the first one.
+		"""
+		with self._condition:
+			self._read_sequence = self._sequence
+			return self._sequence, self._timestamp, self._frame
+
+	def wait_for_newer(self, sequence:int, timeout:float=None):
+		"""
+		Block until a frame newer than sequence arrived, then return it like latest().
+		Returns the current frame if the timeout expired or the capture stopped.
+		"""
+		with self._condition:
+			self._condition.wait_for(lambda: self._sequence > sequence or not self._running, timeout)
+			self._read_sequence = self._sequence
+			return self._sequence, self._timestamp, self._frame
+
+	def _run(self) -> None:
+		while self._running:
+			if not self.source.isOpened():
+				time.sleep(READ_RETRY_DELAY)
+				continue
+			ret, frame = self.source.read()
+			if not ret:
+				time.sleep(READ_RETRY_DELAY)
+				continue
+			self._publish(frame)
+
+	def _publish(self, frame:np.ndarray) -> None:
+		with self._condition:
+			if self._sequence > self._read_sequence:
+				self.dropped_frames += 1
+			self._frame = frame
+			self._sequence += 1
+			self._timestamp = time.monotonic()
+			self._condition.notify_all()
@@ -0,0 +1,124 @@
+import dataclasses
+import math
+import threading
+
+import numpy as np
+
+from webcam.landmarks import empty_landmarks
+from webcam.tracking import TrackingResult
+
+# Shortest time step the filter uses, for results that share a capture timestamp
+MIN_TIME_STEP = 1e-3
+# Landmarks are extrapolated at most this far past their capture
+MAX_PREDICTION = 0.15
+# Weight of a new sample in the moving average of the capture to landmark latency
+LATENCY_SMOOTHING = 0.1
+
+
+def smoothing_factor(cutoff, time_step):
+	"""
+	Exponential smoothing factor of a first order low pass filter with the cutoff frequency in Hz.
+	"""
+	r = 2 * math.pi * cutoff * time_step
+	return r / (r + 1)
+
+
+class OneEuroFilter:
+	"""
+	One Euro filter (Casiez, Roussel, Vogel 2012) over an array of signals, vectorized.
+
+	Every value is low pass filtered with a cutoff that grows with its (filtered) speed:
+	min_cutoff (Hz) removes jitter while a value holds still, beta lets the cutoff follow fast
+	movements so they don't lag, d_cutoff filters the speed estimate itself.
+
+	The first axis holds independent groups (the hands) with their own timestamps. update()
+	only advances the active groups; an inactive group keeps its value with zero speed and
+	starts over from the new values once it's active again.
+	"""
+
+	def __init__(self, shape, min_cutoff:float=1.0, beta:float=5.0, d_cutoff:float=1.0):
+		self.min_cutoff = min_cutoff
+		self.beta = beta
+		self.d_cutoff = d_cutoff
+		self.value = np.zeros(shape, dtype=np.float32)
+		self.speed = np.zeros(shape, dtype=np.float32)
+		self.time = np.full(shape[0], np.nan)
+		self.active = np.zeros(shape[0], dtype=bool)
+
+	def update(self, values:np.ndarray, t:float, active:np.ndarray):
+		"""
+		Filter the values sampled at time t (seconds) for the active groups. Returns the filtered values and their speeds.
+		"""
+		groups = (-1,) + (1,) * (values.ndim - 1)
+		restart = (active & ~self.active).reshape(groups)
+		time_step = np.maximum(np.nan_to_num(t - self.time, nan=MIN_TIME_STEP), MIN_TIME_STEP).reshape(groups)
+
+		speed = self.speed + smoothing_factor(self.d_cutoff, time_step) * ((values - self.value) / time_step - self.speed)
+		cutoff = self.min_cutoff + self.beta * np.abs(speed)
+		value = self.value + smoothing_factor(cutoff, time_step) * (values - self.value)
+
+		update = active.reshape(groups)
+		self.value = np.where(restart, values, np.where(update, value, self.value)).astype(np.float32)
+		self.speed = np.where(update & ~restart, speed, 0.0).astype(np.float32)
+		self.time = np.where(active, t, self.time)
+		self.active = active.copy()
+		return self.value, self.speed
+
+	def predict(self, t:float, horizon:float=MAX_PREDICTION) -> np.ndarray:
+		"""
+		The filtered values extrapolated with their speed to time t, at most horizon seconds past their last sample.
+		"""
+		ahead = np.clip(np.nan_to_num(t - self.time, nan=0.0), 0.0, horizon)
+		return self.value + self.speed * ahead.reshape((-1,) + (1,) * (self.value.ndim - 1))
+
+
+class LandmarkFilter:
+	"""
+	Smooths the landmarks of consecutive TrackingResults with a OneEuroFilter over the (2, 21, 3) array.
+
+	Hands are filtered while they are tracked, timed by the capture time of their frames; a hand
+	that wasn't tracked in a frame keeps its last filtered landmarks. Besides the smoothed
+	result (latest), the filter keeps the landmark speeds, which predict() uses to extrapolate
+	the landmarks to a later time, e.g. to now to hide the capture and inference latency.
+	It also averages the capture to landmark latency.
+
+	update() can run on the tracking thread, each result is filtered once.
+	"""
+
+	def __init__(self, min_cutoff:float=1.0, beta:float=5.0, d_cutoff:float=1.0):
+		self.filter = OneEuroFilter(empty_landmarks().shape, min_cutoff, beta, d_cutoff)
+		self.latest = TrackingResult()
+		self.latency_ms = 0.0
+		self._lock = threading.Lock()
+
+	def update(self, tracking:TrackingResult) -> TrackingResult:
+		"""
+		Filter a result, returns it with smoothed landmarks.
+		"""
+		with self._lock:
+			if tracking.sequence <= self.latest.sequence:
+				return self.latest
+			value, _ = self.filter.update(tracking.landmarks, tracking.capture_time, tracking.tracked)
+			# Hands the filter never saw keep their landmarks as they are
+			seen = ~np.isnan(self.filter.time)
+			landmarks = np.where(seen[:, None, None], value, tracking.landmarks).astype(np.float32)
+			latency_ms = (tracking.inference_time - tracking.capture_time) * 1000
+			self.latency_ms = latency_ms if self.latency_ms == 0.0 else self.latency_ms + LATENCY_SMOOTHING * (latency_ms - self.latency_ms)
+			self.latest = dataclasses.replace(tracking, landmarks=landmarks)
+			return self.latest
+
+	def predict(self, t:float, horizon:float=MAX_PREDICTION):
+		"""
+		(landmarks, valid) of the newest result, extrapolated to time t (time.monotonic()).
+		"""
+		with self._lock:
+			seen = ~np.isnan(self.filter.time)
+			landmarks = np.where(seen[:, None, None], self.filter.predict(t, horizon), self.latest.landmarks)
+			return landmarks.astype(np.float32), self.latest.valid.copy()
+
+	def predicted(self, tracking:TrackingResult, t:float) -> TrackingResult:
+		"""
+		A filtered result with its landmarks extrapolated to time t.
+		"""
+		landmarks, _ = self.predict(t)
+		return dataclasses.replace(tracking, landmarks=landmarks)
@@ -0,0 +1,190 @@
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from webcam.landmarks import HAND_SIDES, LANDMARK_COUNT
+
+# Identifies the layout below, bump the last digit when it changes
+RING_MAGIC = 0x4748524E47000001
+
+# Image planes of a slot, both mirrored RGB8
+CAMERA_PLANE = 0
+HANDTRACKED_PLANE = 1  # with the landmarks drawn on it
+PLANE_COUNT = 2
+
+# Worker states
+WORKER_STARTING = 0
+WORKER_RUNNING = 1
+WORKER_SOURCE_FAILED = 2
+WORKER_SOURCE_ENDED = 3
+
+HEADER_DTYPE = np.dtype([
+	("magic", np.int64),
+	# Written by the worker
+	("worker_pid", np.int64),
+	("state", np.int64),
+	("heartbeat", np.float64),  # time.monotonic() of the worker's last loop iteration
+	("frame_sequence", np.int64),  # newest published frame, 0 before the first one
+	("frame_slot", np.int64),  # frame slot holding it
+	("result_sequence", np.int64),  # frame sequence of the newest tracking result, 0 before the first one
+	("result_slot", np.int64),  # result slot holding it
+	("dropped_frames", np.int64),
+	("quality_level", np.int64),
+	("latency_ms", np.float64),
+	# Written by the node, the worker applies them when control_version changes
+	("control_version", np.int64),
+	("stop", np.int64),
+	("inference_rate", np.float64),
+	("tracking_mode", np.int64),  # index into tracking.TRACKING_MODES
+	("pose_interval", np.int64),
+	("hand_roi", np.int64),
+	("quality_request", np.int64),  # -1 for none
+], align=True)
+
+FRAME_DTYPE = np.dtype([
+	("version", np.int64),  # odd while the worker writes the slot
+	("sequence", np.int64),
+	("capture_time", np.float64),
+	("width", np.int64),
+	("height", np.int64),
+], align=True)
+
+# A tracking.TrackingResult without the MediaPipe objects
+RESULT_DTYPE = np.dtype([
+	("version", np.int64),  # odd while the worker writes the slot
+	("sequence", np.int64),
+	("capture_time", np.float64),
+	("inference_time", np.float64),
+	("inference_ms", np.float64),
+	("ran_pose", np.bool_),
+	("valid", np.bool_, (len(HAND_SIDES),)),
+	("tracked", np.bool_, (len(HAND_SIDES),)),
+	("landmarks", np.float32, (len(HAND_SIDES), LANDMARK_COUNT, 3)),
+], align=True)
+
+ALIGNMENT = 64
+
+
+def _aligned(size:int) -> int:
+	return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _attach_shared_memory(name:str) -> shared_memory.SharedMemory:
+	"""
+	Attach to an existing block without handing it to this process' resource tracker, which
+	would otherwise unlink it when the worker exits (before Python 3.13 there is no track=False).
+	"""
+	try:
+		return shared_memory.SharedMemory(name=name, track=False)
+	except TypeError:
+		block = shared_memory.SharedMemory(name=name)
+		if os.name == "posix":
+			from multiprocessing import resource_tracker
+			resource_tracker.unregister(block._name, "shared_memory")
+		return block
+
+
+class FrameRing:
+	"""
+	Frames and landmarks published by the tracking worker process through shared memory.
+
+	The block holds a header (worker state, heartbeat, the newest frame and result, and control
+	values the node writes), then two rings of slot_count slots: frames, each with a camera and a
+	handtracked RGB8 plane of up to width x height pixels, and tracking results with their
+	(2, 21, 3) landmarks. Results are published as soon as the tracker has them, frames as they
+	are captured. The worker always writes the slot after the newest one, so a reader of the
+	newest slot has slot_count - 1 intervals before it gets overwritten. Each slot carries a
+	version that is odd while it is written (a seqlock): readers take the version, read, and
+	retry if it changed or was odd.
+
+	The node creates the ring (and unlinks it on close), the worker attaches to it by name.
+	"""
+
+	def __init__(self, block:shared_memory.SharedMemory, slot_count:int, width:int, height:int, owner:bool):
+		self.block = block
+		self.slot_count = slot_count
+		self.width = width
+		self.height = height
+		self.owner = owner
+		self.plane_bytes = _aligned(width * height * 3)
+		frames_offset = _aligned(HEADER_DTYPE.itemsize)
+		results_offset = frames_offset + _aligned(FRAME_DTYPE.itemsize * slot_count)
+		planes_offset = results_offset + _aligned(RESULT_DTYPE.itemsize * slot_count)
+		self.header = np.ndarray((), HEADER_DTYPE, buffer=block.buf, offset=0)
+		self.frames = np.ndarray((slot_count,), FRAME_DTYPE, buffer=block.buf, offset=frames_offset)
+		self.results = np.ndarray((slot_count,), RESULT_DTYPE, buffer=block.buf, offset=results_offset)
+		self._planes = np.ndarray((slot_count, PLANE_COUNT, self.plane_bytes), np.uint8, buffer=block.buf, offset=planes_offset)
+
+	@staticmethod
+	def size(slot_count:int, width:int, height:int) -> int:
+		return (_aligned(HEADER_DTYPE.itemsize) + _aligned(FRAME_DTYPE.itemsize * slot_count)
+				+ _aligned(RESULT_DTYPE.itemsize * slot_count) + slot_count * PLANE_COUNT * _aligned(width * height * 3))
+
+	@classmethod
+	def create(cls, slot_count:int, width:int, height:int) -> "FrameRing":
+		block = shared_memory.SharedMemory(create=True, size=cls.size(slot_count, width, height))
+		ring = cls(block, slot_count, width, height, owner=True)
+		ring.header[()] = 0
+		ring.frames[:] = 0
+		ring.results[:] = 0
+		ring.header["magic"] = RING_MAGIC
+		ring.header["quality_request"] = -1
+		return ring
+
+	@classmethod
+	def attach(cls, name:str, slot_count:int, width:int, height:int) -> "FrameRing":
+		ring = cls(_attach_shared_memory(name), slot_count, width, height, owner=False)
+		if int(ring.header["magic"]) != RING_MAGIC:
+			ring.close()
+			raise ValueError(f"Shared memory {name} doesn't hold a frame ring of this version")
+		return ring
+
+	@property
+	def name(self) -> str:
+		return self.block.name
+
+	def plane(self, slot:int, plane:int, width:int, height:int) -> np.ndarray:
+		"""
+		(height, width, 3) uint8 view of an image plane of a frame slot.
+		"""
+		return self._planes[slot, plane, :width * height * 3].reshape(height, width, 3)
+
+	def records(self, kind:str) -> np.ndarray:
+		"""
+		The slots of the "frame" or "result" ring.
+		"""
+		return self.frames if kind == "frame" else self.results
+
+	def newest_slot(self, kind:str) -> int:
+		"""
+		Slot of the newest frame or result, -1 before the first one.
+		"""
+		return int(self.header[f"{kind}_slot"]) if int(self.header[f"{kind}_sequence"]) > 0 else -1
+
+	def begin_write(self, kind:str) -> int:
+		"""
+		Mark the slot after the newest frame or result as being written and return it.
+		"""
+		slot = (int(self.header[f"{kind}_slot"]) + 1) % self.slot_count
+		self.records(kind)["version"][slot] += 1
+		return slot
+
+	def end_write(self, kind:str, slot:int) -> None:
+		"""
+		Finish writing a slot and publish it as the newest frame or result.
+		"""
+		records = self.records(kind)
+		records["version"][slot] += 1
+		self.header[f"{kind}_slot"] = slot
+		self.header[f"{kind}_sequence"] = records["sequence"][slot]
+
+	def close(self) -> None:
+		# The views have to go before the buffer can be released
+		self.header = self.frames = self.results = self._planes = None
+		self.block.close()
+		if self.owner:
+			try:
+				self.block.unlink()
+			except FileNotFoundError:
+				pass
@@ -0,0 +1,35 @@
+import cv2
+import numpy as np
+
+
+class FrameConverter:
+	"""
+	Turns BGR camera frames into mirrored (selfie view) RGB frames in a preallocated buffer.
+
+	The frame is flipped into the buffer and converted to RGB in place, which is one
+	cv2.flip and one cv2.cvtColor pass and no allocation. The buffer is C contiguous RGB8,
+	ready for MediaPipe, for drawing overlays in RGB and for PackedByteArray.from_memory_view.
+	It is reused by the next call, and a converter must not be shared between threads.
+
+	With a width smaller than the frame's, the frame is first downscaled into the buffer
+	(keeping the aspect ratio) and flipped and converted there, e.g. for inference input.
+	"""
+
+	def __init__(self):
+		self._rgb = None
+
+	def mirrored_rgb(self, frame: np.ndarray, width: int = 0) -> np.ndarray:
+		height, frame_width = frame.shape[:2]
+		if 0 < width < frame_width:
+			shape = (max(1, round(height * width / frame_width)), width, 3)
+		else:
+			shape = frame.shape
+		if self._rgb is None or self._rgb.shape != shape:
+			self._rgb = np.empty(shape, dtype=np.uint8)
+		if shape == frame.shape:
+			cv2.flip(frame, 1, dst=self._rgb)
+		else:
+			cv2.resize(frame, (shape[1], shape[0]), dst=self._rgb, interpolation=cv2.INTER_AREA)
+			cv2.flip(self._rgb, 1, dst=self._rgb)
+		cv2.cvtColor(self._rgb, cv2.COLOR_BGR2RGB, dst=self._rgb)
+		return self._rgb
@@ -0,0 +1,140 @@
+import threading
+
+import numpy as np
+
+from webcam.landmarks import HAND_SIDES, LANDMARK_IDS
+
+# Names of the hands and fingers in finger_state_changed, in the order of the (2, 4) arrays below
+SIDE_NAMES = ("LEFT", "RIGHT")
+FINGERS = ("INDEX", "MIDDLE", "RING", "PINKY")
+THUMB_TIP = LANDMARK_IDS["THUMB_TIP"]
+FINGER_TIPS = np.array([LANDMARK_IDS["INDEX_FINGER_TIP"], LANDMARK_IDS["MIDDLE_FINGER_TIP"],
+						LANDMARK_IDS["RING_FINGER_TIP"], LANDMARK_IDS["PINKY_TIP"]], dtype=np.intp)
+
+# Calibration before the first one: 1/distance of an open finger and the 1/distance that presses it
+DEFAULT_OPEN = 1.8
+DEFAULT_PRESS = 2.3
+# Fraction of the calibrated pinch 1/distance that presses a finger, the pinky doesn't reach the thumb as well
+PRESS_FACTORS = np.array([0.9, 0.9, 0.9, 0.8], dtype=np.float32)
+# A pressed finger is released when it falls below this fraction of the way from open to pressed
+RELEASE_LEVEL = 0.8
+# Smallest distance between the open and the press value, keeps a bad calibration from dividing by zero
+MIN_SPAN = 1e-3
+# A hand that wasn't tracked for this many seconds counts as gone, its fingers are released.
+# Shorter gaps (a missed detection) keep the last landmarks so a held press doesn't flicker
+HAND_LOST_TIMEOUT = 0.25
+
+
+def finger_values(landmarks: np.ndarray) -> np.ndarray:
+	"""
+	(2, 4) 1/distance between the thumb tip and the index, middle, ring and pinky tips of both hands,
+	0 where the tips coincide (no landmarks).
+	"""
+	offsets = landmarks[:, FINGER_TIPS] - landmarks[:, THUMB_TIP, None]
+	distances = np.sqrt(np.einsum("hfc,hfc->hf", offsets, offsets))
+	values = np.zeros_like(distances)
+	np.divide(1.0, distances, out=values, where=distances > 0)
+	return values
+
+
+class GestureEngine:
+	"""
+	Turns tracking results into finger presses.
+
+	Every result's thumb to finger tip distances of both hands, as 1/distance (growing while a
+	finger closes in on the thumb), are compared against per-hand, per-finger thresholds in one
+	vectorized pass. A finger is pressed once it reaches its press value and released only when
+	it falls below RELEASE_LEVEL of the way from its open to its press value, so jitter around
+	the threshold doesn't toggle it. Fingers of a hand without landmarks, or that wasn't tracked
+	for HAND_LOST_TIMEOUT seconds (it left the camera view), are released.
+
+	Calibration takes the current values: calibrate_open with the hand open, calibrate_pinch
+	while pinching each finger, which sets the press values to PRESS_FACTORS of the pinch.
+
+	update() can run on the tracking thread, each result is evaluated once. The transitions and
+	the values of new results are taken with pop_transitions and pop_values from the thread
+	that emits the signals.
+	"""
+
+	def __init__(self):
+		shape = (len(HAND_SIDES), len(FINGERS))
+		self.open_values = np.full(shape, DEFAULT_OPEN, dtype=np.float32)
+		self.press_values = np.full(shape, DEFAULT_PRESS, dtype=np.float32)
+		self.values = np.zeros(shape, dtype=np.float32)
+		self.valid = np.zeros(len(HAND_SIDES), dtype=bool)
+		self.pressed = np.zeros(shape, dtype=bool)
+		self.last_tracked = np.full(len(HAND_SIDES), -np.inf)  # capture time each hand was last tracked at
+		self.sequence = 0
+		self._values_sequence = 0
+		self._transitions = []
+		self._lock = threading.Lock()
+
+	def update(self, tracking) -> None:
+		"""
+		Evaluate a TrackingResult, queue the fingers that changed state.
+		"""
+		with self._lock:
+			if tracking.sequence <= self.sequence:
+				return
+			self.sequence = tracking.sequence
+			# The tracker keeps the last landmarks of a hand it lost, they only count for a short while
+			self.last_tracked[tracking.tracked] = tracking.capture_time
+			present = tracking.valid & (tracking.capture_time - self.last_tracked <= HAND_LOST_TIMEOUT)
+			values = finger_values(tracking.landmarks)
+			valid = present[:, None] & (values > 0)
+			self.values[:] = np.where(valid, values, 0.0)
+			self.valid[:] = present
+
+			levels = (self.values - self.open_values) / np.maximum(self.press_values - self.open_values, MIN_SPAN)
+			pressed = valid & ((levels >= 1.0) | (self.pressed & (levels >= RELEASE_LEVEL)))
+			for hand, finger in np.argwhere(pressed != self.pressed):
+				self._transitions.append((SIDE_NAMES[hand], FINGERS[finger], bool(pressed[hand, finger])))
+			self.pressed = pressed
+
+	def pop_transitions(self) -> list:
+		"""
+		(side, finger, pressed) of every state change since the last call, oldest first.
+		"""
+		with self._lock:
+			transitions, self._transitions = self._transitions, []
+		return transitions
+
+	def pop_values(self):
+		"""
+		Copy of the (2, 4) values and the hands that had landmarks if a result came in since the last call, else None.
+		"""
+		with self._lock:
+			if self.sequence == self._values_sequence:
+				return None
+			self._values_sequence = self.sequence
+			return self.values.copy(), self.valid.copy()
+
+	def calibrate_open(self, side: int = -1) -> None:
+		"""
+		Take the current values of one hand (LEFT/RIGHT, -1 for both) as its open values.
+		"""
+		with self._lock:
+			hands = self._calibrated_hands(side)
+			self.open_values[hands] = self.values[hands]
+
+	def calibrate_pinch(self, side: int = -1) -> None:
+		"""
+		Take PRESS_FACTORS of the current values of one hand (LEFT/RIGHT, -1 for both) as its press values.
+		"""
+		with self._lock:
+			hands = self._calibrated_hands(side)
+			self.press_values[hands] = self.values[hands] * PRESS_FACTORS
+
+	def calibration(self, side: int) -> np.ndarray:
+		"""
+		The 4 open values followed by the 4 press values of one hand.
+		"""
+		with self._lock:
+			return np.concatenate([self.open_values[side], self.press_values[side]])
+
+	def _calibrated_hands(self, side: int) -> np.ndarray:
+		# Only hands that currently have landmarks can be calibrated
+		hands = self.valid.copy()
+		if side >= 0:
+			hands[1 - side] = False
+		return hands
@@ -0,0 +1,76 @@
+import time
+
+# Inference quality levels from best to cheapest: (width of the frame fed to MediaPipe, model_complexity)
+QUALITY_LEVELS = (
+	(640, 1),
+	(480, 1),
+	(480, 0),
+	(320, 0),
+	(256, 0),
+)
+# Weight of a new latency sample in the moving average
+LATENCY_SMOOTHING = 0.2
+# Consecutive samples over the budget before stepping down, and below STEP_UP_FACTOR * budget before stepping up
+STEP_DOWN_SAMPLES = 5
+STEP_UP_SAMPLES = 60
+STEP_UP_FACTOR = 0.6
+
+
+class LatencyGovernor:
+	"""
+	Keeps the inference latency within a budget by stepping through QUALITY_LEVELS.
+
+	Every inference reports its duration with record(). The smoothed latency has to stay over
+	the budget for STEP_DOWN_SAMPLES inferences before the next cheaper level is chosen, and
+	well below it (STEP_UP_FACTOR) for STEP_UP_SAMPLES inferences before quality goes up again,
+	so the level doesn't oscillate. The counters restart after every change because the
+	models need a few frames to settle.
+	"""
+
+	def __init__(self, budget_ms:float=25.0, levels=QUALITY_LEVELS, level:int=0, enabled:bool=True):
+		self.budget_ms = budget_ms
+		self.levels = levels
+		self.level = min(max(level, 0), len(levels) - 1)
+		self.enabled = enabled
+		self.latency_ms = 0.0
+		self.changed_at = time.monotonic()
+		self._over = 0
+		self._under = 0
+
+	@property
+	def inference_width(self) -> int:
+		return self.levels[self.level][0]
+
+	@property
+	def model_complexity(self) -> int:
+		return self.levels[self.level][1]
+
+	def record(self, latency_s:float) -> bool:
+		"""
+		Add a latency sample in seconds. Returns True if the level changed.
+		"""
+		latency_ms = latency_s * 1000
+		if self.latency_ms == 0.0:
+			self.latency_ms = latency_ms
+		else:
+			self.latency_ms += LATENCY_SMOOTHING * (latency_ms - self.latency_ms)
+		if not self.enabled:
+			return False
+
+		self._over = self._over + 1 if self.latency_ms > self.budget_ms else 0
+		self._under = self._under + 1 if self.latency_ms < self.budget_ms * STEP_UP_FACTOR else 0
+		if self._over >= STEP_DOWN_SAMPLES and self.level < len(self.levels) - 1:
+			return self.set_level(self.level + 1)
+		if self._under >= STEP_UP_SAMPLES and self.level > 0:
+			return self.set_level(self.level - 1)
+		return False
+
+	def set_level(self, level:int) -> bool:
+		level = min(max(level, 0), len(self.levels) - 1)
+		if level == self.level:
+			return False
+		self.level = level
+		self.changed_at = time.monotonic()
+		self._over = 0
+		self._under = 0
+		return True
@@ -0,0 +1,74 @@
+import numpy as np
+
+# Hand slots of the landmark arrays
+HAND_SIDES = ("LEFT_HAND", "RIGHT_HAND")
+LEFT = 0
+RIGHT = 1
+
+# MediaPipe HandLandmark names, the position is the landmark id
+LANDMARK_NAMES = (
+	"WRIST",
+	"THUMB_CMC", "THUMB_MCP", "THUMB_IP", "THUMB_TIP",
+	"INDEX_FINGER_MCP", "INDEX_FINGER_PIP", "INDEX_FINGER_DIP", "INDEX_FINGER_TIP",
+	"MIDDLE_FINGER_MCP", "MIDDLE_FINGER_PIP", "MIDDLE_FINGER_DIP", "MIDDLE_FINGER_TIP",
+	"RING_FINGER_MCP", "RING_FINGER_PIP", "RING_FINGER_DIP", "RING_FINGER_TIP",
+	"PINKY_MCP", "PINKY_PIP", "PINKY_DIP", "PINKY_TIP",
+)
+LANDMARK_IDS = {name: i for i, name in enumerate(LANDMARK_NAMES)}
+LANDMARK_COUNT = len(LANDMARK_NAMES)
+
+
+def empty_landmarks() -> np.ndarray:
+	"""
+	(2, 21, 3) float32 landmarks, [hand (LEFT/RIGHT), landmark id, (x, y, z)].
+	"""
+	return np.zeros((len(HAND_SIDES), LANDMARK_COUNT, 3), dtype=np.float32)
+
+
+def side_index(side: str) -> int:
+	"""
+	LEFT or RIGHT for "LEFT_HAND"/"RIGHT_HAND" or short forms like "left"/"right", -1 for any hand.
+	"""
+	s = str(side).lower()
+	return LEFT if s.startswith("l") else (RIGHT if s.startswith("r") else -1)
+
+
+def landmark_id(name: str) -> int:
+	"""
+	Id of a HandLandmark name (e.g. "INDEX_FINGER_TIP", any case), -1 if unknown.
+	"""
+	return LANDMARK_IDS.get(str(name).upper(), -1)
+
+
+def hand_array(hand_landmarks, out: np.ndarray) -> np.ndarray:
+	"""
+	Copy the 21 landmarks of a MediaPipe hand into a (21, 3) float32 array.
+	"""
+	out[:] = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+	return out
+
+
+def select_hand(valid: np.ndarray, side: int) -> int:
+	"""
+	The hand to query: the requested side if it has landmarks, else the first hand that has some.
+	-1 if there are no landmarks.
+	"""
+	if side >= 0 and valid[side]:
+		return side
+	candidates = np.flatnonzero(valid)
+	return int(candidates[0]) if len(candidates) else -1
+
+
+def landmark_distances(landmarks: np.ndarray, valid: np.ndarray, ids_a: np.ndarray, ids_b: np.ndarray, side: int) -> np.ndarray:
+	"""
+	3D distances between the landmarks ids_a[i] and ids_b[i] of one hand, see select_hand.
+	Returns float32 distances, -1 for unknown ids (-1) or when no hand has landmarks.
+	"""
+	distances = np.full(len(ids_a), -1.0, dtype=np.float32)
+	hand = select_hand(valid, side)
+	if hand < 0:
+		return distances
+	known = (ids_a >= 0) & (ids_b >= 0)
+	offsets = landmarks[hand, ids_a[known]] - landmarks[hand, ids_b[known]]
+	distances[known] = np.sqrt(np.einsum("ij,ij->i", offsets, offsets))
+	return distances
@@ -0,0 +1,137 @@
+import os
+import time
+
+import cv2
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class PacedSource:
+	"""
+	Base of the replay sources: read() hands out frame n no earlier than start + n / fps,
+	measured from the first read, so a replay runs at the same speed on every machine
+	(as long as the reader keeps up). fps <= 0 reads as fast as possible.
+	With loop the source starts over at the end, otherwise it closes.
+	"""
+
+	def __init__(self, fps:float=30.0, loop:bool=False):
+		self.fps = fps
+		self.loop = loop
+		self.frames_read = 0
+		self._start = None
+		self._opened = True
+
+	def isOpened(self) -> bool:
+		return self._opened
+
+	def release(self) -> None:
+		self._opened = False
+
+	def read(self):
+		if not self._opened:
+			return False, None
+		frame = self._next_frame()
+		if frame is None and self.loop:
+			self._rewind()
+			frame = self._next_frame()
+		if frame is None:
+			self._opened = False
+			return False, None
+		self._pace()
+		self.frames_read += 1
+		return True, frame
+
+	def _pace(self) -> None:
+		if self.fps <= 0:
+			return
+		if self._start is None:
+			self._start = time.monotonic()
+		delay = self._start + self.frames_read / self.fps - time.monotonic()
+		if delay > 0:
+			time.sleep(delay)
+
+	def _next_frame(self):
+		raise NotImplementedError
+
+	def _rewind(self) -> None:
+		raise NotImplementedError
+
+
+class VideoFileSource(PacedSource):
+	"""
+	Frames of a video file, paced at fps (default: the file's own frame rate).
+	"""
+
+	def __init__(self, path:str, fps:float=None, loop:bool=False):
+		self.path = path
+		self._capture = cv2.VideoCapture(path)
+		if fps is None:
+			fps = self._capture.get(cv2.CAP_PROP_FPS) or 30.0
+		super().__init__(fps, loop)
+		self._opened = self._capture.isOpened()
+
+	def release(self) -> None:
+		super().release()
+		self._capture.release()
+
+	def _next_frame(self):
+		ret, frame = self._capture.read()
+		return frame if ret else None
+
+	def _rewind(self) -> None:
+		self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+
+class ImageDirectorySource(PacedSource):
+	"""
+	The images of a directory in file name order, paced at fps.
+	"""
+
+	def __init__(self, path:str, fps:float=30.0, loop:bool=False):
+		super().__init__(fps, loop)
+		self.path = path
+		self.files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+		self._index = 0
+		self._opened = bool(self.files)
+
+	def _next_frame(self):
+		while self._index < len(self.files):
+			frame = cv2.imread(self.files[self._index])
+			self._index += 1
+			if frame is not None:
+				return frame
+		return None
+
+	def _rewind(self) -> None:
+		self._index = 0
+
+
+def open_camera(index:int, width:int=0, height:int=0, fps:float=0.0):
+	"""
+	A cv2.VideoCapture for a camera with the requested resolution and frame rate (0 keeps the driver's choice).
+	"""
+	capture = cv2.VideoCapture(index)
+	if width > 0:
+		capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+	if height > 0:
+		capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+	if fps > 0:
+		capture.set(cv2.CAP_PROP_FPS, fps)
+	return capture
+
+
+def open_source(source:str, width:int=0, height:int=0, fps:float=0.0, loop:bool=False):
+	"""
+	Open a frame source by description:
+	- "" or a number: the camera with that index (default 0), at the requested resolution and fps
+	- a directory: its images, paced at fps (30 if not given)
+	- anything else: a video file, paced at fps (the file's frame rate if not given)
+
+	All sources have the read()/isOpened()/release() interface of cv2.VideoCapture.
+	"""
+	source = str(source).strip()
+	if source == "" or source.isdigit():
+		return open_camera(int(source or 0), width, height, fps)
+	if os.path.isdir(source):
+		return ImageDirectorySource(source, fps or 30.0, loop)
+	return VideoFileSource(source, fps or None, loop)
@@ -0,0 +1,373 @@
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from mediapipe.python.solutions import drawing_utils
+from mediapipe.python.solutions.hands import Hands
+from mediapipe.python.solutions.hands_connections import HAND_CONNECTIONS
+from mediapipe.python.solutions.pose import POSE_CONNECTIONS, Pose, PoseLandmark
+
+from webcam.frames import FrameConverter
+from webcam.landmarks import HAND_SIDES, LEFT, RIGHT, empty_landmarks, hand_array
+
+# How long the worker waits for a new frame before checking whether it should stop
+FRAME_WAIT_TIMEOUT = 0.1
+
+# "pose": label the hands by the nearest Pose wrist on every frame
+# "hands": follow the hands from frame to frame, Pose only runs on re-acquisition or every pose_interval frames
+TRACKING_MODES = ("pose", "hands")
+# A detected wrist within this distance (normalized image units) of a hand's previous wrist is the same hand
+ASSOCIATION_DISTANCE = 0.15
+# Margin around the last known hands for the region of interest, relative to the size of their bounding box
+ROI_MARGIN = 0.5
+# Smallest region of interest, relative to the frame
+ROI_MIN_SIZE = 0.25
+# Hands labels hands assuming a mirrored (selfie) image, which is what it gets
+HANDEDNESS_SIDES = {"Left": LEFT, "Right": RIGHT}
+
+# drawing_utils' default colors are BGR, the overlay is drawn on the RGB frame
+LANDMARK_DRAWING_SPEC = drawing_utils.DrawingSpec(color=(255, 0, 0))
+CONNECTION_DRAWING_SPEC = drawing_utils.DrawingSpec(color=(224, 224, 224))
+
+
+def create_models(model_complexity: int = 1):
+	"""
+	MediaPipe Hands and Pose (Pose is used to infer handedness from wrist positions).
+	"""
+	hands = Hands(
+		model_complexity=model_complexity,
+		min_detection_confidence=0.5,
+		min_tracking_confidence=0.5,
+	)
+	pose = Pose(
+		model_complexity=model_complexity,
+		min_detection_confidence=0.5,
+		min_tracking_confidence=0.5,
+	)
+	return hands, pose
+
+
+@dataclass(frozen=True)
+class TrackingResult:
+	"""
+	One published inference result. A new result replaces the previous one as a whole.
+	landmarks is one of the tracker's two alternating buffers: it stays unchanged until the
+	result after the next one is published, copy it to keep it longer.
+	"""
+	sequence: int = 0  # FrameCapture sequence number of the processed frame
+	capture_time: float = 0.0  # time.monotonic() when the frame was captured
+	inference_time: float = 0.0  # time.monotonic() when the result was published
+	landmarks: np.ndarray = field(default_factory=empty_landmarks)  # (2, 21, 3) float32, see landmarks.py
+	valid: np.ndarray = field(default_factory=lambda: np.zeros(len(HAND_SIDES), dtype=bool))  # hands with landmarks
+	hand_landmarks: tuple = ()  # MediaPipe hand landmark lists of the frame, for drawing
+	pose_landmarks: object = None  # MediaPipe pose landmarks of the frame, for drawing
+	tracked: np.ndarray = field(default_factory=lambda: np.zeros(len(HAND_SIDES), dtype=bool))  # hands seen in this frame
+	ran_pose: bool = False  # whether Pose ran on this frame
+	inference_ms: float = 0.0  # duration of the model calls on this frame
+
+
+def draw_tracking(frame_rgb:np.ndarray, tracking:TrackingResult) -> None:
+	"""
+	Draw the pose and hand landmarks of a result with their connections onto a mirrored RGB frame, in place.
+	"""
+	# Draw pose landmarks and connections on the image if available
+	if tracking.pose_landmarks is not None:
+		try:
+			drawing_utils.draw_landmarks(
+				frame_rgb,
+				tracking.pose_landmarks,
+				POSE_CONNECTIONS,
+				LANDMARK_DRAWING_SPEC,
+				CONNECTION_DRAWING_SPEC,
+			)
+		except Exception:
+			pass
+
+	# Draw hand landmarks and connections on the image if available
+	for hand_landmarks in tracking.hand_landmarks:
+		drawing_utils.draw_landmarks(
+			frame_rgb,
+			hand_landmarks,
+			HAND_CONNECTIONS,
+			LANDMARK_DRAWING_SPEC,
+			CONNECTION_DRAWING_SPEC,
+		)
+
+
+def assign_hands(hand_res, pose_res, landmarks:np.ndarray, valid:np.ndarray) -> list:
+	"""
+	Label the detected hands as LEFT/RIGHT by their nearest pose wrist and write their
+	landmarks into landmarks[side]. Hands that weren't detected in this frame keep the
+	landmarks already in the arrays. Returns the assigned sides.
+	"""
+	sides = []
+	if pose_res and getattr(pose_res, 'pose_landmarks', None) and hand_res and getattr(hand_res, 'multi_hand_landmarks', None):
+		lw = pose_res.pose_landmarks.landmark[PoseLandmark.LEFT_WRIST.value]
+		rw = pose_res.pose_landmarks.landmark[PoseLandmark.RIGHT_WRIST.value]
+		for hand_landmarks in hand_res.multi_hand_landmarks:
+			wrist = hand_landmarks.landmark[0]
+			left_distance = (lw.x - wrist.x) ** 2 + (lw.y - wrist.y) ** 2
+			right_distance = (rw.x - wrist.x) ** 2 + (rw.y - wrist.y) ** 2
+			side = LEFT if left_distance > right_distance else RIGHT  # Inverted because of image inverted
+			hand_array(hand_landmarks, landmarks[side])
+			valid[side] = True
+			sides.append(side)
+	return sides
+
+
+def associate_hands(hand_res, landmarks:np.ndarray, tracked:np.ndarray) -> list:
+	"""
+	Match the detected hands to the hands tracked in the previous frame by wrist distance.
+	Returns the side of every detected hand, None where a hand has no tracked hand within
+	ASSOCIATION_DISTANCE (it was just (re)acquired).
+	"""
+	detected = getattr(hand_res, 'multi_hand_landmarks', None) or ()
+	sides = [None] * len(detected)
+	taken = set()
+	for i, hand_landmarks in enumerate(detected):
+		wrist = hand_landmarks.landmark[0]
+		distances = np.hypot(landmarks[:, 0, 0] - wrist.x, landmarks[:, 0, 1] - wrist.y)
+		for side in np.argsort(distances):
+			if tracked[side] and side not in taken and distances[side] <= ASSOCIATION_DISTANCE:
+				sides[i] = int(side)
+				taken.add(int(side))
+				break
+	return sides
+
+
+def label_hands(hand_res, sides:list) -> list:
+	"""
+	Fill the sides associate_hands couldn't match from Hands' own handedness classification.
+	"""
+	handedness = getattr(hand_res, 'multi_handedness', None) or ()
+	taken = {side for side in sides if side is not None}
+	labeled = list(sides)
+	for i, side in enumerate(sides):
+		if side is not None:
+			continue
+		label = handedness[i].classification[0].label if i < len(handedness) else "Left"
+		side = HANDEDNESS_SIDES.get(label, LEFT)
+		if side in taken:
+			side = 1 - side
+		if side in taken:
+			continue
+		labeled[i] = side
+		taken.add(side)
+	return labeled
+
+
+def hands_roi(landmarks:np.ndarray, tracked:np.ndarray):
+	"""
+	Normalized (x0, y0, x1, y1) region around the tracked hands, None if no hand is tracked
+	or the region would cover most of the frame anyway.
+	"""
+	if not tracked.any():
+		return None
+	points = landmarks[tracked, :, :2].reshape(-1, 2)
+	low = points.min(axis=0)
+	high = points.max(axis=0)
+	size = np.maximum((high - low) * (1 + 2 * ROI_MARGIN), ROI_MIN_SIZE)
+	center = (low + high) / 2
+	x0, y0 = np.clip(center - size / 2, 0.0, 1.0)
+	x1, y1 = np.clip(center + size / 2, 0.0, 1.0)
+	if (x1 - x0) * (y1 - y0) > 0.8:
+		return None
+	return float(x0), float(y0), float(x1), float(y1)
+
+
+def crop_roi(image:np.ndarray, roi) -> tuple:
+	"""
+	Cut the region of interest out of the image. Returns the crop and the region snapped to whole pixels.
+	"""
+	height, width = image.shape[:2]
+	left, top = int(roi[0] * width), int(roi[1] * height)
+	right, bottom = max(left + 1, int(np.ceil(roi[2] * width))), max(top + 1, int(np.ceil(roi[3] * height)))
+	crop = np.ascontiguousarray(image[top:bottom, left:right])
+	return crop, (left / width, top / height, right / width, bottom / height)
+
+
+def landmarks_from_roi(hand_res, roi) -> None:
+	"""
+	Move the landmarks Hands found in the region of interest back into full frame coordinates, in place.
+	"""
+	x0, y0, x1, y1 = roi
+	for hand_landmarks in getattr(hand_res, 'multi_hand_landmarks', None) or ():
+		for lm in hand_landmarks.landmark:
+			lm.x = x0 + lm.x * (x1 - x0)
+			lm.y = y0 + lm.y * (y1 - y0)
+			lm.z = lm.z * (x1 - x0)  # z uses roughly the same scale as x
+
+
+class HandTracker:
+	"""
+	Runs MediaPipe Hands and Pose on a worker thread, fed by a FrameCapture.
+
+	The worker takes the newest captured frame at most target_rate times per second (0 means
+	every new frame) and publishes a TrackingResult. Publishing swaps a single reference, so
+	readers get the latest complete result through latest without locking and without ever
+	waiting for inference; the game can render at 144 Hz while inference runs at 30 Hz.
+
+	tracking_mode selects how hands are labeled left and right, see TRACKING_MODES. In "hands"
+	mode Pose, which roughly doubles the inference time, only runs when a hand can't be matched
+	to a tracked one or every pose_interval frames. With use_roi Hands only looks at the region
+	around the tracked hands; the full frame is used again whenever a tracked hand is lost and on
+	every Pose frame, which is also where a second hand is picked up.
+
+	With a LatencyGovernor, frames are downscaled to the governor's inference width before
+	inference and every inference time is reported to it. When its level asks for another
+	model_complexity, model_factory(model_complexity) has to return the new (hands, pose) pair.
+
+	on_result, if given, is called with every published result on the worker thread.
+	"""
+
+	def __init__(self, capture, hands, pose, target_rate:float=30.0, tracking_mode:str="pose", pose_interval:int=30,
+				 use_roi:bool=False, governor=None, model_factory=None, on_result=None):
+		self.capture = capture
+		self.hands = hands
+		self.pose = pose
+		self.target_rate = target_rate
+		self.governor = governor
+		self.model_factory = model_factory
+		self.on_result = on_result
+		self._model_complexity = governor.model_complexity if governor is not None else None
+		self._quality_changed = False
+		self.set_tracking_mode(tracking_mode, pose_interval, use_roi)
+		self._frames_since_pose = 0
+		self._lost_hand = False
+		self.latest = TrackingResult()
+		# Results alternate between two preallocated landmark buffers
+		self._landmarks = np.stack([empty_landmarks(), empty_landmarks()])
+		self._valid = np.zeros((2, len(HAND_SIDES)), dtype=bool)
+		self._buffer = 0
+		self._converter = FrameConverter()
+		self._running = False
+		self._thread = None
+
+	def start(self) -> None:
+		if self._running:
+			return
+		self._running = True
+		self._thread = threading.Thread(target=self._run, name="webcam-tracking", daemon=True)
+		self._thread.start()
+
+	def stop(self, timeout:float=1.0) -> None:
+		self._running = False
+		if self._thread is not None:
+			self._thread.join(timeout)
+			self._thread = None
+
+	def set_tracking_mode(self, tracking_mode:str, pose_interval:int=30, use_roi:bool=False) -> None:
+		if tracking_mode not in TRACKING_MODES:
+			raise ValueError(f"Unknown tracking mode {tracking_mode!r}, expected one of {TRACKING_MODES}")
+		self.tracking_mode = tracking_mode
+		self.pose_interval = max(1, pose_interval)
+		self.use_roi = use_roi
+
+	def process(self, sequence:int, capture_time:float, frame:np.ndarray) -> TrackingResult:
+		"""
+		Run the models on one BGR frame and publish the result.
+		"""
+		if self._quality_changed:
+			self._quality_changed = False
+			self._apply_quality_level()
+		previous = self.latest
+		pose_due = self.tracking_mode == "pose" or self._frames_since_pose + 1 >= self.pose_interval
+		use_roi = self.use_roi and not pose_due and not self._lost_hand
+		roi = hands_roi(previous.landmarks, previous.tracked) if use_roi else None
+
+		# Prepare for MediaPipe (expects RGB, flipped for selfie view), at the governor's resolution
+		width = self.governor.inference_width if self.governor is not None else 0
+		image_rgb = self._converter.mirrored_rgb(frame, width)
+		# Read only lets MediaPipe use the buffer without copying it
+		image_rgb.flags.writeable = False
+		start = time.perf_counter()
+		try:
+			if roi is None:
+				hand_res = self.hands.process(image_rgb)
+			else:
+				crop, roi = crop_roi(image_rgb, roi)
+				hand_res = self.hands.process(crop)
+				landmarks_from_roi(hand_res, roi)
+
+			matched = associate_hands(hand_res, previous.landmarks, previous.tracked)
+			run_pose = pose_due or None in matched
+			pose_res = self.pose.process(image_rgb) if run_pose else None
+		finally:
+			image_rgb.flags.writeable = True
+		inference_s = time.perf_counter() - start
+		if self.governor is not None and self.governor.record(inference_s):
+			self._apply_quality_level()
+		self._frames_since_pose = 0 if run_pose else self._frames_since_pose + 1
+
+		# Fill the buffer readers don't use, starting from the current landmarks
+		self._buffer = 1 - self._buffer
+		landmarks = self._landmarks[self._buffer]
+		valid = self._valid[self._buffer]
+		landmarks[:] = previous.landmarks
+		valid[:] = previous.valid
+		tracked = np.zeros(len(HAND_SIDES), dtype=bool)
+		if self.tracking_mode == "pose" or getattr(pose_res, 'pose_landmarks', None) is not None:
+			sides = assign_hands(hand_res, pose_res, landmarks, valid)
+		else:
+			# No pose (not run or no person found): keep following the hands
+			sides = label_hands(hand_res, matched)
+			for hand_landmarks, side in zip(getattr(hand_res, 'multi_hand_landmarks', None) or (), sides):
+				if side is not None:
+					hand_array(hand_landmarks, landmarks[side])
+					valid[side] = True
+		tracked[[side for side in sides if side is not None]] = True
+		# Look at the whole frame again on the next frame if a hand got lost
+		self._lost_hand = tracked.sum() < previous.tracked.sum()
+
+		result = TrackingResult(
+			sequence=sequence,
+			capture_time=capture_time,
+			inference_time=time.monotonic(),
+			landmarks=landmarks,
+			valid=valid,
+			hand_landmarks=tuple(getattr(hand_res, 'multi_hand_landmarks', None) or ()),
+			pose_landmarks=getattr(pose_res, 'pose_landmarks', None),
+			tracked=tracked,
+			ran_pose=run_pose,
+			inference_ms=inference_s * 1000,
+		)
+		self.latest = result
+		if self.on_result is not None:
+			self.on_result(result)
+		return result
+
+	def request_quality_update(self) -> None:
+		"""
+		Apply a governor level set from another thread before the next inference.
+		"""
+		self._quality_changed = True
+
+	def _apply_quality_level(self) -> None:
+		complexity = self.governor.model_complexity
+		if self.model_factory is None or complexity == self._model_complexity:
+			return
+		for model in (self.hands, self.pose):
+			close = getattr(model, "close", None)
+			if close is not None:
+				close()
+		self.hands, self.pose = self.model_factory(complexity)
+		self._model_complexity = complexity
+
+	def _run(self) -> None:
+		sequence = 0
+		next_run = time.monotonic()
+		while self._running:
+			if self.target_rate > 0:
+				delay = next_run - time.monotonic()
+				if delay > 0:
+					time.sleep(delay)
+				next_run = max(next_run + 1.0 / self.target_rate, time.monotonic())
+			newest, capture_time, frame = self.capture.wait_for_newer(sequence, FRAME_WAIT_TIMEOUT)
+			if frame is None or newest == sequence:
+				continue
+			sequence = newest
+			try:
+				self.process(sequence, capture_time, frame)
+			except Exception as e:
+				print(f"Error: hand tracking failed on frame {sequence}: {e}")
@@ -0,0 +1,472 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from webcam.capture import FrameCapture
+from webcam.frame_ring import (CAMERA_PLANE, HANDTRACKED_PLANE, WORKER_RUNNING, WORKER_SOURCE_ENDED,
+							   WORKER_SOURCE_FAILED, WORKER_STARTING, FrameRing)
+from webcam.frames import FrameConverter
+from webcam.governor import QUALITY_LEVELS, LatencyGovernor
+from webcam.sources import open_source
+from webcam.tracking import (FRAME_WAIT_TIMEOUT, TRACKING_MODES, HandTracker, TrackingResult, create_models,
+							 draw_tracking)
+
+# Directory the webcam package lives in, the worker runs as "python -m webcam.tracking_worker" from there
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Interpreters py4godot bundles with the project, as setup_examples.py installs them
+BUNDLED_PYTHONS = ("cpython-*/python/python.exe",) if os.name == "nt" else ("cpython-*/python/bin/python3",)
+# Frames in the ring: the node has RING_SLOTS - 1 frame intervals to read the newest one
+RING_SLOTS = 3
+# Attempts at reading the newest slot while the worker isn't writing it
+READ_ATTEMPTS = 3
+# The worker counts as hung when its heartbeat is older than this, while starting (loading the models) longer
+WORKER_STALL_TIMEOUT = 5.0
+WORKER_START_TIMEOUT = 60.0
+# How often the node checks on the worker
+WATCH_INTERVAL = 0.5
+# Delay before restarting a crashed worker, doubled after every crash up to the maximum,
+# back to the first one once a worker ran for STABLE_RUN seconds
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 10.0
+STABLE_RUN = 30.0
+# The worker is given up after this many crashes in a row (none of them ran STABLE_RUN seconds)
+MAX_RESTARTS = 5
+STOP_TIMEOUT = 2.0
+# Exit code of a worker that couldn't open its frame source, restarting it won't help
+EXIT_SOURCE_FAILED = 3
+
+
+def find_python(python:str="") -> str:
+	"""
+	The interpreter to run the worker with: python if given, else the one py4godot bundles
+	with the project (addons/py4godot/cpython-*/python), else this process' executable if it is
+	a Python interpreter. Inside Godot sys.executable is the Godot binary, which can't run the worker.
+	None if the chosen interpreter doesn't exist.
+	"""
+	if python:
+		return python if os.path.isfile(python) or shutil.which(python) else None
+	for pattern in BUNDLED_PYTHONS:
+		for candidate in sorted(glob.glob(os.path.join(PROJECT_DIR, "addons", "py4godot", pattern))):
+			if os.path.isfile(candidate):
+				return candidate
+	executable = sys.executable
+	if executable and os.path.basename(executable).lower().startswith("python"):
+		return executable
+	return None
+
+
+class RemoteGovernor:
+	"""
+	The worker's LatencyGovernor as seen from the node: the level and latency it publishes,
+	and level requests the worker applies before its next inference.
+	"""
+
+	def __init__(self, worker):
+		self.worker = worker
+		self.levels = QUALITY_LEVELS
+
+	@property
+	def level(self) -> int:
+		return int(self.worker.ring.header["quality_level"])
+
+	@property
+	def latency_ms(self) -> float:
+		return float(self.worker.ring.header["latency_ms"])
+
+	def set_level(self, level:int) -> bool:
+		level = min(max(level, 0), len(self.levels) - 1)
+		if level == self.level:
+			return False
+		self.worker.control(quality_request=level)
+		return True
+
+
+class TrackingWorker:
+	"""
+	Runs capture and hand/pose inference in a separate Python process, so none of it holds the
+	GIL of the process that reads the results (Godot's embedded interpreter).
+
+	The worker publishes every captured frame, as mirrored RGB with and without the landmark
+	overlay, and every tracking result into a FrameRing. The node reads the newest slots in
+	place: latest gives the landmarks as a TrackingResult (without the MediaPipe objects, the
+	overlay is drawn by the worker) and read_frame hands a view of a frame plane to a callback,
+	e.g. for the upload into a texture. Inference rate, tracking mode and quality
+	level are sent through the ring's control fields.
+
+	Reads also check on the worker (at most every WATCH_INTERVAL): a worker that exited or
+	stopped updating its heartbeat is restarted with a growing delay, and continues the frame
+	sequence numbers and the settings of the previous one. A worker that can't open its source,
+	can't be started, or crashed MAX_RESTARTS times in a row is given up (reported once), the
+	source then counts as closed.
+
+	python is the interpreter to run the worker with (see find_python for the default),
+	it needs the packages of requirements.txt.
+	Raises FileNotFoundError if there is none.
+	"""
+
+	def __init__(self, source:str, width:int=1280, height:int=720, fps:float=30.0, loop:bool=True,
+				 inference_rate:float=30.0, tracking_mode:str="pose", pose_interval:int=30, hand_roi:bool=False,
+				 adaptive_quality:bool=True, latency_budget_ms:float=25.0, python:str="", slot_count:int=RING_SLOTS):
+		if tracking_mode not in TRACKING_MODES:
+			raise ValueError(f"Unknown tracking mode {tracking_mode!r}, expected one of {TRACKING_MODES}")
+		self.config = {
+			"source": source,
+			"width": width,
+			"height": height,
+			"fps": fps,
+			"loop": loop,
+			"adaptive_quality": adaptive_quality,
+			"latency_budget_ms": latency_budget_ms,
+		}
+		self._initial_control = {
+			"inference_rate": inference_rate,
+			"tracking_mode": TRACKING_MODES.index(tracking_mode),
+			"pose_interval": pose_interval,
+			"hand_roi": int(hand_roi),
+		}
+		self.python = find_python(python)
+		if self.python is None:
+			raise FileNotFoundError(f"No Python interpreter for the tracking worker (worker_python: {python!r}), "
+									f"run setup_examples.py to install the one bundled with py4godot")
+		self.slot_count = slot_count
+		self.governor = RemoteGovernor(self)
+		self.ring = None
+		self.process = None
+		self.restarts = 0
+		self.gave_up = False
+		self._crashes = 0  # in a row
+		self._started_at = 0.0
+		self._restart_at = 0.0
+		self._restart_delay = RESTART_DELAY
+		self._next_watch = 0.0
+		self._latest = TrackingResult()
+
+	def start(self) -> None:
+		if self.ring is not None:
+			return
+		self.ring = FrameRing.create(self.slot_count, max(1, self.config["width"]), max(1, self.config["height"]))
+		self.control(**self._initial_control)
+		self._launch()
+
+	def stop(self) -> None:
+		if self.ring is None:
+			return
+		if self.process is not None:
+			self.ring.header["stop"] = 1
+			try:
+				self.process.wait(STOP_TIMEOUT)
+			except subprocess.TimeoutExpired:
+				self.process.kill()
+				self.process.wait()
+			self.process = None
+		self.ring.close()
+		self.ring = None
+
+	def control(self, **values) -> None:
+		"""
+		Set control fields of the ring header, the worker applies them before its next inference.
+		"""
+		for name, value in values.items():
+			self.ring.header[name] = value
+		self.ring.header["control_version"] += 1
+
+	@property
+	def target_rate(self) -> float:
+		return float(self.ring.header["inference_rate"])
+
+	@target_rate.setter
+	def target_rate(self, rate:float) -> None:
+		self.control(inference_rate=rate)
+
+	def set_tracking_mode(self, tracking_mode:str, pose_interval:int=30, use_roi:bool=False) -> None:
+		if tracking_mode not in TRACKING_MODES:
+			raise ValueError(f"Unknown tracking mode {tracking_mode!r}, expected one of {TRACKING_MODES}")
+		self.control(tracking_mode=TRACKING_MODES.index(tracking_mode), pose_interval=pose_interval, hand_roi=int(use_roi))
+
+	def request_quality_update(self) -> None:
+		# Level changes reach the worker through set_level's control fields already
+		pass
+
+	@property
+	def sequence(self) -> int:
+		"""
+		Sequence number of the newest published frame, 0 before the first one.
+		"""
+		self.watch()
+		return int(self.ring.header["frame_sequence"]) if self.ring is not None else 0
+
+	@property
+	def dropped_frames(self) -> int:
+		return int(self.ring.header["dropped_frames"]) if self.ring is not None else 0
+
+	def isOpened(self) -> bool:
+		"""
+		False once the worker couldn't open the source or a replay ended.
+		"""
+		return (self.ring is not None and not self.gave_up
+				and int(self.ring.header["state"]) not in (WORKER_SOURCE_FAILED, WORKER_SOURCE_ENDED))
+
+	@property
+	def latest(self) -> TrackingResult:
+		"""
+		The newest tracking result, an empty one before the first.
+		"""
+		self.watch()
+		result = self._read_newest("result", self._read_result) if self.ring is not None else None
+		if result is not None:
+			self._latest = result
+		return self._latest
+
+	def read_frame(self, plane:int, consume):
+		"""
+		Call consume with a (height, width, 3) RGB8 view of the newest frame's plane (CAMERA_PLANE or
+		HANDTRACKED_PLANE) and return what it returns. The view is only valid during the call.
+		None before the first frame.
+		"""
+		self.watch()
+		if self.ring is None:
+			return None
+
+		def read(slot):
+			width = int(self.ring.frames["width"][slot])
+			height = int(self.ring.frames["height"][slot])
+			return consume(self.ring.plane(slot, plane, width, height))
+		return self._read_newest("frame", read)
+
+	def watch(self) -> None:
+		"""
+		Restart the worker if it exited or hangs, at most every WATCH_INTERVAL.
+		"""
+		now = time.monotonic()
+		if self.ring is None or self.gave_up or now < self._next_watch:
+			return
+		self._next_watch = now + WATCH_INTERVAL
+		if self.process is None:
+			if now >= self._restart_at:
+				try:
+					self._launch()
+				except OSError as e:
+					self._give_up(f"could not be started with {self.python}: {e}")
+			return
+
+		state = int(self.ring.header["state"])
+		timeout = WORKER_START_TIMEOUT if state == WORKER_STARTING else WORKER_STALL_TIMEOUT
+		exit_code = self.process.poll()
+		hung = exit_code is None and now - float(self.ring.header["heartbeat"]) > timeout
+		if exit_code is None and not hung:
+			if now - self._started_at > STABLE_RUN:
+				self._restart_delay = RESTART_DELAY
+				self._crashes = 0
+			return
+		if exit_code == EXIT_SOURCE_FAILED:
+			self.process = None
+			self._give_up(f"cannot open frame source {self.config['source']}")
+			return
+
+		if hung:
+			self.process.kill()
+			self.process.wait()
+			reason = "stopped responding"
+		else:
+			reason = f"exited with code {exit_code}"
+		self.process = None
+		self._crashes += 1
+		if self._crashes > MAX_RESTARTS:
+			self._give_up(f"{reason}, it crashed {self._crashes} times in a row")
+			return
+		print(f"Error: tracking worker {reason}, restarting in {self._restart_delay:.0f} s")
+		self.restarts += 1
+		self._restart_at = now + self._restart_delay
+		self._restart_delay = min(self._restart_delay * 2, MAX_RESTART_DELAY)
+
+	def _give_up(self, reason:str) -> None:
+		print(f"Error: tracking worker {reason}, not restarting it")
+		self.gave_up = True
+		self.ring.header["state"] = WORKER_SOURCE_FAILED
+
+	def _launch(self) -> None:
+		header = self.ring.header
+		# A crashed worker can leave a slot marked as being written, it isn't the newest slot
+		for records in (self.ring.frames, self.ring.results):
+			versions = records["version"]
+			versions[versions % 2 == 1] += 1
+		header["stop"] = 0
+		header["state"] = WORKER_STARTING
+		header["heartbeat"] = time.monotonic()
+		env = dict(os.environ)
+		env["PYTHONPATH"] = os.pathsep.join(filter(None, (PROJECT_DIR, env.get("PYTHONPATH"))))
+		self.process = subprocess.Popen(
+			[self.python, "-m", "webcam.tracking_worker", "--ring", self.ring.name, "--slots", str(self.slot_count),
+			 "--width", str(self.ring.width), "--height", str(self.ring.height), "--parent", str(os.getpid()),
+			 "--config", json.dumps(self.config)],
+			cwd=PROJECT_DIR,
+			env=env,
+		)
+		self._started_at = time.monotonic()
+
+	def _read_newest(self, kind:str, read):
+		# Seqlock read of the newest frame or result slot, retried if the worker wrote to it meanwhile
+		versions = self.ring.records(kind)["version"]
+		for _ in range(READ_ATTEMPTS):
+			slot = self.ring.newest_slot(kind)
+			if slot < 0:
+				return None
+			version = int(versions[slot])
+			if version % 2:
+				continue
+			value = read(slot)
+			if int(versions[slot]) == version:
+				return value
+		return None
+
+	def _read_result(self, slot:int) -> TrackingResult:
+		results = self.ring.results
+		return TrackingResult(
+			sequence=int(results["sequence"][slot]),
+			capture_time=float(results["capture_time"][slot]),
+			inference_time=float(results["inference_time"][slot]),
+			landmarks=results["landmarks"][slot].copy(),
+			valid=results["valid"][slot].copy(),
+			tracked=results["tracked"][slot].copy(),
+			ran_pose=bool(results["ran_pose"][slot]),
+			inference_ms=float(results["inference_ms"][slot]),
+		)
+
+
+def fit_width(frame:np.ndarray, width:int, height:int) -> int:
+	"""
+	Width to scale a frame to so it fits into width x height, keeping its aspect ratio.
+	"""
+	frame_height, frame_width = frame.shape[:2]
+	if frame_width <= width and frame_height <= height:
+		return frame_width
+	return max(1, int(frame_width * min(width / frame_width, height / frame_height)))
+
+
+def publish_frame(ring:FrameRing, converter:FrameConverter, frame:np.ndarray, sequence:int, capture_time:float,
+				  tracking:TrackingResult) -> None:
+	"""
+	Write a BGR frame into the next frame slot as mirrored RGB, without and with the overlay of tracking.
+	"""
+	rgb = converter.mirrored_rgb(frame, fit_width(frame, ring.width, ring.height))
+	height, width = rgb.shape[:2]
+	slot = ring.begin_write("frame")
+	np.copyto(ring.plane(slot, CAMERA_PLANE, width, height), rgb)
+	draw_tracking(rgb, tracking)
+	np.copyto(ring.plane(slot, HANDTRACKED_PLANE, width, height), rgb)
+	frames = ring.frames
+	frames["sequence"][slot] = sequence
+	frames["capture_time"][slot] = capture_time
+	frames["width"][slot] = width
+	frames["height"][slot] = height
+	ring.end_write("frame", slot)
+
+
+def publish_result(ring:FrameRing, tracking:TrackingResult, sequence_offset:int) -> None:
+	"""
+	Write a tracking result into the next result slot.
+	"""
+	slot = ring.begin_write("result")
+	results = ring.results
+	results["sequence"][slot] = tracking.sequence + sequence_offset
+	results["capture_time"][slot] = tracking.capture_time
+	results["inference_time"][slot] = tracking.inference_time
+	results["inference_ms"][slot] = tracking.inference_ms
+	results["ran_pose"][slot] = tracking.ran_pose
+	results["valid"][slot] = tracking.valid
+	results["tracked"][slot] = tracking.tracked
+	results["landmarks"][slot] = tracking.landmarks
+	ring.end_write("result", slot)
+
+
+def apply_control(header, tracker, governor) -> None:
+	tracker.target_rate = float(header["inference_rate"])
+	tracker.set_tracking_mode(TRACKING_MODES[int(header["tracking_mode"])], int(header["pose_interval"]), bool(header["hand_roi"]))
+	if int(header["quality_request"]) >= 0:
+		if governor.set_level(int(header["quality_request"])):
+			tracker.request_quality_update()
+		header["quality_request"] = -1
+
+
+def parent_alive(parent_pid:int) -> bool:
+	# A worker whose node process died is re-parented, on Windows the node has to stop it
+	return os.name != "posix" or os.getppid() == parent_pid
+
+
+def run_worker(ring:FrameRing, config:dict, parent_pid:int) -> int:
+	"""
+	Capture from the configured source, track hands and publish into the ring until the node asks to stop.
+	"""
+	header = ring.header
+	header["worker_pid"] = os.getpid()
+	header["heartbeat"] = time.monotonic()
+	source = open_source(config["source"], config["width"], config["height"], config["fps"], config["loop"])
+	if not source.isOpened():
+		print(f"Error: cannot open frame source {config['source']}")
+		header["state"] = WORKER_SOURCE_FAILED
+		return EXIT_SOURCE_FAILED
+
+	capture = FrameCapture(source)
+	capture.start()
+	governor = LatencyGovernor(config["latency_budget_ms"], level=int(header["quality_level"]), enabled=config["adaptive_quality"])
+	hands, pose = create_models(governor.model_complexity)
+	# Sequence numbers continue where a crashed worker left off
+	sequence_offset = int(header["frame_sequence"])
+	tracker = HandTracker(capture, hands, pose, governor=governor, model_factory=create_models,
+						  on_result=lambda result: publish_result(ring, result, sequence_offset))
+	control_version = int(header["control_version"])
+	apply_control(header, tracker, governor)
+	tracker.start()
+	converter = FrameConverter()
+	header["state"] = WORKER_RUNNING
+
+	sequence = 0
+	try:
+		while not int(header["stop"]) and parent_alive(parent_pid):
+			header["heartbeat"] = time.monotonic()
+			if int(header["control_version"]) != control_version:
+				control_version = int(header["control_version"])
+				apply_control(header, tracker, governor)
+			newest, capture_time, frame = capture.wait_for_newer(sequence, FRAME_WAIT_TIMEOUT)
+			header["quality_level"] = governor.level
+			header["latency_ms"] = governor.latency_ms
+			header["dropped_frames"] = capture.dropped_frames
+			if frame is None or newest == sequence:
+				if not source.isOpened():
+					header["state"] = WORKER_SOURCE_ENDED
+				continue
+			sequence = newest
+			publish_frame(ring, converter, frame, sequence + sequence_offset, capture_time, tracker.latest)
+	finally:
+		tracker.stop()
+		capture.stop()
+		source.release()
+	return 0
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description="Capture and hand tracking worker of webcam_socket, see TrackingWorker")
+	parser.add_argument("--ring", required=True, help="name of the FrameRing shared memory")
+	parser.add_argument("--slots", type=int, required=True)
+	parser.add_argument("--width", type=int, required=True)
+	parser.add_argument("--height", type=int, required=True)
+	parser.add_argument("--parent", type=int, required=True, help="pid of the node's process")
+	parser.add_argument("--config", required=True, help="JSON, see TrackingWorker.config")
+	args = parser.parse_args()
+
+	ring = FrameRing.attach(args.ring, args.slots, args.width, args.height)
+	try:
+		return run_worker(ring, json.loads(args.config), args.parent)
+	finally:
+		ring.close()
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -1,71 +1,277 @@
+from py4godot import gdproperty, signal, SignalArg
 from py4godot.classes import gdclass
 from py4godot.classes.Image import Image
 from py4godot.classes.ImageTexture import ImageTexture
-from py4godot.classes.core import Array, PackedByteArray, Vector3
+from py4godot.classes.core import Array, PackedByteArray, PackedFloat32Array, Vector3
 from py4godot.classes.Node import Node
 from py4godot.classes.core import Dictionary
+import time
 import cv2
-import mediapipe as mp
 import numpy as np
-from mediapipe.python.solutions.hands import Hands, HandLandmark
-from mediapipe.python.solutions import drawing_utils
-from mediapipe.python.solutions.pose import Pose, PoseLandmark, POSE_CONNECTIONS
-from mediapipe.python.solutions.hands_connections import HAND_CONNECTIONS
+from webcam.capture import FrameCapture
+from webcam.frame_ring import CAMERA_PLANE, HANDTRACKED_PLANE
+from webcam.filters import LandmarkFilter
+from webcam.frames import FrameConverter
+from webcam.gestures import GestureEngine, SIDE_NAMES
+from webcam.governor import LatencyGovernor
+from webcam.sources import open_source
+from webcam.landmarks import HAND_SIDES, LANDMARK_NAMES, landmark_distances, landmark_id, side_index
+from webcam.tracking import HandTracker, create_models, draw_tracking
+from webcam.tracking_worker import TrackingWorker
 
 FORMAT_RGB8 = 4
 
+
+class TextureStream:
+	"""
+	A persistent Image/ImageTexture pair for one video stream.
+	New frames of the same resolution are copied into the existing image and texture
+	(Image.set_data + ImageTexture.update), only a resolution change allocates new ones.
+	"""
+
+	def __init__(self):
+		self.image = None
+		self.texture = None
+		self.size = None
+
+	def update(self, frame_rgb: np.ndarray) -> ImageTexture:
+		height, width = frame_rgb.shape[:2]
+		pba = PackedByteArray.from_memory_view(memoryview(frame_rgb))
+		if self.size != (width, height):
+			self.image = Image.create_from_data(width, height, False, FORMAT_RGB8, pba)
+			self.texture = ImageTexture.create_from_image(self.image)
+			self.size = (width, height)
+		else:
+			self.image.set_data(width, height, False, FORMAT_RGB8, pba)
+			self.texture.update(self.image)
+		return self.texture
+
 @gdclass
 class webcam_socket(Node):
+	# Hand/pose inferences per second on the tracking thread, 0 for every camera frame
+	inference_rate: float = gdproperty(float, 30.0)
+	# How hands are labeled left/right: "pose" runs Pose on every frame, "hands" follows the hands
+	# between frames and only runs Pose on re-acquisition or every pose_interval frames
+	tracking_mode: str = gdproperty(str, "pose")
+	pose_interval: int = gdproperty(int, 30)
+	# In "hands" mode, only look for hands in the region around the last known ones
+	hand_roi: bool = gdproperty(bool, False)
+	# Where frames come from: "" for the camera (camera_index), a camera index, a video file or a
+	# directory of images. Recordings are replayed at capture_fps (a video's own rate if 0)
+	frame_source: str = gdproperty(str, "")
+	loop_recording: bool = gdproperty(bool, True)
+	# Resolution and frame rate requested from the camera, the driver may pick the closest it supports
+	capture_width: int = gdproperty(int, 1280)
+	capture_height: int = gdproperty(int, 720)
+	capture_fps: float = gdproperty(float, 30.0)
+	# Step the inference resolution and model complexity down (and back up) to keep an inference within this budget
+	adaptive_quality: bool = gdproperty(bool, True)
+	latency_budget_ms: float = gdproperty(float, 25.0)
+	# Run capture and inference in a separate process that publishes frames and landmarks through shared memory,
+	# see tracking_worker.py. It runs with worker_python, by default the interpreter bundled with py4godot in
+	# addons/py4godot; without one tracking stays in this process
+	use_worker_process: bool = gdproperty(bool, False)
+	worker_python: str = gdproperty(str, "")
+	# Smooth the landmarks with a One Euro filter (cutoff in Hz while still, beta raises it with the speed)
+	smooth_landmarks: bool = gdproperty(bool, True)
+	smoothing_min_cutoff: float = gdproperty(float, 1.0)
+	smoothing_beta: float = gdproperty(float, 5.0)
+	# Evaluate finger presses on landmarks extrapolated over the capture to landmark latency
+	latency_compensation: bool = gdproperty(bool, False)
+	# Also emit finger_values_changed for every tracking result, e.g. for calibration displays
+	emit_finger_values: bool = gdproperty(bool, True)
+
+	# A finger ("INDEX", "MIDDLE", "RING", "PINKY") of a hand ("LEFT", "RIGHT") was pressed against or released from the thumb
+	finger_state_changed = signal([SignalArg("side", str), SignalArg("finger", str), SignalArg("pressed", bool)])
+	# 1/thumb to finger tip distance of the 4 fingers of a hand with landmarks, after every tracking result
+	finger_values_changed = signal([SignalArg("side", str), SignalArg("values", PackedFloat32Array)])
+
 	def _ready(self, camera_index: int = 0) -> None:
 		self.camera_index = camera_index
 		self.image_quality = 90  # JPEG quality
-		self.cap = cv2.VideoCapture(self.camera_index)
+		# One texture per output stream, updated in place every frame
+		self._camera_stream = TextureStream()
+		self._handtracked_stream = TextureStream()
+		self._pair_id_cache = {}
+		# Landmarks are filtered and finger presses evaluated after every inference, _process emits the transitions
+		self.landmark_filter = LandmarkFilter(self.smoothing_min_cutoff, self.smoothing_beta)
+		self.gestures = GestureEngine()
+		self.worker = None
+		if self.use_worker_process:
+			# The worker captures, tracks and draws, this process only maps its newest frame and landmarks
+			worker = None
+			try:
+				worker = TrackingWorker(self.frame_source or str(self.camera_index), self.capture_width,
+										self.capture_height, self.capture_fps, self.loop_recording, self.inference_rate,
+										self.tracking_mode, self.pose_interval, self.hand_roi, self.adaptive_quality,
+										self.latency_budget_ms, self.worker_python)
+				worker.start()
+				self.worker = worker
+			except OSError as e:
+				# No interpreter, or one that can't be started
+				print(f"Error: {e}, tracking in this process instead")
+				if worker is not None:
+					worker.stop()
+		if self.worker is not None:
+			self.tracker = self.worker
+			self.governor = self.worker.governor
+			return
+		self.cap = open_source(self.frame_source or str(self.camera_index), self.capture_width, self.capture_height,
+							   self.capture_fps, self.loop_recording)
 		if not self.cap.isOpened():
-			print(f"Error: cannot open camera index {self.camera_index}")
-		# Initialize MediaPipe Hands once to avoid per-frame setup cost
-		self._hands = Hands(
-			model_complexity=1,
-			min_detection_confidence=0.5,
-			min_tracking_confidence=0.5,
-		)
-		# Initialize MediaPipe Pose to infer handedness from wrist positions
-		self._pose = Pose(
-			model_complexity=1,
-			min_detection_confidence=0.5,
-			min_tracking_confidence=0.5,
-		)
-		# Storage for last computed hand landmarks
-		self._last_hand_landmarks = {}
+			print(f"Error: cannot open frame source {self.frame_source or self.camera_index}")
+		# Read the camera on a background thread, the getters only take its newest frame
+		self.capture = FrameCapture(self.cap)
+		self.capture.start()
+		# Mirrored RGB frames are converted into reused buffers, one per stream
+		self._camera_converter = FrameConverter()
+		self._handtracked_converter = FrameConverter()
+		# The governor picks the inference resolution and model complexity
+		self.governor = LatencyGovernor(self.latency_budget_ms, enabled=self.adaptive_quality)
+		# Initialize MediaPipe once to avoid per-frame setup cost, again only when the governor changes the complexity
+		hands, pose = create_models(self.governor.model_complexity)
+		# Inference runs on its own thread, the getters read its latest published result
+		self.tracker = HandTracker(self.capture, hands, pose, self.inference_rate,
+								   self.tracking_mode, self.pose_interval, self.hand_roi,
+								   self.governor, create_models, self._on_tracking_result)
+		self.tracker.start()
+
+	def _exit_tree(self) -> None:
+		if self.worker is not None:
+			self.worker.stop()
+			return
+		self.tracker.stop()
+		self.capture.stop()
+		self.cap.release()
+
+	def _process(self, delta: float) -> None:
+		if self.worker is not None:
+			# Results arrive through shared memory, evaluate the newest one here
+			self._latest_tracking()
+		for side, finger, pressed in self.gestures.pop_transitions():
+			self.finger_state_changed.emit(side, finger, pressed)
+		if self.emit_finger_values:
+			update = self.gestures.pop_values()
+			if update is not None:
+				values, valid = update
+				for hand in np.flatnonzero(valid):
+					self.finger_values_changed.emit(SIDE_NAMES[hand], PackedByteArray.from_memory_view(memoryview(values[hand])).to_float32_array())
+
+	def _on_tracking_result(self, tracking) -> None:
+		# After every inference: filter the landmarks, then look for finger presses
+		filtered = self.landmark_filter.update(tracking)
+		if self.latency_compensation:
+			filtered = self.landmark_filter.predicted(filtered, filtered.inference_time)
+		self.gestures.update(filtered if self.smooth_landmarks or self.latency_compensation else tracking)
+
+	def _latest_tracking(self):
+		"""
+		The newest tracking result the landmark queries use, smoothed unless smooth_landmarks is off.
+		"""
+		tracking = self.tracker.latest
+		if self.worker is not None:
+			self._on_tracking_result(tracking)
+		return self.landmark_filter.latest if self.smooth_landmarks else tracking
+
+	def calibrate_open(self, side: str = "") -> None:
+		"""
+		Calibrate the open hand: the current finger values of a hand ("LEFT"/"RIGHT", both if omitted) become its open values.
+		"""
+		self.gestures.calibrate_open(side_index(side))
+
+	def calibrate_pinch(self, side: str = "") -> None:
+		"""
+		Calibrate the pinch: a finger is pressed from 90% (pinky 80%) of its current value on, see gestures.PRESS_FACTORS.
+		"""
+		self.gestures.calibrate_pinch(side_index(side))
+
+	def get_calibration(self, side: str) -> PackedFloat32Array:
+		"""
+		The open values of the index, middle, ring and pinky finger of a hand, followed by their press values.
+		"""
+		calibration = self.gestures.calibration(max(side_index(side), 0))
+		return PackedByteArray.from_memory_view(memoryview(calibration)).to_float32_array()
 
 	def get_frame(self) -> np.ndarray:
+		"""
+		The newest camera frame (BGR), without waiting for the camera.
+		None until the first frame arrived. The frame is shared, don't modify it.
+		With use_worker_process it is a copy, converted back from the worker's mirrored RGB.
+		"""
+		if self.worker is not None:
+			return self.worker.read_frame(CAMERA_PLANE, lambda rgb: cv2.cvtColor(cv2.flip(rgb, 1), cv2.COLOR_RGB2BGR))
 		if not self.cap.isOpened():
-			print(f"Error: cannot open camera index {self.camera_index}")
-			return None
-		ret, frame = self.cap.read()
-		if not ret:
-			print("Error: failed to capture image")
+			print(f"Error: cannot open frame source {self.frame_source or self.camera_index}")
 			return None
+		_, _, frame = self.capture.latest()
 		return frame
 
+	def get_frame_sequence(self) -> int:
+		"""
+		Sequence number of the newest camera frame, 0 before the first one.
+		It changes with every new frame, so callers can skip frames they already uploaded.
+		"""
+		return (self.worker or self.capture).sequence
+
+	def set_inference_rate(self, rate: float) -> None:
+		"""
+		Change the hand/pose inference rate in Hz while running, 0 for every camera frame.
+		"""
+		self.inference_rate = rate
+		self.tracker.target_rate = rate
+
+	def set_tracking_mode(self, mode: str, pose_interval: int = 30, hand_roi: bool = False) -> None:
+		"""
+		Switch between the "pose" and "hands" tracking modes while running, see tracking_mode.
+		"""
+		self.tracker.set_tracking_mode(mode, pose_interval, hand_roi)
+		self.tracking_mode = mode
+		self.pose_interval = pose_interval
+		self.hand_roi = hand_roi
+
+	def get_quality_level(self) -> int:
+		"""
+		Current inference quality level, 0 is the best, see governor.QUALITY_LEVELS.
+		"""
+		return self.governor.level
+
+	def get_quality_level_count(self) -> int:
+		return len(self.governor.levels)
+
+	def set_quality_level(self, level: int) -> None:
+		"""
+		Pick a quality level by hand, e.g. together with adaptive_quality = false.
+		"""
+		if self.governor.set_level(level):
+			self.tracker.request_quality_update()
+
+	def get_inference_latency_ms(self) -> float:
+		"""
+		Smoothed duration of one hand/pose inference in milliseconds.
+		"""
+		return self.governor.latency_ms
+
+	def get_tracking_sequence(self) -> int:
+		"""
+		Sequence number of the camera frame the current landmarks were computed from, 0 before the first result.
+		"""
+		return self.tracker.latest.sequence
+
 	def get_image(self) -> ImageTexture:
 		_image = Image.new()
+		if self.worker is not None:
+			return self._worker_texture(CAMERA_PLANE, self._camera_stream, _image)
 		if not self.cap.isOpened():
-			print(f"Error: cannot open camera index {self.camera_index}")
+			print(f"Error: cannot open frame source {self.frame_source or self.camera_index}")
 			return _image
 		frame = self.get_frame()
 		if frame is None:
 			return _image
 
-		# Convert BGR (OpenCV) to RGB (Godot expects RGB pixel data)
-		frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-		height, width = frame_rgb.shape[:2]
-		frame_rgb = cv2.flip(frame_rgb, 1)
-		frame_rgb = np.ascontiguousarray(frame_rgb, dtype=np.uint8)
-		pba = PackedByteArray.from_memory_view(memoryview(frame_rgb))
-		# Create image from raw RGB8 pixel data
-		_image = Image.create_from_data(width, height, False, FORMAT_RGB8, pba)
-		img_texture = ImageTexture.create_from_image(_image)
-		return img_texture
+		# Convert BGR (OpenCV) to mirrored RGB (Godot expects RGB pixel data)
+		frame_rgb = self._camera_converter.mirrored_rgb(frame)
+		# Upload the raw RGB8 pixel data into the persistent texture
+		return self._camera_stream.update(frame_rgb)
 
 	def get_last_hand_landmarks_godot(self) -> Dictionary:
 		"""
@@ -78,11 +284,14 @@ class webcam_socket(Node):
 		- Coordinates are normalized (MediaPipe range 0..1 for x/y; z is relative depth).
 		- Python dict and Vector3 are automatically marshalled to Godot Dictionary/Vector3.
 		"""
+		tracking = self._latest_tracking()
 		result = Dictionary.new0()
-		for side, lm_map in self._last_hand_landmarks.items():
+		for hand, side in enumerate(HAND_SIDES):
+			if not tracking.valid[hand]:
+				continue
 			inner = Dictionary.new0()
-			for name, lm in lm_map.items():
-				inner.get_or_add(name, Vector3.new3(lm.x, lm.y, lm.z))
+			for name, (x, y, z) in zip(LANDMARK_NAMES, tracking.landmarks[hand].tolist()):
+				inner.get_or_add(name, Vector3.new3(x, y, z))
 			result.get_or_add(side, inner)
 		return result
 
@@ -91,107 +300,95 @@ class webcam_socket(Node):
 		Return the Euclidean 3D distance between two hand landmarks from the last processed frame.
 		- name_a, name_b: MediaPipe HandLandmark names (e.g., "WRIST", "INDEX_FINGER_TIP").
 		- side: optional hand selector; accepts "LEFT_HAND"/"RIGHT_HAND" or short forms like "left"/"right".
-		  If omitted, the first hand that contains both landmarks is used.
+		  If omitted or that hand wasn't seen, the first hand with landmarks is used.
 		- Returns -1.0 when data is unavailable or landmarks are missing.
 		"""
-		if not getattr(self, "_last_hand_landmarks", None):
-			return -1.0
+		tracking = self._latest_tracking()
+		ids = np.array([landmark_id(name_a), landmark_id(name_b)], dtype=np.intp)
+		return float(landmark_distances(tracking.landmarks, tracking.valid, ids[:1], ids[1:], side_index(side))[0])
 
-		key_a = str(name_a).upper()
-		key_b = str(name_b).upper()
+	def get_landmark_distances(self, pairs, side: str = "") -> PackedFloat32Array:
+		"""
+		Return the distances of several landmark pairs of one hand in a single call.
+		- pairs: flat Array/PackedStringArray of landmark names, every two consecutive names form a pair,
+		  e.g. ["THUMB_TIP", "INDEX_FINGER_TIP", "THUMB_TIP", "MIDDLE_FINGER_TIP"].
+		- side: hand selector like in get_landmark_distance.
+		- Returns one distance per pair, -1.0 where data is unavailable or a name is unknown.
+		"""
+		ids = self._pair_ids(pairs)
+		tracking = self._latest_tracking()
+		distances = landmark_distances(tracking.landmarks, tracking.valid, ids[0::2], ids[1::2], side_index(side))
+		return PackedByteArray.from_memory_view(memoryview(distances)).to_float32_array()
 
-		hand_key = None
-		if side:
-			s = str(side).lower()
-			hand_key = "LEFT_HAND" if s.startswith("l") else ("RIGHT_HAND" if s.startswith("r") else None)
+	def get_predicted_landmark_distances(self, pairs, side: str = "", lead_ms: float = 0.0) -> PackedFloat32Array:
+		"""
+		Like get_landmark_distances, with the landmarks extrapolated from their capture to now plus lead_ms
+		(e.g. the display latency), using the landmark speeds of the smoothing filter.
+		Predictions reach at most filters.MAX_PREDICTION (150 ms) past the capture.
+		"""
+		ids = self._pair_ids(pairs)
+		self._latest_tracking()
+		landmarks, valid = self.landmark_filter.predict(time.monotonic() + lead_ms / 1000)
+		distances = landmark_distances(landmarks, valid, ids[0::2], ids[1::2], side_index(side))
+		return PackedByteArray.from_memory_view(memoryview(distances)).to_float32_array()
 
-		# Build candidate hands to check
-		candidates = []
-		if hand_key and hand_key in self._last_hand_landmarks:
-			candidates = [hand_key]
-		else:
-			candidates = list(self._last_hand_landmarks.keys())
+	def get_landmark_age_ms(self) -> float:
+		"""
+		Time since the frame of the newest landmarks was captured, in milliseconds. -1.0 before the first landmarks.
+		"""
+		tracking = self._latest_tracking()
+		if tracking.sequence == 0:
+			return -1.0
+		return (time.monotonic() - tracking.capture_time) * 1000
 
-		for hk in candidates:
-			lm_map = self._last_hand_landmarks.get(hk, {})
-			if key_a in lm_map and key_b in lm_map:
-				lm1 = lm_map[key_a]
-				lm2 = lm_map[key_b]
-				dx = lm1.x - lm2.x
-				dy = lm1.y - lm2.y
-				dz = lm1.z - lm2.z
-				return float((dx * dx + dy * dy + dz * dz) ** 0.5)
+	def get_capture_to_landmark_ms(self) -> float:
+		"""
+		Smoothed end-to-end latency from frame capture to published landmarks, in milliseconds.
+		"""
+		self._latest_tracking()
+		return self.landmark_filter.latency_ms
 
-		return -1.0
+	def _pair_ids(self, pairs) -> np.ndarray:
+		# The same few pairs are queried every frame, keep their ids
+		names = tuple(str(pairs[i]) for i in range(pairs.size() - pairs.size() % 2))
+		ids = self._pair_id_cache.get(names)
+		if ids is None:
+			ids = self._pair_id_cache[names] = np.array([landmark_id(name) for name in names], dtype=np.intp)
+		return ids
 
 	def get_handtracked_image(self) -> ImageTexture:
 		"""
 		Return an ImageTexture with hand landmarks drawn using MediaPipe Hands.
-		- Captures a frame from the camera
-		- Runs hand tracking (RGB input)
-		- Draws landmarks on the frame (BGR)
-		- Converts to RGB8 and returns as ImageTexture
+		- Takes the newest frame from the capture thread
+		- Converts it to mirrored RGB8 once, into a reused buffer
+		- Draws the latest landmarks of the tracking thread on it, without waiting for inference
+		- Uploads that buffer into the persistent ImageTexture
+		With use_worker_process the worker has drawn the overlay already, its newest frame is uploaded as it is.
 		"""
 		_image = Image.new()
+		if self.worker is not None:
+			return self._worker_texture(HANDTRACKED_PLANE, self._handtracked_stream, _image)
 		if not self.cap.isOpened():
-			print(f"Error: cannot open camera index {self.camera_index}")
+			print(f"Error: cannot open frame source {self.frame_source or self.camera_index}")
 			return _image
 
 		frame = self.get_frame()
 		if frame is None:
 			return _image
+		tracking = self.tracker.latest
 
-		# Prepare for MediaPipe (expects RGB, optionally flip for selfie view)
-		image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-		image_rgb = cv2.flip(image_rgb, 1)
-		image_rgb.flags.writeable = False
-		hand_res = self._hands.process(image_rgb)
-		pose_res = self._pose.process(image_rgb)
-		image_rgb.flags.writeable = True
-		# Determine hand labels ('Left'/'Right') by nearest pose wrist
-
-
-		if pose_res and getattr(pose_res, 'pose_landmarks', None) and hand_res and getattr(hand_res, 'multi_hand_landmarks', None):
-			lw = pose_res.pose_landmarks.landmark[PoseLandmark.LEFT_WRIST.value]
-			rw = pose_res.pose_landmarks.landmark[PoseLandmark.RIGHT_WRIST.value]
-			for hand_landmarks in hand_res.multi_hand_landmarks:
-				# Determine hand labels ('Left'/'Right') by nearest pose wrist
-				mapped_handmarks = {HandLandmark(i).name: hand_landmarks.landmark[i] for i in range(21)}
-				left_distance = np.linalg.norm(np.array([lw.x, lw.y]) - np.array([hand_landmarks.landmark[0].x, hand_landmarks.landmark[0].y]))
-				right_distance = np.linalg.norm(np.array([rw.x, rw.y]) - np.array([hand_landmarks.landmark[0].x, hand_landmarks.landmark[0].y]))
-				if left_distance > right_distance: #Inverted because of image inverted
-					self._last_hand_landmarks["LEFT_HAND"] = mapped_handmarks
-				else:
-					self._last_hand_landmarks["RIGHT_HAND"] = mapped_handmarks
-
-		# Convert back to BGR for drawing
-		image_bgr = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
-
-		# Draw pose landmarks and connections on the image if available
-		if pose_res and getattr(pose_res, 'pose_landmarks', None):
-			try:
-				drawing_utils.draw_landmarks(
-					image_bgr,
-					pose_res.pose_landmarks,
-					POSE_CONNECTIONS,
-				)
-			except Exception:
-				pass
-
-		# Draw hand landmarks and connections on the image if available
-		if hand_res and getattr(hand_res, 'multi_hand_landmarks', None):
-			for hand_landmarks in hand_res.multi_hand_landmarks:
-				drawing_utils.draw_landmarks(
-					image_bgr,
-					hand_landmarks,
-					HAND_CONNECTIONS,
-				)
-
-		# Convert to RGB for Godot and build ImageTexture
-		frame_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-		height, width = frame_rgb.shape[:2]
-		frame_rgb = np.ascontiguousarray(frame_rgb, dtype=np.uint8)
-		pba = PackedByteArray.from_memory_view(memoryview(frame_rgb))
-		_image = Image.create_from_data(width, height, False, FORMAT_RGB8, pba)
-		img_texture = ImageTexture.create_from_image(_image)
-		return img_texture
+		# Same orientation as the tracked image (selfie view), the overlay is drawn onto this buffer
+		frame_rgb = self._handtracked_converter.mirrored_rgb(frame)
+
+		draw_tracking(frame_rgb, tracking)
+
+		# The buffer is contiguous RGB8 already, it goes to Godot without another copy
+		return self._handtracked_stream.update(frame_rgb)
+
+	def _worker_texture(self, plane: int, stream: TextureStream, empty: Image):
+		# The shared memory plane goes into the texture without an intermediate copy
+		texture = self.worker.read_frame(plane, stream.update)
+		if texture is not None:
+			return texture
+		# No new frame or a torn read: keep showing the last one
+		return stream.texture if stream.texture is not None else empty
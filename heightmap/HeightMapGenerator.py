@@ -1,64 +1,164 @@
-from py4godot import gdproperty, signal, private, gdclass, SignalArg
+from py4godot import gdproperty, signal, gdclass, SignalArg
 
 from py4godot.classes.Image import Image
 from py4godot.classes.Node3D import Node3D
-import noise
+from py4godot.classes.ProjectSettings import ProjectSettings
 import numpy as np
 
-from py4godot.classes.core import Color
+from py4godot.classes.core import Array, PackedByteArray
+from heightmaps import (GENERATORS, FORMAT_RGB8, heightmap_to_pixels, build_terrain_mesh, encode_packed_array,
+						TYPE_PACKED_INT32_ARRAY, TYPE_PACKED_VECTOR2_ARRAY, TYPE_PACKED_VECTOR3_ARRAY, FORMAT_RF)
+from heightmap_cache import HeightmapCache
+from terrain_chunks import ChunkStreamer
 
-def create_sinusoidal_heightmap(width:int, height:int) -> np.ndarray:
-	scale = 0.1
+CACHE_DIRECTORY = "user://heightmap_cache"
 
-	# Generate sinusoidal heightmap
-	x = np.linspace(0, width * scale, width)
-	y = np.linspace(0, height * scale, height)
-	X, Y = np.meshgrid(x, y)
+# Mesh.ArrayType slots used by ArrayMesh.add_surface_from_arrays
+ARRAY_VERTEX = 0
+ARRAY_NORMAL = 1
+ARRAY_TEX_UV = 4
+ARRAY_INDEX = 12
+ARRAY_MAX = 13
 
-	heightmap = np.sin(X) * np.cos(Y)
-
-	# Normalize to [0, 1] range
-	heightmap = (heightmap - np.min(heightmap)) / (np.max(heightmap) - np.min(heightmap))
+def generate_heightmap(width:int, height:int, generator:str="sinusoidal", cache:HeightmapCache=None) -> np.ndarray:
+	if cache is None:
+		heightmap = GENERATORS[generator](width, height)
+	else:
+		heightmap = cache.get_or_create(generator, width, height)
+	# heightmap_to_pixels expects [x, y], a transposed map would still fill the image, scrambled
+	if heightmap.shape != (width, height):
+		raise ValueError(f"Generator {generator} returned a {heightmap.shape} heightmap, expected {(width, height)} indexed [x, y]")
 	return heightmap
 
-def create_perlin_heightmap(width:int, height:int) -> np.ndarray:
-	scale = 100.0  # Adjust for the "zoom" of the noise
-
-	# Generate heightmap
-	heightmap = np.zeros((width, height))
-
-	for x in range(width):
-		for y in range(height):
-			# Perlin noise: octaves, persistence, and lacunarity can tweak the result
-			heightmap[x][y] = noise.pnoise2(x / scale,
-											y / scale,
-											octaves=6,
-											persistence=0.5,
-											lacunarity=2.0,
-											repeatx=1024,
-											repeaty=1024,
-											base=42)
-
-	# Normalize to [0, 1] range
-	heightmap = (heightmap - np.min(heightmap)) / (np.max(heightmap) - np.min(heightmap))
-	return heightmap
-def create_for_godot_image(width:int,height:int,gd_heightmap:Image)->None:
-	heightmap = create_sinusoidal_heightmap(width, height)
-	for x in range(width):
-		for y in range(height):
-			numpy_color = heightmap[x,y]
-			gd_heightmap.set_pixel(x,y, Color.new3(numpy_color, numpy_color, numpy_color))
-
-def create_heightmap(width:int,height:int)->Image:
-	image: Image = Image.create(width, height, true, Image.FORMAT_RGB8)
-	heightmap = create_sinusoidal_heightmap(width, height)
-	for x in range(width):
-		for y in range(height):
-			numpy_color = heightmap[x,y]
-			gd_heightmap.set_pixel(x,y, Color.new3(numpy_color, numpy_color, numpy_color))
-	return image
+def create_for_godot_image(width:int,height:int,gd_heightmap:Image, generator:str="sinusoidal", cache:HeightmapCache=None)->None:
+	heightmap = generate_heightmap(width, height, generator, cache)
+	# Keep the image's format, only its pixels are replaced in one call
+	image_format = gd_heightmap.get_format()
+	had_mipmaps = gd_heightmap.has_mipmaps()
+	pixels = heightmap_to_pixels(heightmap, image_format)
+	gd_heightmap.set_data(width, height, False, image_format, PackedByteArray.from_memory_view(memoryview(pixels)))
+	if had_mipmaps:
+		gd_heightmap.generate_mipmaps()
+
+def create_heightmap(width:int,height:int, generator:str="sinusoidal", image_format:int=FORMAT_RGB8, cache:HeightmapCache=None)->Image:
+	heightmap = generate_heightmap(width, height, generator, cache)
+	pixels = heightmap_to_pixels(heightmap, image_format)
+	return Image.create_from_data(width, height, False, image_format, PackedByteArray.from_memory_view(memoryview(pixels)))
+
+def to_packed_array(values:np.ndarray, variant_type:int):
+	# One memcpy into a PackedByteArray, then Godot decodes the packed array natively
+	return PackedByteArray.from_memory_view(memoryview(encode_packed_array(values, variant_type))).decode_var(0)
+
+def create_mesh_arrays(heightmap:np.ndarray, scale:float, displacement:float) -> Array:
+	return mesh_to_arrays(build_terrain_mesh(heightmap, scale, displacement))
+
+def mesh_to_arrays(mesh) -> Array:
+	vertices, normals, uvs, indices = mesh
+	packed = {
+		ARRAY_VERTEX: to_packed_array(vertices, TYPE_PACKED_VECTOR3_ARRAY),
+		ARRAY_NORMAL: to_packed_array(normals, TYPE_PACKED_VECTOR3_ARRAY),
+		ARRAY_TEX_UV: to_packed_array(uvs, TYPE_PACKED_VECTOR2_ARRAY),
+		ARRAY_INDEX: to_packed_array(indices.view(np.int32), TYPE_PACKED_INT32_ARRAY),
+	}
+	arrays = Array.new0()
+	for slot in range(ARRAY_MAX):
+		arrays.append(packed.get(slot))
+	return arrays
 
 @gdclass
 class HeightMapGenerator(Node3D):
+	# Name of the heightmap function in heightmaps.GENERATORS ("sinusoidal", "perlin", "perlin_vectorized", "perlin_parallel")
+	generator: str = gdproperty(str, "sinusoidal")
+
+	# Keep generated heightmaps in user://heightmap_cache and load them from there when the
+	# generator and size are the same, see heightmap_cache.HeightmapCache
+	use_cache: bool = gdproperty(bool, True)
+	cache_size_mb: int = gdproperty(int, 256)
+
+	# Chunked terrain streaming, see stream_terrain. chunk_size must be divisible by 2**(chunk_lods - 1)
+	chunk_size: int = gdproperty(int, 64)
+	chunk_lods: int = gdproperty(int, 3)
+	# Number of chunk rings around the center per LOD level
+	lod_distance: int = gdproperty(int, 2)
+	# Chunks generated at the same time, further requests wait
+	max_chunks_in_flight: int = gdproperty(int, 4)
+	chunk_workers: int = gdproperty(int, 2)
+	chunk_scale: float = gdproperty(float, 0.1)
+	chunk_displacement: float = gdproperty(float, 2.0)
+
+	# Emitted on the main thread for every generated chunk: its FORMAT_RF heightmap tile and the
+	# arrays for ArrayMesh.add_surface_from_arrays, in world space
+	chunk_ready = signal([SignalArg("cx", int), SignalArg("cy", int), SignalArg("lod", int),
+						  SignalArg("heightmap", Image), SignalArg("arrays", Array)])
+	# Emitted when a chunk left the streaming radius and its mesh can be freed
+	chunk_unloaded = signal([SignalArg("cx", int), SignalArg("cy", int)])
+
+	def _ready(self) -> None:
+		self._streamer = None
+		self._cache = None
+
+	def _process(self, delta:float) -> None:
+		if self._streamer is None:
+			return
+		for cx, cy, lod, heightmap, mesh in self._streamer.poll():
+			size = heightmap.shape[0]
+			image = Image.create_from_data(size, size, False, FORMAT_RF,
+										   PackedByteArray.from_memory_view(memoryview(heightmap_to_pixels(heightmap, FORMAT_RF))))
+			self.chunk_ready.emit(cx, cy, lod, image, mesh_to_arrays(mesh))
+
+	def _exit_tree(self) -> None:
+		if self._streamer is not None:
+			self._streamer.shutdown()
+
+	def _get_streamer(self) -> ChunkStreamer:
+		if self._streamer is None:
+			self._streamer = ChunkStreamer(self.chunk_size, self.chunk_lods, self.lod_distance, self.max_chunks_in_flight,
+										   self.chunk_workers, self.chunk_scale, self.chunk_displacement)
+		return self._streamer
+
+	def stream_terrain(self, world_x:float, world_z:float, radius:int) -> int:
+		"""
+		Keep the chunks within radius chunks of a world position (e.g. the camera) generated.
+		Call it whenever the position moves; new chunks arrive through chunk_ready, delivered
+		chunks that left the radius are reported through chunk_unloaded.
+
+		Returns the number of chunks still waiting or being generated.
+		"""
+		streamer = self._get_streamer()
+		cx, cy = streamer.chunk_at(world_x, world_z)
+		for dropped_cx, dropped_cy in streamer.stream_around(cx, cy, radius):
+			self.chunk_unloaded.emit(dropped_cx, dropped_cy)
+		return streamer.pending_count()
+
+	def request_chunk(self, cx:int, cy:int, lod:int = 0) -> None:
+		"""
+		Generate a single chunk in the background, reported through chunk_ready.
+		"""
+		self._get_streamer().request(cx, cy, lod)
+
+	def _get_cache(self):
+		if not self.use_cache:
+			return None
+		if self._cache is None:
+			directory = str(ProjectSettings.instance().globalize_path(CACHE_DIRECTORY))
+			self._cache = HeightmapCache(directory, self.cache_size_mb * 2 ** 20)
+		return self._cache
+
 	def fill_height_map(self,width:int, height:int, heightmap:Image) -> None:
-		create_for_godot_image(width, height, heightmap)
+		create_for_godot_image(width, height, heightmap, self.generator, self._get_cache())
+
+	def create_height_map(self, width:int, height:int, image_format:int = FORMAT_RGB8) -> Image:
+		return create_heightmap(width, height, self.generator, image_format, self._get_cache())
+
+	def clear_cache(self) -> None:
+		cache = self._get_cache()
+		if cache is not None:
+			cache.clear()
+
+	def create_terrain_arrays(self, width:int, height:int, scale:float = 0.1, displacement:float = 2.0) -> Array:
+		"""
+		Generate a heightmap and return it as an indexed terrain mesh, ready for
+		ArrayMesh.add_surface_from_arrays(Mesh.PRIMITIVE_TRIANGLES, arrays).
+		"""
+		heightmap = generate_heightmap(width, height, self.generator, self._get_cache())
+		return create_mesh_arrays(heightmap, scale, displacement)
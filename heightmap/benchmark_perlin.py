@@ -0,0 +1,73 @@
+"""
+Compare the per pixel noise.pnoise2 loop with the vectorized Perlin heightmap, and measure
+how create_parallel_perlin_heightmap scales from 1 to N threads or processes.
+
+Usage:
+	python benchmark_perlin.py
+	python benchmark_perlin.py --sizes 256 512 1024 2048 --skip-loop-above 1024
+	python benchmark_perlin.py --scaling 2048 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from heightmaps import create_perlin_heightmap, create_vectorized_perlin_heightmap, create_parallel_perlin_heightmap
+
+
+def best_time(function, size, repeats):
+	best = float("inf")
+	result = None
+	for _ in range(repeats):
+		start = time.perf_counter()
+		result = function(size, size)
+		best = min(best, time.perf_counter() - start)
+	return best, result
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--sizes", nargs="+", type=int, default=[128, 256, 512, 1024])
+	parser.add_argument("--repeats", type=int, default=3)
+	parser.add_argument("--skip-loop-above", type=int, default=1024, help="don't run the slow loop for larger maps")
+	parser.add_argument("--scaling", type=int, metavar="SIZE", help="only run the parallel scaling benchmark on a SIZExSIZE map")
+	parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, os.cpu_count() or 1])
+	args = parser.parse_args()
+
+	if args.scaling:
+		scaling(args.scaling, sorted(set(args.workers)), args.repeats)
+		return
+
+	print(f"{'size':>11} {'loop':>10} {'vectorized':>11} {'speedup':>8} {'max diff':>9}")
+	for size in args.sizes:
+		vectorized_time, vectorized = best_time(create_vectorized_perlin_heightmap, size, args.repeats)
+		if size > args.skip_loop_above:
+			print(f"{size:>5}x{size:<5} {'-':>10} {vectorized_time * 1000:>9.1f}ms {'-':>8} {'-':>9}")
+			continue
+		loop_time, loop = best_time(create_perlin_heightmap, size, 1)
+		difference = np.abs(loop - vectorized).max()
+		print(f"{size:>5}x{size:<5} {loop_time * 1000:>8.1f}ms {vectorized_time * 1000:>9.1f}ms "
+			  f"{loop_time / vectorized_time:>7.1f}x {difference:>9.2g}")
+
+
+def scaling(size, worker_counts, repeats):
+	reference_time, reference = best_time(create_vectorized_perlin_heightmap, size, repeats)
+	print(f"{size}x{size}, single core vectorized: {reference_time * 1000:.1f}ms, {os.cpu_count()} cores available")
+	print(f"{'workers':>7} {'threads':>10} {'speedup':>8} {'processes':>10} {'speedup':>8} {'identical':>9}")
+	for workers in worker_counts:
+		# Pools are created outside of the timings, process start up would dominate otherwise
+		with ThreadPoolExecutor(workers) as threads, ProcessPoolExecutor(workers) as processes:
+			thread_time, thread_result = best_time(
+				lambda w, h: create_parallel_perlin_heightmap(w, h, workers=workers, executor=threads), size, repeats)
+			create_parallel_perlin_heightmap(64, 64, workers=workers, processes=True, executor=processes)  # start the workers
+			process_time, process_result = best_time(
+				lambda w, h: create_parallel_perlin_heightmap(w, h, workers=workers, processes=True, executor=processes), size, repeats)
+		identical = np.array_equal(thread_result, reference) and np.array_equal(process_result, reference)
+		print(f"{workers:>7} {thread_time * 1000:>8.1f}ms {reference_time / thread_time:>7.2f}x "
+			  f"{process_time * 1000:>8.1f}ms {reference_time / process_time:>7.2f}x {str(identical):>9}")
+
+
+if __name__ == "__main__":
+	main()
@@ -11,10 +11,40 @@ var SCALE = 0.1
 var DISPLACEMENT = 2
 var generator_path:NodePath = "Generator"
 var generator:Node
+# Build the mesh in Python (indexed, with normals and UVs) instead of the GDScript loop below
+var use_python_mesh = true
+# Stream an endless terrain in chunks around the camera instead of one fixed mesh
+var use_chunk_streaming = false
+var camera_path:NodePath = "../Camera3D"
+var stream_radius = 4
+var chunks = {}
 
 func _ready() -> void:
 	generator = get_node(generator_path)
-	generate_terrain_from_buffer()
+	if use_chunk_streaming:
+		generator.connect("chunk_ready", add_chunk)
+		generator.connect("chunk_unloaded", remove_chunk)
+	elif use_python_mesh:
+		generate_terrain_from_arrays()
+	else:
+		generate_terrain_from_buffer()
+
+func _process(_delta: float) -> void:
+	if not use_chunk_streaming:
+		return
+	var camera_position = get_node(camera_path).global_position
+	generator.call("stream_terrain", camera_position.x, camera_position.z, stream_radius)
+
+func add_chunk(cx:int, cy:int, _lod:int, _heightmap:Image, arrays:Array):
+	# A chunk is generated again when its LOD changes, replace the old mesh
+	remove_chunk(cx, cy)
+	chunks[Vector2i(cx, cy)] = add_terrain_mesh(arrays)
+
+func remove_chunk(cx:int, cy:int):
+	var key = Vector2i(cx, cy)
+	if chunks.has(key):
+		chunks[key].queue_free()
+		chunks.erase(key)
 
 func generate_height_value(val:float):
 	return (val - 0.5) * DISPLACEMENT 
@@ -55,11 +85,21 @@ func generate_terrain_from_buffer():
 		for y in range(0, height - 1):
 			generate_triangles_for_pixel(x, y, heightmap)
 	
-	var array_mesh = ArrayMesh.new()
 	var arrays = []
 	arrays.resize(Mesh.ARRAY_MAX)
 	arrays[Mesh.ARRAY_VERTEX] = vertices
+	add_terrain_mesh(arrays)
 
+func generate_terrain_from_arrays():
+	var width = 512
+	var height = 512
+
+	# Shared vertices, normals, UVs and the index buffer, all computed in NumPy
+	var arrays = generator.call("create_terrain_arrays", width, height, SCALE, DISPLACEMENT)
+	add_terrain_mesh(arrays)
+
+func add_terrain_mesh(arrays:Array) -> MeshInstance3D:
+	var array_mesh = ArrayMesh.new()
 	array_mesh.add_surface_from_arrays(Mesh.PRIMITIVE_TRIANGLES, arrays)
 
 	var terrain_mesh = MeshInstance3D.new()
@@ -69,3 +109,4 @@ func generate_terrain_from_buffer():
 	material.albedo_color = Color(0.8, 0.8, 0.8)  # Set the color to gray (or any other color)
 	terrain_mesh.material_override = material
 	add_child(terrain_mesh)
+	return terrain_mesh
@@ -0,0 +1,117 @@
+import hashlib
+import inspect
+import json
+import os
+import threading
+
+import numpy as np
+
+from heightmaps import GENERATORS
+
+# Part of every key, bump it when the output of a generator changes for the same parameters
+CACHE_VERSION = 2
+
+class HeightmapCache:
+	"""
+	Content addressed disk cache for generated heightmaps.
+
+	A heightmap is stored as <directory>/<key>.npy, the key is a hash of the generator name and
+	all of its arguments (including the defaults), so a changed size, scale, octave count or seed
+	gives a new entry. Hits are memory-mapped read only with np.load(mmap_mode="r") instead of
+	being read into memory. The directory is kept below max_bytes by deleting the least recently
+	used files, a hit refreshes the modification time used for that.
+	"""
+
+	def __init__(self, directory:str, max_bytes:int=256 * 2 ** 20):
+		self.directory = directory
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+		self._lock = threading.Lock()
+		os.makedirs(directory, exist_ok=True)
+
+	@staticmethod
+	def key(generator:str, *args, **kwargs) -> str:
+		signature = inspect.signature(GENERATORS[generator])
+		arguments = signature.bind(*args, **kwargs)
+		arguments.apply_defaults()
+		description = {"version": CACHE_VERSION, "generator": generator, "arguments": arguments.arguments}
+		return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+	def path(self, key:str) -> str:
+		return os.path.join(self.directory, key + ".npy")
+
+	def get(self, key:str):
+		"""
+		The cached heightmap as a read only memory-mapped array, or None.
+		"""
+		path = self.path(key)
+		try:
+			heightmap = np.load(path, mmap_mode="r")
+		except (OSError, ValueError):
+			self.misses += 1
+			return None
+		try:
+			os.utime(path)
+		except OSError:
+			pass
+		self.hits += 1
+		return heightmap
+
+	def put(self, key:str, heightmap:np.ndarray) -> None:
+		path = self.path(key)
+		# Write to a temporary file first, so a reader never sees a half written entry
+		temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+		with open(temporary, "wb") as f:
+			np.save(f, heightmap)
+		os.replace(temporary, path)
+		self.evict()
+
+	def get_or_create(self, generator:str, *args, **kwargs) -> np.ndarray:
+		"""
+		The heightmap GENERATORS[generator](*args, **kwargs), generated only if it isn't cached.
+		"""
+		key = self.key(generator, *args, **kwargs)
+		heightmap = self.get(key)
+		if heightmap is None:
+			heightmap = GENERATORS[generator](*args, **kwargs)
+			self.put(key, heightmap)
+		return heightmap
+
+	def entries(self):
+		"""
+		(modification time, size, path) of every cached heightmap, least recently used first.
+		"""
+		entries = []
+		for entry in os.scandir(self.directory):
+			if entry.name.endswith(".npy"):
+				stat = entry.stat()
+				entries.append((stat.st_mtime, stat.st_size, entry.path))
+		return sorted(entries)
+
+	def evict(self) -> int:
+		"""
+		Delete least recently used entries until the cache fits into max_bytes.
+		Returns the number of deleted files.
+		"""
+		with self._lock:
+			entries = self.entries()
+			total = sum(size for _, size, _ in entries)
+			deleted = 0
+			for _, size, path in entries:
+				if total <= self.max_bytes:
+					break
+				try:
+					os.remove(path)
+				except OSError:  # e.g. still memory-mapped on Windows
+					continue
+				total -= size
+				deleted += 1
+			return deleted
+
+	def clear(self) -> None:
+		for _, _, path in self.entries():
+			try:
+				os.remove(path)
+			except OSError:
+				pass
@@ -0,0 +1,395 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import noise
+import numpy as np
+
+def create_sinusoidal_heightmap(width:int, height:int) -> np.ndarray:
+	scale = 0.1
+
+	# Generate sinusoidal heightmap, indexed [x, y] like the other generators
+	x = np.linspace(0, width * scale, width)
+	y = np.linspace(0, height * scale, height)
+	X, Y = np.meshgrid(x, y, indexing="ij")
+
+	heightmap = np.sin(X) * np.cos(Y)
+
+	# Normalize to [0, 1] range
+	heightmap = (heightmap - np.min(heightmap)) / (np.max(heightmap) - np.min(heightmap))
+	return heightmap
+
+def create_perlin_heightmap(width:int, height:int) -> np.ndarray:
+	scale = 100.0  # Adjust for the "zoom" of the noise
+
+	# Generate heightmap
+	heightmap = np.zeros((width, height))
+
+	for x in range(width):
+		for y in range(height):
+			# Perlin noise: octaves, persistence, and lacunarity can tweak the result
+			heightmap[x][y] = noise.pnoise2(x / scale,
+											y / scale,
+											octaves=6,
+											persistence=0.5,
+											lacunarity=2.0,
+											repeatx=1024,
+											repeaty=1024,
+											base=42)
+
+	# Normalize to [0, 1] range
+	heightmap = (heightmap - np.min(heightmap)) / (np.max(heightmap) - np.min(heightmap))
+	return heightmap
+
+# Ken Perlin's permutation table, the same one the noise package uses
+PERMUTATION = np.array([
+	151, 160, 137, 91, 90, 15, 131, 13, 201, 95, 96, 53, 194, 233, 7, 225,
+	140, 36, 103, 30, 69, 142, 8, 99, 37, 240, 21, 10, 23, 190, 6, 148,
+	247, 120, 234, 75, 0, 26, 197, 62, 94, 252, 219, 203, 117, 35, 11, 32,
+	57, 177, 33, 88, 237, 149, 56, 87, 174, 20, 125, 136, 171, 168, 68, 175,
+	74, 165, 71, 134, 139, 48, 27, 166, 77, 146, 158, 231, 83, 111, 229, 122,
+	60, 211, 133, 230, 220, 105, 92, 41, 55, 46, 245, 40, 244, 102, 143, 54,
+	65, 25, 63, 161, 1, 216, 80, 73, 209, 76, 132, 187, 208, 89, 18, 169,
+	200, 196, 135, 130, 116, 188, 159, 86, 164, 100, 109, 198, 173, 186, 3, 64,
+	52, 217, 226, 250, 124, 123, 5, 202, 38, 147, 118, 126, 255, 82, 85, 212,
+	207, 206, 59, 227, 47, 16, 58, 17, 182, 189, 28, 42, 223, 183, 170, 213,
+	119, 248, 152, 2, 44, 154, 163, 70, 221, 153, 101, 155, 167, 43, 172, 9,
+	129, 22, 39, 253, 19, 98, 108, 110, 79, 113, 224, 232, 178, 185, 112, 104,
+	218, 246, 97, 228, 251, 34, 242, 193, 238, 210, 144, 12, 191, 179, 162, 241,
+	81, 51, 145, 235, 249, 14, 239, 107, 49, 192, 214, 31, 181, 199, 106, 157,
+	184, 84, 204, 176, 115, 121, 50, 45, 127, 4, 150, 254, 138, 236, 205, 93,
+	222, 114, 67, 29, 24, 72, 243, 141, 128, 195, 78, 66, 215, 61, 156, 180
+], dtype=np.intp)
+# Repeated so that lookups of the form PERM[PERM[i] + j] never need a modulo. The noise
+# package only stores two copies and reads past its table once PERM[i] + j + base > 511
+# (large maps with a base seed), there the vectorized noise wraps around instead.
+PERM = np.tile(PERMUTATION, 4)
+# x/y components of the gradients the noise package picks with (hash & 15)
+GRAD2 = np.array([
+	[1, 1], [-1, 1], [1, -1], [-1, -1],
+	[1, 0], [-1, 0], [1, 0], [-1, 0],
+	[0, 1], [0, -1], [0, 1], [0, -1],
+	[1, 0], [-1, 0], [0, -1], [0, 1],
+], dtype=np.float32)
+# Gradient components of the corner hashed to PERM[i], so a lookup is a single np.take
+GRAD_X = GRAD2[PERMUTATION & 15, 0]
+GRAD_Y = GRAD2[PERMUTATION & 15, 1]
+
+def _fade(t:np.ndarray) -> np.ndarray:
+	return t * t * t * (t * (t * 6 - 15) + 10)
+
+def _lerp(t:np.ndarray, a:np.ndarray, b:np.ndarray) -> np.ndarray:
+	return a + t * (b - a)
+
+def _grad(corner:np.ndarray, x:np.ndarray, y:np.ndarray) -> np.ndarray:
+	# Gradient of hash PERM[corner] (corner < 256) dotted with the offset to that corner
+	return x * np.take(GRAD_X, corner) + y * np.take(GRAD_Y, corner)
+
+def _lattice(coords:np.ndarray, repeat:np.float32, base:int):
+	"""
+	Per axis part of noise.pnoise2: the wrapped lattice cell (and its neighbour) and the fractional position.
+	"""
+	cell = np.floor(np.fmod(coords, repeat)).astype(np.intp)
+	next_cell = np.fmod((cell + 1).astype(np.float32), repeat).astype(np.intp)
+	frac = coords - np.floor(coords)
+	return (cell & 255) + base, (next_cell & 255) + base, frac
+
+def perlin_noise2(x:np.ndarray, y:np.ndarray, repeatx:float=1024, repeaty:float=1024, base:int=0) -> np.ndarray:
+	"""
+	One octave of improved Perlin noise on the grid spanned by the 1D coordinate arrays x and y.
+	Returns an array of shape (len(x), len(y)), computed in float32 exactly like noise.pnoise2.
+	"""
+	x = np.asarray(x, dtype=np.float32)
+	y = np.asarray(y, dtype=np.float32)
+	i, ii, xf = _lattice(x, np.float32(repeatx), base)
+	j, jj, yf = _lattice(y, np.float32(repeaty), base)
+	fx = _fade(xf)[:, None]
+	fy = _fade(yf)[None, :]
+	xf = xf[:, None]
+	yf = yf[None, :]
+
+	# Hash the four corners of every cell
+	A = PERM[i][:, None]
+	B = PERM[ii][:, None]
+	AA = np.take(PERM, A + j[None, :])
+	AB = np.take(PERM, A + jj[None, :])
+	BA = np.take(PERM, B + j[None, :])
+	BB = np.take(PERM, B + jj[None, :])
+
+	return _lerp(fy, _lerp(fx, _grad(AA, xf, yf),
+							   _grad(BA, xf - 1, yf)),
+					 _lerp(fx, _grad(AB, xf, yf - 1),
+							   _grad(BB, xf - 1, yf - 1)))
+
+def fractal_perlin_noise2(x:np.ndarray, y:np.ndarray, octaves:int=1, persistence:float=0.5, lacunarity:float=2.0,
+						  repeatx:float=1024, repeaty:float=1024, base:int=0) -> np.ndarray:
+	"""
+	Sum of octaves of perlin_noise2 over whole arrays, with the same frequency, amplitude
+	and tiling progression as noise.pnoise2(x, y, octaves, persistence, lacunarity, repeatx, repeaty, base).
+	"""
+	x = np.asarray(x, dtype=np.float32)
+	y = np.asarray(y, dtype=np.float32)
+	freq = np.float32(1.0)
+	amp = np.float32(1.0)
+	max_amp = np.float32(0.0)
+	total = np.zeros((len(x), len(y)), dtype=np.float32)
+	for _ in range(octaves):
+		total += perlin_noise2(x * freq, y * freq, np.float32(repeatx) * freq, np.float32(repeaty) * freq, base) * amp
+		max_amp += amp
+		freq *= np.float32(lacunarity)
+		amp *= np.float32(persistence)
+	return total / max_amp
+
+def create_vectorized_perlin_heightmap(width:int, height:int, scale:float=100.0, octaves:int=6, persistence:float=0.5,
+									   lacunarity:float=2.0, repeatx:float=1024, repeaty:float=1024, base:int=42) -> np.ndarray:
+	"""
+	Vectorized version of create_perlin_heightmap with the same parameters and the same (width, height) layout.
+	The result only depends on the parameters, so a given base seed always gives the same map.
+	"""
+	x = np.arange(width) / scale
+	y = np.arange(height) / scale
+	heightmap = fractal_perlin_noise2(x, y, octaves, persistence, lacunarity, repeatx, repeaty, base).astype(np.float64)
+
+	# Normalize to [0, 1] range
+	heightmap = (heightmap - np.min(heightmap)) / (np.max(heightmap) - np.min(heightmap))
+	return heightmap
+
+def _fill_perlin_band(out:np.ndarray, start:int, stop:int, height:int, scale:float, noise_args:tuple) -> None:
+	x = np.arange(start, stop) / scale
+	y = np.arange(height) / scale
+	out[start:stop] = fractal_perlin_noise2(x, y, *noise_args)
+
+def _fill_shared_perlin_band(shared_name:str, shape:tuple, start:int, stop:int, scale:float, noise_args:tuple) -> None:
+	# Runs in a worker process, the band is written straight into the parent's shared memory
+	shared = shared_memory.SharedMemory(name=shared_name)
+	out = np.ndarray(shape, dtype=np.float32, buffer=shared.buf)
+	try:
+		_fill_perlin_band(out, start, stop, shape[1], scale, noise_args)
+	finally:
+		del out
+		try:
+			shared.close()
+		except BufferError:
+			# The traceback of a failed band still references the view, let its error through
+			pass
+
+def create_parallel_perlin_heightmap(width:int, height:int, scale:float=100.0, octaves:int=6, persistence:float=0.5,
+									 lacunarity:float=2.0, repeatx:float=1024, repeaty:float=1024, base:int=42,
+									 workers:int=None, processes:bool=False, executor=None) -> np.ndarray:
+	"""
+	create_vectorized_perlin_heightmap split into bands of x, generated by several workers.
+	Every noise value only depends on its own coordinates and the map is normalized once all
+	bands are done, so the result is bit-identical to the single core version.
+
+	With processes=False the bands run on threads, NumPy releases the GIL in the noise kernel.
+	With processes=True they run in worker processes and are written into a shared memory
+	array, so no band is pickled back. Pass an executor of the matching kind to reuse its workers.
+	Processes need a Python executable to start, which the interpreter embedded in Godot doesn't
+	provide by default.
+	"""
+	workers = workers or os.cpu_count() or 1
+	noise_args = (octaves, persistence, lacunarity, repeatx, repeaty, base)
+	bounds = np.linspace(0, width, min(workers, max(width, 1)) + 1).astype(int)
+	bands = list(zip(bounds[:-1], bounds[1:]))
+
+	shared = None
+	noise_values = None
+	own_executor = executor is None
+	try:
+		if processes:
+			shared = shared_memory.SharedMemory(create=True, size=max(1, width * height * 4))
+			noise_values = np.ndarray((width, height), dtype=np.float32, buffer=shared.buf)
+			executor = executor or ProcessPoolExecutor(max_workers=workers)
+			futures = [executor.submit(_fill_shared_perlin_band, shared.name, (width, height), int(start), int(stop), scale, noise_args)
+					   for start, stop in bands]
+		else:
+			noise_values = np.empty((width, height), dtype=np.float32)
+			executor = executor or ThreadPoolExecutor(max_workers=workers)
+			futures = [executor.submit(_fill_perlin_band, noise_values, int(start), int(stop), height, scale, noise_args)
+					   for start, stop in bands]
+		for future in futures:
+			future.result()
+		heightmap = noise_values.astype(np.float64)
+	finally:
+		if own_executor and executor is not None:
+			executor.shutdown()
+		# The view has to go before the shared buffer can be released, also when a band failed
+		noise_values = None
+		if shared is not None:
+			try:
+				shared.close()
+			except BufferError:
+				pass
+			shared.unlink()
+
+	# Normalize to [0, 1] range
+	heightmap = (heightmap - np.min(heightmap)) / (np.max(heightmap) - np.min(heightmap))
+	return heightmap
+
+# Heightmap generators that can be selected by name on HeightMapGenerator
+GENERATORS = {
+	"sinusoidal": create_sinusoidal_heightmap,
+	"perlin": create_perlin_heightmap,
+	"perlin_vectorized": create_vectorized_perlin_heightmap,
+	"perlin_parallel": create_parallel_perlin_heightmap,
+}
+
+# Godot Image.Format values the heightmap can be written as
+FORMAT_L8 = 0
+FORMAT_RGB8 = 4
+FORMAT_RF = 8
+
+def heightmap_to_pixels(heightmap:np.ndarray, image_format:int=FORMAT_RGB8) -> np.ndarray:
+	"""
+	Convert a [0, 1] heightmap indexed [x, y] into the raw, row major pixel bytes of a Godot image.
+	FORMAT_RGB8 and FORMAT_L8 store the height as 0-255 (truncated like Color -> RGB8 in Image.set_pixel),
+	FORMAT_RF keeps the full precision as a 32 bit float.
+	"""
+	rows = heightmap.T  # Godot images are stored row by row, i.e. [y, x]
+	if image_format == FORMAT_RF:
+		return np.ascontiguousarray(rows, dtype=np.float32).view(np.uint8)
+
+	gray = np.empty(rows.shape, dtype=np.uint8)
+	np.multiply(np.clip(rows, 0.0, 1.0), 255.0, out=gray, casting="unsafe")
+	if image_format == FORMAT_L8:
+		return gray
+	if image_format == FORMAT_RGB8:
+		return np.repeat(gray[:, :, None], 3, axis=2)
+	raise ValueError(f"Unsupported image format {image_format}, expected FORMAT_L8, FORMAT_RGB8 or FORMAT_RF")
+
+def build_terrain_mesh(heightmap:np.ndarray, scale:float=0.1, displacement:float=2.0, origin=None, step:int=1, apron:int=0):
+	"""
+	Build an indexed triangle grid from a [0, 1] heightmap indexed [x, y], one vertex per pixel.
+	Positions and triangles follow height_map_creator.gd: vertex (x, y) sits at
+	((x - width/2) * scale, (h - 0.5) * displacement, (y - height/2) * scale) and every cell is
+	split into the triangles (left, current, bottom) and (left, bottom, bottom_left).
+
+	origin (x, y) replaces (-width/2, -height/2) as the grid position of the first vertex and step
+	is the number of grid units between two vertices, which places chunks in a shared world grid.
+	The outer apron rows/columns of the heightmap are only used for the normals, so that the
+	normals of neighbouring chunks match along their border.
+
+	Returns float32 vertices (N, 3), normals (N, 3), UVs (N, 2) and the uint32 index buffer (M,),
+	with N = width * height vertices (without apron) stored row by row (vertex index = y * width + x).
+	"""
+	rows = heightmap.T.astype(np.float32)  # [y, x]
+	elevation = (rows - 0.5) * np.float32(displacement)
+	inner = (slice(apron, rows.shape[0] - apron), slice(apron, rows.shape[1] - apron))
+	height, width = elevation[inner].shape
+	if origin is None:
+		origin = (-(width // 2), -(height // 2))
+
+	xs = ((origin[0] + np.arange(width) * step) * scale).astype(np.float32)
+	zs = ((origin[1] + np.arange(height) * step) * scale).astype(np.float32)
+	vertices = np.empty((height, width, 3), dtype=np.float32)
+	vertices[:, :, 0] = xs[None, :]
+	vertices[:, :, 1] = elevation[inner]
+	vertices[:, :, 2] = zs[:, None]
+
+	# Normal of the surface y = f(x, z) is (-df/dx, 1, -df/dz)
+	normals = np.empty_like(vertices)
+	if elevation.shape[0] > 1 and elevation.shape[1] > 1:
+		slope_z, slope_x = np.gradient(elevation, scale * step, scale * step)
+		slope_x, slope_z = slope_x[inner], slope_z[inner]
+	else:
+		slope_z = slope_x = np.zeros((height, width), dtype=np.float32)
+	normals[:, :, 0] = -slope_x
+	normals[:, :, 1] = 1.0
+	normals[:, :, 2] = -slope_z
+	normals /= np.linalg.norm(normals, axis=2, keepdims=True)
+
+	uvs = np.empty((height, width, 2), dtype=np.float32)
+	uvs[:, :, 0] = np.linspace(0.0, 1.0, width, dtype=np.float32)[None, :]
+	uvs[:, :, 1] = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+
+	# Corners of every cell, the cell's "current" vertex is its top right corner
+	index = np.arange(width * height, dtype=np.uint32).reshape(height, width)
+	left = index[:-1, :-1]
+	current = index[:-1, 1:]
+	bottom = index[1:, 1:]
+	bottom_left = index[1:, :-1]
+	indices = np.stack([left, current, bottom, left, bottom, bottom_left], axis=-1).reshape(-1)
+
+	return vertices.reshape(-1, 3), normals.reshape(-1, 3), uvs.reshape(-1, 2), indices
+
+def create_chunk_heightmap(cx:int, cy:int, chunk_size:int, lod:int=0, apron:int=0, scale:float=100.0, octaves:int=6,
+						   persistence:float=0.5, lacunarity:float=2.0, repeatx:float=1024, repeaty:float=1024,
+						   base:int=42) -> np.ndarray:
+	"""
+	Heightmap tile of chunk (cx, cy) in an endless Perlin terrain, indexed [x, y].
+
+	The chunk covers the grid points cx * chunk_size ... (cx + 1) * chunk_size in both directions,
+	sampled every 2**lod points, so it has chunk_size // 2**lod + 1 samples per side. The last row and
+	column are the first ones of the next chunk. The noise is evaluated at global coordinates and
+	mapped to [0, 1] with a fixed range instead of the per map min/max normalization, so neighbouring
+	tiles have exactly the same values along their shared border. apron extra samples are added on
+	every side (see build_terrain_mesh).
+	"""
+	step = 2 ** lod
+	if chunk_size % step:
+		raise ValueError(f"chunk_size {chunk_size} is not divisible by 2**lod = {step}")
+	count = chunk_size // step + 1 + 2 * apron
+	x = (cx * chunk_size + (np.arange(count) - apron) * step) / scale
+	y = (cy * chunk_size + (np.arange(count) - apron) * step) / scale
+	noise_values = fractal_perlin_noise2(x, y, octaves, persistence, lacunarity, repeatx, repeaty, base)
+	return np.clip(noise_values.astype(np.float64) * 0.5 + 0.5, 0.0, 1.0)
+
+def stitch_chunk_edges(heightmap:np.ndarray, lod:int, edge_lods, apron:int=0) -> np.ndarray:
+	"""
+	Close the cracks towards coarser neighbours. edge_lods holds the LOD of the west (-x), east (+x),
+	north (-y) and south (+y) neighbour. Along an edge whose neighbour has a coarser LOD, the samples
+	the neighbour doesn't have are replaced by the linear interpolation of the ones it has, so both
+	meshes follow the same line. Modifies heightmap (indexed [x, y], with apron) in place.
+	"""
+	last = heightmap.shape[0] - 1 - apron
+	edges = (
+		(apron, slice(apron, last + 1)),  # west
+		(last, slice(apron, last + 1)),  # east
+		(slice(apron, last + 1), apron),  # north
+		(slice(apron, last + 1), last),  # south
+	)
+	for edge, neighbour_lod in zip(edges, edge_lods):
+		if neighbour_lod <= lod:
+			continue
+		ratio = 2 ** (neighbour_lod - lod)
+		values = heightmap[edge]
+		k = np.arange(len(values))
+		start = k - k % ratio
+		end = np.minimum(start + ratio, len(values) - 1)
+		t = (k % ratio) / ratio
+		heightmap[edge] = values[start] + t * (values[end] - values[start])
+	return heightmap
+
+def build_chunk(cx:int, cy:int, chunk_size:int, lod:int=0, edge_lods=(0, 0, 0, 0), scale:float=0.1,
+				displacement:float=2.0, noise_params:dict=None):
+	"""
+	Heightmap tile and mesh of chunk (cx, cy) at the given LOD, see create_chunk_heightmap.
+	The mesh is placed in world space (chunk (0, 0) starts at the origin), so neighbouring chunks
+	share their border vertices, and the normals are computed across the border. Edges towards
+	coarser neighbours are stitched with stitch_chunk_edges.
+
+	Returns the (n, n) heightmap tile and the build_terrain_mesh arrays of the chunk.
+	"""
+	heightmap = create_chunk_heightmap(cx, cy, chunk_size, lod, apron=1, **(noise_params or {}))
+	stitch_chunk_edges(heightmap, lod, edge_lods, apron=1)
+	mesh = build_terrain_mesh(heightmap, scale, displacement, origin=(cx * chunk_size, cy * chunk_size),
+							  step=2 ** lod, apron=1)
+	return heightmap[1:-1, 1:-1], mesh
+
+# Godot Variant.Type ids used by the binary serialization API (bytes_to_var / PackedByteArray.decode_var)
+TYPE_PACKED_INT32_ARRAY = 30
+TYPE_PACKED_VECTOR2_ARRAY = 35
+TYPE_PACKED_VECTOR3_ARRAY = 36
+
+def encode_packed_array(values:np.ndarray, variant_type:int) -> np.ndarray:
+	"""
+	Serialize a float32 (N, 2)/(N, 3) or 32 bit integer (N,) array in Godot's binary Variant format:
+	a uint32 type header, a uint32 element count and the little endian element data.
+	Decoding these bytes with PackedByteArray.decode_var(0) gives the packed array in one native call.
+	"""
+	dtype = "<i4" if variant_type == TYPE_PACKED_INT32_ARRAY else "<f4"
+	values = np.ascontiguousarray(values, dtype=dtype)
+	encoded = np.empty(8 + values.nbytes, dtype=np.uint8)
+	encoded[:8].view("<u4")[:] = (variant_type, len(values))
+	encoded[8:] = values.reshape(-1).view(np.uint8)
+	return encoded
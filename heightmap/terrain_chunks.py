@@ -0,0 +1,168 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from heightmaps import build_chunk
+
+# Neighbour offsets in the order of build_chunk's edge_lods: west, east, north, south
+NEIGHBOURS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+# A chunk whose generation failed is requested again this many times before it is given up
+MAX_RETRIES = 3
+
+class ChunkStreamer:
+	"""
+	Generates terrain chunks around a moving center on worker threads.
+
+	stream_around decides which chunks should exist and at which LOD, the chunks are built with
+	heightmaps.build_chunk on a thread pool. At most max_in_flight chunks are generated at a time,
+	the remaining requests wait (nearest first) and are submitted from poll(), which also returns
+	the finished chunks. A chunk is generated once at a time, a new request for a chunk in flight
+	waits for it. A failed chunk is requested again, up to MAX_RETRIES times while it is wanted.
+	Everything except the generation itself runs on the calling thread.
+	"""
+
+	def __init__(self, chunk_size:int=64, lod_count:int=3, lod_distance:int=2, max_in_flight:int=4, workers:int=2,
+				 scale:float=0.1, displacement:float=2.0, noise_params:dict=None):
+		if chunk_size % 2 ** (lod_count - 1):
+			raise ValueError(f"chunk_size {chunk_size} is not divisible by 2**(lod_count - 1)")
+		self.chunk_size = chunk_size
+		self.lod_count = lod_count
+		self.lod_distance = max(1, lod_distance)
+		self.max_in_flight = max(1, max_in_flight)
+		self.scale = scale
+		self.displacement = displacement
+		self.noise_params = noise_params or {}
+		self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="terrain")
+		self._completed = queue.SimpleQueue()  # (key, state, result or exception) filled by the workers
+		self._wanted = {}  # (cx, cy) -> (lod, edge_lods) the chunk should have
+		self._built = {}  # (cx, cy) -> (lod, edge_lods) of the delivered or in flight chunk
+		self._delivered = {}  # (cx, cy) -> (lod, edge_lods) of the chunk last returned by poll
+		self._waiting = {}  # (cx, cy) -> priority, requests not submitted yet
+		self._in_flight = {}  # (cx, cy) -> (lod, edge_lods) being generated
+		self._failures = {}  # (cx, cy) -> ((lod, edge_lods), failed attempts)
+		self._last_stream = None
+
+	def chunk_at(self, world_x:float, world_z:float):
+		"""
+		The chunk containing a world position.
+		"""
+		size = self.chunk_size * self.scale
+		return int(world_x // size), int(world_z // size)
+
+	def lod_for(self, key, center) -> int:
+		ring = max(abs(key[0] - center[0]), abs(key[1] - center[1]))
+		return min(ring // self.lod_distance, self.lod_count - 1)
+
+	def stream_around(self, center_cx:int, center_cy:int, radius:int) -> list:
+		"""
+		Request every chunk within radius chunks of the center, with a coarser LOD every
+		lod_distance rings. Chunks whose LOD or neighbour LODs changed are generated again.
+
+		Returns the keys of the chunks that left the radius and should be freed, only chunks
+		poll already returned are reported.
+		"""
+		center = (center_cx, center_cy)
+		if (center, radius) == self._last_stream:
+			return []
+		self._last_stream = (center, radius)
+		keys = [(center_cx + dx, center_cy + dy) for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)]
+		lods = {key: self.lod_for(key, center) for key in keys}
+
+		wanted = {}
+		for key in keys:
+			# Neighbours outside the radius don't exist, their edge needs no stitching
+			edge_lods = tuple(lods.get((key[0] + dx, key[1] + dy), 0) for dx, dy in NEIGHBOURS)
+			wanted[key] = (lods[key], edge_lods)
+			if self._built.get(key) != wanted[key]:
+				self._waiting[key] = max(abs(key[0] - center_cx), abs(key[1] - center_cy))
+		for key in [key for key in self._built if key not in wanted]:
+			del self._built[key]
+		dropped = [key for key in self._delivered if key not in wanted]
+		for key in dropped:
+			del self._delivered[key]
+		for key in [key for key in self._waiting if key not in wanted]:
+			del self._waiting[key]
+		self._failures = {key: failure for key, failure in self._failures.items() if key in wanted}
+		self._wanted = wanted
+		self._submit()
+		return dropped
+
+	def request(self, cx:int, cy:int, lod:int=0, edge_lods=(0, 0, 0, 0)) -> None:
+		"""
+		Request a single chunk, outside of stream_around.
+		"""
+		key = (cx, cy)
+		self._wanted[key] = (lod, tuple(edge_lods))
+		self._last_stream = None
+		self._waiting[key] = -1
+		self._submit()
+
+	def poll(self) -> list:
+		"""
+		Collect the finished chunks and submit waiting requests.
+
+		Returns a list of (cx, cy, lod, heightmap, mesh) for the chunks that are still wanted in the
+		generated state. Results that were superseded while they were generated are dropped.
+		"""
+		finished = []
+		while True:
+			try:
+				key, state, result = self._completed.get_nowait()
+			except queue.Empty:
+				break
+			del self._in_flight[key]
+			if isinstance(result, Exception):
+				self._retry(key, state, result)
+				continue
+			self._failures.pop(key, None)
+			if self._wanted.get(key) == state:
+				heightmap, mesh = result
+				self._delivered[key] = state
+				finished.append((key[0], key[1], state[0], heightmap, mesh))
+		self._submit()
+		return finished
+
+	def pending_count(self) -> int:
+		return len(self._waiting) + len(self._in_flight)
+
+	def shutdown(self) -> None:
+		self._executor.shutdown(wait=False, cancel_futures=True)
+
+	def _retry(self, key, state, error) -> None:
+		# Request a failed chunk again while it is still wanted, unless a newer request replaced it
+		if self._built.get(key) == state:
+			del self._built[key]
+		if self._wanted.get(key) != state:
+			print(f"Error: generating chunk {key} failed: {error}")
+			return
+		failed_state, attempts = self._failures.get(key, (state, 0))
+		attempts = attempts + 1 if failed_state == state else 1
+		self._failures[key] = (state, attempts)
+		if attempts > MAX_RETRIES:
+			print(f"Error: generating chunk {key} failed {attempts} times, giving up: {error}")
+			return
+		print(f"Error: generating chunk {key} failed, retrying: {error}")
+		if key not in self._waiting:
+			center = self._last_stream[0] if self._last_stream is not None else key
+			self._waiting[key] = max(abs(key[0] - center[0]), abs(key[1] - center[1]))
+
+	def _submit(self) -> None:
+		while len(self._in_flight) < self.max_in_flight:
+			# A chunk in flight is submitted again once its result is in
+			ready = [key for key in self._waiting if key not in self._in_flight]
+			if not ready:
+				break
+			key = min(ready, key=self._waiting.get)
+			del self._waiting[key]
+			state = self._wanted[key]
+			self._built[key] = state
+			self._in_flight[key] = state
+			self._executor.submit(self._generate, key, state)
+
+	def _generate(self, key, state) -> None:
+		lod, edge_lods = state
+		try:
+			result = build_chunk(key[0], key[1], self.chunk_size, lod, edge_lods, self.scale, self.displacement,
+								 self.noise_params)
+		except Exception as e:
+			result = e
+		self._completed.put((key, state, result))